@@ -0,0 +1,87 @@
+"""Microbenchmark de la construcción de BookingDate.
+
+Compara el análisis anterior (probar cuatro formatos con strptime y volver a
+convertir OPEN_TIME/MAX_BOOKING_TIME en cada comprobación) con el actual
+(detección del formato por expresión regular, caché LRU y ventana de apertura
+precalculada).
+
+Uso:
+    python -m benchmarks.booking_date_bench [--iterations N]
+"""
+import argparse
+import os
+import sys
+import timeit
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.domain.booking_date import BookingDate, OPEN_TIME, MAX_BOOKING_TIME
+
+
+class _NoHolidays:
+    def get_holiday_name(self, date_str):
+        return None
+
+
+# Fechas tal y como llegan de las herramientas MCP (formatos mezclados)
+SAMPLE_DATES = ["20/10/2026", "2026-10-20", "21-10-2026", "2026/10/22", "2026-10-23"]
+SAMPLE_TIMES = ["13:30", "20:00", "21:15"]
+
+
+def _legacy_parse_date(date_str):
+    for fmt in ("%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(date_str, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Formato de fecha no válido: {date_str}")
+
+
+def _legacy_booking_date(date_str, time_str, holiday_repo):
+    """Reproduce el coste de BookingDate antes de la optimización."""
+    parsed_date = _legacy_parse_date(date_str)
+    parsed_time = datetime.strptime(time_str, "%H:%M").time()
+    normalized = parsed_date.strftime("%Y-%m-%d")
+    holiday_repo.get_holiday_name(normalized)
+    open_time = datetime.strptime(OPEN_TIME, "%H:%M").time()
+    close_time = datetime.strptime(MAX_BOOKING_TIME, "%H:%M").time()
+    if close_time == datetime.strptime("00:00", "%H:%M").time():
+        return parsed_time >= open_time
+    return open_time <= parsed_time <= close_time
+
+
+def _current_booking_date(date_str, time_str, holiday_repo):
+    booking_date = BookingDate(date_str, time_str, holiday_repo)
+    return booking_date.get_invalid_reason()
+
+
+def run(iterations: int) -> dict:
+    holiday_repo = _NoHolidays()
+    pairs = [(d, t) for d in SAMPLE_DATES for t in SAMPLE_TIMES]
+
+    def bench(fn):
+        def loop():
+            for d, t in pairs:
+                fn(d, t, holiday_repo)
+        total = min(timeit.repeat(loop, number=iterations, repeat=5))
+        return total / (iterations * len(pairs)) * 1e6
+
+    legacy = bench(_legacy_booking_date)
+    current = bench(_current_booking_date)
+    return {"legacy_us": legacy, "current_us": current, "speedup": legacy / current}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark de BookingDate")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    result = run(args.iterations)
+    print(f"Anterior: {result['legacy_us']:.2f} µs por BookingDate")
+    print(f"Actual:   {result['current_us']:.2f} µs por BookingDate")
+    print(f"Mejora:   x{result['speedup']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Prueba de estrés de concurrencia de BookingService.create_reservation y modify_reservation.
+
+Lanza muchos hilos que reservan a la vez las mismas mesas y franjas sobre una
+base de datos temporal; parte de los intentos mueven una reserva propia a otra
+hora o la amplían a más comensales (lo que obliga a combinar mesas). Al final
+comprueba que no hay dos reservas solapadas en la misma mesa. Termina con
+código 1 si encuentra alguna doble reserva.
+
+Uso:
+    python -m benchmarks.booking_stress [--threads 16] [--attempts 200] [--tables 8] [--modify-ratio 0.3]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import NoHolidays
+
+# Franjas muy concurridas para forzar colisiones
+CONTENDED_TIMES = ["20:00", "20:30", "21:00", "21:30"]
+
+
+def _next_tuesday() -> str:
+    today = date.today()
+    return (today + timedelta(days=(1 - today.weekday()) % 7 or 7)).isoformat()
+
+
+def _prepare_database(db_path: str, n_tables: int) -> None:
+    from infrastructure.database.migrations import migrate
+
+    conn = sqlite3.connect(db_path)
+    migrate(conn)
+    conn.executemany(
+        "INSERT INTO tables (id, capacity, location) VALUES (?, ?, ?)",
+        [(i, 4, "interior") for i in range(1, n_tables + 1)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def _count_double_bookings(db_path: str) -> int:
+    conn = sqlite3.connect(db_path)
+    (overlaps,) = conn.execute("""
+        SELECT COUNT(*) FROM reservation_tables a
+        JOIN reservation_tables b
+          ON a.table_id = b.table_id AND a.date = b.date
+         AND a.reservation_id < b.reservation_id
+         AND a.start_minute < b.end_minute AND b.start_minute < a.end_minute
+    """).fetchone()
+    conn.close()
+    return overlaps
+
+
+def run(threads: int, attempts: int, n_tables: int, db_path: str, modify_ratio: float = 0.3) -> dict:
+    _prepare_database(db_path, n_tables)
+
+    from core.services.booking_service import BookingService
+    from infrastructure.repositories.sql_reservation_repository import SQLReservationRepository
+    from infrastructure.repositories.sql_table_repository import SQLTableRepository
+
+    service = BookingService(SQLReservationRepository(), SQLTableRepository(), NoHolidays())
+    booking_day = _next_tuesday()
+    outcomes = Counter()
+    outcomes_lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def worker(worker_id: int):
+        rng = random.Random(worker_id)
+        local = Counter()
+        booked = []
+        barrier.wait()
+        for i in range(attempts):
+            if booked and rng.random() < modify_ratio:
+                # Cambio de hora, o más comensales de los que caben en una mesa (reasignación)
+                updates = {"time": rng.choice(CONTENDED_TIMES)} if rng.random() < 0.7 else {"guests": 6}
+                result = service.modify_reservation(rng.choice(booked), booking_day, updates)
+                if result["success"]:
+                    local["modificada"] += 1
+                elif "acaba de ser reservada" in result["message"]:
+                    local["modificación perdida en la transacción"] += 1
+                elif "No hay mesas disponibles" in result["message"]:
+                    local["modificación sin mesa"] += 1
+                else:
+                    local["otro error"] += 1
+                continue
+            phone = f"6{worker_id:03d}{i:05d}"
+            result = service.create_reservation(
+                table_id=rng.randint(1, n_tables),
+                name=f"Cliente {worker_id}-{i}",
+                guests=2,
+                date=booking_day,
+                time=rng.choice(CONTENDED_TIMES),
+                phone=phone,
+            )
+            if result["success"]:
+                local["reservada"] += 1
+                booked.append(phone)
+            elif "acaba de ser reservada" in result["message"]:
+                local["perdida en la transacción"] += 1
+            elif "no está disponible" in result["message"]:
+                local["ocupada"] += 1
+            else:
+                local["otro error"] += 1
+        with outcomes_lock:
+            outcomes.update(local)
+
+    workers = [threading.Thread(target=worker, args=(w,)) for w in range(threads)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+
+    total = threads * attempts
+    return {
+        "attempts": total,
+        "elapsed_s": elapsed,
+        "attempts_per_s": total / elapsed,
+        "outcomes": dict(outcomes),
+        "double_bookings": _count_double_bookings(db_path),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de estrés de reservas concurrentes")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--attempts", type=int, default=200, help="Intentos de reserva por hilo")
+    parser.add_argument("--tables", type=int, default=8)
+    parser.add_argument("--modify-ratio", type=float, default=0.3, help="Proporción de intentos que modifican una reserva")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "stress.sqlite")
+        # Debe fijarse antes de importar la capa de infraestructura
+        os.environ["DATABASE_PATH"] = db_path
+        result = run(args.threads, args.attempts, args.tables, db_path, args.modify_ratio)
+
+        from infrastructure.database.sql_connection import close_connections
+        close_connections()
+
+    print(f"Intentos: {result['attempts']} en {result['elapsed_s']:.2f} s "
+          f"({result['attempts_per_s']:.0f} intentos/s)")
+    for outcome, n in sorted(result["outcomes"].items()):
+        print(f"  {outcome}: {n}")
+    print(f"Dobles reservas: {result['double_bookings']}")
+    sys.exit(1 if result["double_bookings"] else 0)
+
+
+if __name__ == "__main__":
+    main()
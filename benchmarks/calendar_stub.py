@@ -0,0 +1,205 @@
+"""Stub local de la API HTTP de Google Calendar.
+
+Implementa lo mínimo que usa GoogleCalendarRepository (insert, patch, delete,
+get y el endpoint batch multipart) guardando los eventos en memoria y contando
+las peticiones HTTP recibidas. Sirve para probar el repositorio y el
+CalendarSyncWorker sin red y para comparar el coste de N llamadas sueltas
+frente a una petición batch. Con `error_status` y `delay` se simula una caída o
+un Google lento (timeouts y circuit breaker).
+
+Uso:
+    python -m benchmarks.calendar_stub [--events 100] [--port 0]
+"""
+import argparse
+import itertools
+import json
+import os
+import re
+import sys
+import threading
+import time
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import urlsplit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_EVENTS_PATH = re.compile(r"calendars/([^/]+)/events(?:/([^/?]+))?$")
+_BOUNDARY = "stub_batch_boundary"
+
+
+class CalendarStub:
+    """Servidor HTTP en segundo plano con el estado del calendario falso."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.events: Dict[str, Dict[str, Any]] = {}
+        self.http_requests = 0
+        self.operations = 0
+        # Simulación de fallos: estado HTTP devuelto a todo (p. ej. 503) y retardo en segundos
+        self.error_status: Optional[int] = None
+        self.delay = 0.0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> "CalendarStub":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    # ============================================================
+    # OPERACIONES DE LA API
+    # ============================================================
+    def handle(self, method: str, path: str, body: bytes) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """Ejecuta una operación de eventos. Devuelve (estado HTTP, cuerpo JSON)."""
+        match = _EVENTS_PATH.search(urlsplit(path).path)
+        if not match:
+            return 404, {"error": {"code": 404, "message": f"Ruta desconocida: {path}"}}
+        event_id = match.group(2)
+        data = json.loads(body) if body else {}
+
+        with self._lock:
+            self.operations += 1
+            if method == "POST" and not event_id:
+                # Como Google: se respeta el ID del cuerpo y repetirlo da 409
+                event_id = data.get("id") or f"stub{next(self._ids)}"
+                if event_id in self.events:
+                    return 409, {"error": {"code": 409, "message": "The requested identifier already exists."}}
+                self.events[event_id] = {**data, "id": event_id, "status": "confirmed"}
+                return 200, self.events[event_id]
+            if event_id not in self.events:
+                return 404, {"error": {"code": 404, "message": "Not Found"}}
+            if method == "GET":
+                return 200, self.events[event_id]
+            if method == "PATCH":
+                self.events[event_id].update(data)
+                return 200, self.events[event_id]
+            if method == "DELETE":
+                del self.events[event_id]
+                return 204, None
+        return 405, {"error": {"code": 405, "message": f"Método no soportado: {method}"}}
+
+    def handle_batch(self, content_type: str, body: bytes) -> bytes:
+        """Procesa una petición multipart/mixed y devuelve la respuesta multipart."""
+        message = BytesParser().parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+        parts = []
+        for part in message.get_payload():
+            content_id = part["Content-ID"].strip("<>")
+            raw = part.get_payload(decode=False)
+            head, _, inner_body = raw.partition("\r\n\r\n") if "\r\n\r\n" in raw else raw.partition("\n\n")
+            method, path = head.splitlines()[0].split(" ")[:2]
+            status, payload = self.handle(method, path, inner_body.encode())
+            response = f"HTTP/1.1 {status} {'OK' if status < 400 else 'Error'}\r\n"
+            if payload is not None:
+                content = json.dumps(payload)
+                response += f"Content-Type: application/json\r\nContent-Length: {len(content)}\r\n\r\n{content}"
+            else:
+                response += "Content-Length: 0\r\n\r\n"
+            parts.append(
+                f"--{_BOUNDARY}\r\nContent-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id}>\r\n\r\n{response}\r\n"
+            )
+        return ("".join(parts) + f"--{_BOUNDARY}--\r\n").encode()
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _dispatch(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                with stub._lock:
+                    stub.http_requests += 1
+                if stub.delay:
+                    time.sleep(stub.delay)
+                if stub.error_status:
+                    error = {"error": {"code": stub.error_status, "message": "Error simulado"}}
+                    self._reply(stub.error_status, json.dumps(error).encode(), "application/json")
+                    return
+
+                if "batch" in self.path:
+                    content = stub.handle_batch(self.headers["Content-Type"], body)
+                    self._reply(200, content, f"multipart/mixed; boundary={_BOUNDARY}")
+                    return
+                status, payload = stub.handle(self.command, self.path, body)
+                self._reply(status, json.dumps(payload).encode() if payload is not None else b"", "application/json")
+
+            def _reply(self, status: int, content: bytes, content_type: str):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                try:
+                    self.wfile.write(content)
+                except (BrokenPipeError, ConnectionResetError):
+                    # El cliente cortó por timeout
+                    pass
+
+            do_GET = do_POST = do_PATCH = do_DELETE = do_PUT = _dispatch
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def _event(i: int) -> Dict[str, Any]:
+    return {
+        "title": f"Reserva: Cliente {i} (2 personas)",
+        "description": "Reserva para 2 personas",
+        "start_datetime": "2030-01-15T20:00:00",
+        "end_datetime": "2030-01-15T21:00:00",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub local de Google Calendar: llamadas sueltas frente a batch")
+    parser.add_argument("--events", type=int, default=100)
+    parser.add_argument("--port", type=int, default=0)
+    args = parser.parse_args()
+
+    from google.auth.credentials import AnonymousCredentials
+    from infrastructure.repositories.google_calendar_repository import GoogleCalendarRepository
+
+    stub = CalendarStub(port=args.port).start()
+    repo = GoogleCalendarRepository(
+        calendar_id="primary",
+        credentials_path="unused.json",
+        api_endpoint=stub.endpoint,
+        credentials=AnonymousCredentials(),
+    )
+    print(f"Stub de Google Calendar en {stub.endpoint}")
+
+    def measure(label, fn):
+        before = stub.http_requests
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        print(f"  {label}: {stub.http_requests - before} peticiones HTTP, {elapsed * 1000:.1f} ms")
+        return result
+
+    try:
+        ids = measure(f"{args.events} create_event", lambda: [repo.create_event(**_event(i)) for i in range(args.events)])
+        measure(f"{args.events} delete_event", lambda: [repo.delete_event(event_id) for event_id in ids])
+        ids = measure(f"create_events({args.events})", lambda: repo.create_events([_event(i) for i in range(args.events)]))
+        measure(f"update_events({args.events})", lambda: repo.update_events(
+            [{"event_id": event_id, "start_datetime": "2030-01-15T21:00:00"} for event_id in ids]))
+        deleted = measure(f"delete_events({args.events})", lambda: repo.delete_events(ids))
+        assert all(deleted) and not stub.events, "El stub conserva eventos tras el borrado en lote"
+    finally:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
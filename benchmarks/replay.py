@@ -0,0 +1,313 @@
+"""Reproduce contra un servidor MCP las llamadas grabadas con MCP_RECORD_PATH.
+
+Respeta los intervalos entre llamadas del fichero (divididos por --speed) con
+un número máximo de llamadas en vuelo (--concurrency) y mide el rendimiento,
+la latencia por herramienta y las tasas de error y de rechazo. Por defecto
+arranca su propio servidor sobre una copia temporal de la base de datos, para
+que las reservas reproducidas no toquen la real.
+
+Uso:
+    python -m benchmarks.replay calls.jsonl [--db resources/bookings.sqlite] [--speed 10] [--concurrency 16]
+    python -m benchmarks.replay calls.jsonl --url http://127.0.0.1:8000/mcp/   # servidor ya arrancado
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from benchmarks.service_bench import _percentile
+
+# Herramientas que escriben: un success=False suele ser un conflicto (mesa ya ocupada)
+WRITE_TOOLS = {"reserve_table", "cancel_reservation", "modify_reservation_by_phone"}
+DATE_ARGS = ("date", "new_date")
+
+
+def load_calls(path: str) -> List[Dict[str, Any]]:
+    """Lee el JSONL grabado, ordenado por hora de inicio."""
+    with open(path, encoding="utf-8") as f:
+        calls = [json.loads(line) for line in f if line.strip()]
+    calls.sort(key=lambda c: c["ts"])
+    return calls
+
+
+def shift_dates(calls: List[Dict[str, Any]], today: date) -> int:
+    """
+    Desplaza las fechas de los argumentos para que la grabación empiece hoy.
+    El desplazamiento es un múltiplo de 7 días para conservar el día de la
+    semana (los lunes cerrado siguen siendo lunes).
+
+    Returns:
+        Días desplazados
+    """
+    if not calls:
+        return 0
+    recorded_day = datetime.fromtimestamp(calls[0]["ts"]).date()
+    days = -(-(today - recorded_day).days // 7) * 7
+    if days <= 0:
+        return 0
+    for call in calls:
+        for key in DATE_ARGS:
+            value = call["args"].get(key)
+            if value:
+                try:
+                    call["args"][key] = (date.fromisoformat(value) + timedelta(days=days)).isoformat()
+                except ValueError:
+                    pass  # Fecha inválida grabada tal cual: se reproduce igual
+    return days
+
+
+def _field(result, name: str, legacy_name: str) -> Any:
+    """Campo de CallToolResult; las versiones 1.x del SDK de MCP usan camelCase."""
+    fields = getattr(type(result), "model_fields", {})
+    return getattr(result, name if name in fields else legacy_name, None)
+
+
+def _result_payload(result) -> Any:
+    """Resultado de la herramienta como objeto Python (contenido estructurado o texto JSON)."""
+    structured = _field(result, "structured_content", "structuredContent")
+    if structured is not None:
+        # FastMCP envuelve los resultados que no son objetos en {"result": ...}
+        return structured.get("result", structured) if len(structured) == 1 else structured
+    for content in result.content or []:
+        text = getattr(content, "text", None)
+        if text is not None:
+            try:
+                return json.loads(text)
+            except ValueError:
+                return text
+    return None
+
+
+async def replay(calls: List[Dict[str, Any]], url: str, concurrency: int, speed: float) -> Dict[str, Any]:
+    """
+    Lanza las llamadas respetando sus tiempos relativos (divididos por `speed`;
+    0 = sin esperas) con `concurrency` sesiones MCP como máximo.
+    """
+    from fastmcp import Client
+
+    queue: asyncio.Queue = asyncio.Queue()
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    outcomes: Dict[str, Dict[str, int]] = defaultdict(lambda: {"ok": 0, "rejected": 0, "error": 0})
+    lags: List[float] = []
+    first_ts = calls[0]["ts"] if calls else 0.0
+    connected = 0
+    ready = asyncio.Event()
+
+    async def worker():
+        nonlocal connected
+        async with Client(url) as client:
+            # El reloj empieza cuando todas las sesiones están abiertas
+            connected += 1
+            if connected == concurrency:
+                ready.set()
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                call, scheduled = item
+                if scheduled is not None:
+                    lags.append(max(0.0, time.perf_counter() - scheduled))
+                started = time.perf_counter()
+                try:
+                    result = await client.call_tool_mcp(call["tool"], call["args"])
+                    elapsed = (time.perf_counter() - started) * 1000
+                    payload = _result_payload(result)
+                    if _field(result, "is_error", "isError"):
+                        outcome = "error"
+                    elif isinstance(payload, dict) and payload.get("success") is False:
+                        outcome = "rejected"
+                    else:
+                        outcome = "ok"
+                except Exception:
+                    elapsed = (time.perf_counter() - started) * 1000
+                    outcome = "error"
+                latencies[call["tool"]].append(elapsed)
+                outcomes[call["tool"]][outcome] += 1
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    await ready.wait()
+    started = time.perf_counter()
+    for call in calls:
+        scheduled = None
+        if speed:
+            scheduled = started + (call["ts"] - first_ts) / speed
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await queue.put((call, scheduled))
+    for _ in workers:
+        await queue.put(None)
+    await asyncio.gather(*workers)
+    elapsed = time.perf_counter() - started
+
+    return _report(calls, latencies, outcomes, lags, elapsed, concurrency, speed)
+
+
+def _report(calls, latencies, outcomes, lags, elapsed, concurrency, speed) -> Dict[str, Any]:
+    def summary(values: List[float]) -> Dict[str, float]:
+        values = sorted(values)
+        return {
+            "calls": len(values),
+            "p50_ms": round(_percentile(values, 50), 3),
+            "p95_ms": round(_percentile(values, 95), 3),
+            "p99_ms": round(_percentile(values, 99), 3),
+            "mean_ms": round(statistics.fmean(values), 3),
+        }
+
+    tools = {}
+    for tool, values in sorted(latencies.items()):
+        counts = outcomes[tool]
+        tools[tool] = summary(values) | {
+            "error_rate": round(counts["error"] / len(values), 4),
+            "rejected_rate": round(counts["rejected"] / len(values), 4),
+        }
+    all_latencies = [v for values in latencies.values() for v in values]
+    total = len(all_latencies)
+    writes = sum(sum(outcomes[t].values()) for t in WRITE_TOOLS if t in outcomes)
+    recorded_span = calls[-1]["ts"] - calls[0]["ts"] if calls else 0.0
+    return {
+        "calls": total,
+        "concurrency": concurrency,
+        "speed": speed,
+        "recorded_span_s": round(recorded_span, 2),
+        "elapsed_s": round(elapsed, 2),
+        "throughput_per_s": round(total / elapsed, 2) if elapsed else None,
+        "latency": summary(all_latencies) if total else None,
+        "error_rate": round(sum(o["error"] for o in outcomes.values()) / total, 4) if total else 0.0,
+        # Escrituras rechazadas por el servicio (mesa ocupada, reserva inexistente...)
+        "conflict_rate": round(sum(outcomes[t]["rejected"] for t in WRITE_TOOLS if t in outcomes) / writes, 4)
+        if writes else 0.0,
+        # Retraso con el que se lanzaron las llamadas respecto a su hora prevista
+        "dispatch_lag_p99_ms": round(_percentile(sorted(lags), 99) * 1000, 3) if lags else 0.0,
+        "tools": tools,
+    }
+
+
+# ============================================================
+# SERVIDOR SOBRE UNA COPIA DE LA BASE DE DATOS
+# ============================================================
+def copy_database(source: str, target: str) -> None:
+    """Copia consistente de la base de datos (incluido el WAL) con la API de backup de SQLite."""
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(target)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(db_path: str, port: int, log_path: str) -> subprocess.Popen:
+    """Arranca infrastructure/mcp_server.py sobre `db_path`, sin Google Calendar ni grabación."""
+    env = os.environ | {
+        "DATABASE_PATH": db_path,
+        "MCP_SERVER_HOST": "127.0.0.1",
+        "MCP_SERVER_PORT": str(port),
+        "GOOGLE_CALENDAR_ENABLED": "false",
+        "MCP_RECORD_PATH": "",
+        # Un solo restaurante: la copia (aunque exista resources/tenants.json)
+        "TENANTS_JSON": os.path.join(os.path.dirname(db_path), "no-tenants.json"),
+    }
+    log = open(log_path, "w", encoding="utf-8")
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "infrastructure", "mcp_server.py")],
+        cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"El servidor MCP terminó al arrancar; ver {log_path}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"El servidor MCP no respondió en 30 s; ver {log_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reproduce tráfico MCP grabado y mide el rendimiento")
+    parser.add_argument("calls", help="Fichero JSONL grabado con MCP_RECORD_PATH")
+    parser.add_argument("--db", default=os.path.join(ROOT, "resources", "bookings.sqlite"),
+                        help="Base de datos que se copia para el servidor temporal")
+    parser.add_argument("--url", help="Servidor ya arrancado (debe usar una base de datos de pruebas)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Llamadas en vuelo como máximo")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Compresión temporal: 10 = diez veces más rápido; 0 = sin esperas")
+    parser.add_argument("--shift-dates", action=argparse.BooleanOptionalAction, default=True,
+                        help="Desplaza las fechas grabadas para que empiecen hoy (por semanas)")
+    parser.add_argument("--limit", type=int, help="Reproducir solo las primeras N llamadas")
+    parser.add_argument("--restaurant", help="Reproducir solo las llamadas de este restaurant_id")
+    parser.add_argument("--output", help="Fichero JSON donde guardar el informe")
+    args = parser.parse_args()
+
+    calls = load_calls(args.calls)
+    if args.restaurant:
+        calls = [c for c in calls if c["args"].get("restaurant_id") == args.restaurant]
+    calls = calls[:args.limit]
+    if not calls:
+        sys.exit(f"{args.calls} no contiene llamadas")
+    if args.shift_dates:
+        days = shift_dates(calls, date.today())
+        if days:
+            print(f"Fechas desplazadas {days} días")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = None
+        url = args.url
+        if not url:
+            scratch = os.path.join(tmp, "replay.sqlite")
+            copy_database(args.db, scratch)
+            # El servidor temporal atiende a un único restaurante (la copia de --db)
+            for call in calls:
+                call["args"].pop("restaurant_id", None)
+            port = _free_port()
+            server = start_server(scratch, port, os.path.join(tmp, "server.log"))
+            url = f"http://127.0.0.1:{port}/mcp/"
+            print(f"Servidor temporal en {url} sobre una copia de {args.db}")
+        else:
+            print(f"⚠️ Reproduciendo contra {url}: las reservas se escribirán en su base de datos")
+        try:
+            report = asyncio.run(replay(calls, url, args.concurrency, args.speed))
+        finally:
+            if server:
+                server.terminate()
+                server.wait(timeout=10)
+
+    print(f"{report['calls']} llamadas en {report['elapsed_s']} s "
+          f"(grabadas en {report['recorded_span_s']} s, speed={args.speed}, concurrency={args.concurrency})")
+    print(f"Rendimiento: {report['throughput_per_s']} llamadas/s, retraso de envío p99 {report['dispatch_lag_p99_ms']} ms")
+    print(f"Errores: {report['error_rate']:.2%}  Conflictos en escrituras: {report['conflict_rate']:.2%}")
+    print(f"{'herramienta':<30}{'llamadas':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'error':>8}{'rech.':>8}")
+    for tool, r in report["tools"].items():
+        print(f"{tool:<30}{r['calls']:>9}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+              f"{r['error_rate']:>8.1%}{r['rejected_rate']:>8.1%}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nInforme guardado en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
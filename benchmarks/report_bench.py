@@ -0,0 +1,110 @@
+"""Benchmark del informe de ocupación (ReportService.occupancy_report).
+
+Genera un restaurante sintético con un año de reservas y mide el informe del
+año completo. Como referencia calcula los mismos minutos-plaza por franja
+recorriendo cada reserva minuto a minuto en Python, y comprueba que ambos
+resultados coinciden.
+
+Uso:
+    python -m benchmarks.report_bench [--tables 100] [--days 365] [--per-day 600] [--repeat 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import NoHolidays, generate_restaurant
+
+
+def _python_seat_minutes(rows, origin: int, bucket_minutes: int, n_buckets: int):
+    """Minutos-plaza por franja con bucles: la referencia que evita el array de diferencias."""
+    tables = {}
+    for row in rows:
+        tables[row[5]] = tables.get(row[5], 0) + 1
+    totals = [0.0] * n_buckets
+    for _, _, start, end, guests, reservation_id in rows:
+        seats = guests / tables[reservation_id]
+        for minute in range(start, end):
+            totals[(minute - origin) // bucket_minutes] += seats
+    return totals
+
+
+def run(tables: int, days: int, per_day: int, repeat: int, seed: int, db_path: str):
+    generated = generate_restaurant(db_path, tables, days, per_day, seed, future_days=0)
+
+    from core.services.report_service import ReportService
+    from infrastructure.repositories.sql_reservation_repository import SQLReservationRepository
+    from infrastructure.repositories.sql_table_repository import SQLTableRepository
+
+    reservation_repo = SQLReservationRepository()
+    service = ReportService(reservation_repo, SQLTableRepository(), NoHolidays())
+    end = date.today()
+    start = end - timedelta(days=days - 1)
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        report = service.occupancy_report(start.isoformat(), end.isoformat())
+        timings.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    rows = reservation_repo.get_table_usage_between(start.isoformat(), end.isoformat())
+    query_s = time.perf_counter() - started
+
+    first = report["seat_utilisation"][0]["time"]
+    origin = int(first[:2]) * 60 + int(first[3:])
+    started = time.perf_counter()
+    reference = _python_seat_minutes(rows, origin, report["bucket_minutes"], len(report["seat_utilisation"]))
+    python_s = time.perf_counter() - started
+
+    # avg_occupied_seats = minutos-plaza / (franja * días abiertos)
+    scale = report["bucket_minutes"] * report["open_days"]
+    for bucket, expected in zip(report["seat_utilisation"], reference):
+        assert abs(bucket["avg_occupied_seats"] - expected / scale) < 0.01, (bucket, expected / scale)
+
+    return {
+        "dataset": generated,
+        "rows": len(rows),
+        "report_p50_s": statistics.median(timings),
+        "report_min_s": min(timings),
+        "query_s": query_s,
+        "python_loops_s": python_s,
+        "covers": report["covers"],
+        "peak": report["peak"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del informe de ocupación")
+    parser.add_argument("--tables", type=int, default=100)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--per-day", type=int, default=600, help="Intentos de reserva por día")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.sqlite")
+        # Debe fijarse antes de importar la capa de infraestructura
+        os.environ["DATABASE_PATH"] = db_path
+        result = run(args.tables, args.days, args.per_day, args.repeat, args.seed, db_path)
+
+        from infrastructure.database.sql_connection import close_connections
+        close_connections()
+
+    dataset = result["dataset"]
+    print(f"Restaurante sintético: {dataset['tables']} mesas, {dataset['reservations']} reservas en {dataset['days']} días "
+          f"({result['rows']} filas mesa-reserva)")
+    print(f"Informe completo:  p50 {result['report_p50_s'] * 1000:.0f} ms, mínimo {result['report_min_s'] * 1000:.0f} ms")
+    print(f"  de ellos, consulta: {result['query_s'] * 1000:.0f} ms")
+    print(f"Bucles en Python (solo minutos-plaza): {result['python_loops_s'] * 1000:.0f} ms")
+    print(f"Cubiertos: {result['covers']}, franja punta: {result['peak']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""Benchmark de carga sintética de los caminos de reserva y disponibilidad.
+
+Genera un restaurante sintético (benchmarks.synthetic) en una base de datos
+temporal y mide, para cada método de servicio, la latencia p50/p99 y el
+número de sentencias SQL por llamada. Los resultados se guardan en JSON para
+comparar entre commits.
+
+Uso:
+    python -m benchmarks.service_bench [--tables 200] [--days 240] [--calls 500] [--output bench.json]
+    python -m benchmarks.service_bench --compare baseline.json --output bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import NoHolidays, generate_restaurant, opening_days
+
+GUESTS = [1, 2, 2, 2, 3, 4, 4, 5, 6, 8, 10]
+LOCATIONS = ["interior", "terrace"]
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class QueryCounter:
+    """Cuenta las sentencias SQL ejecutadas por la conexión del hilo actual."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, statement: str):
+        self.count += 1
+
+    def install(self):
+        from infrastructure.database.sql_connection import get_connection
+        get_connection().set_trace_callback(self)
+
+
+def measure(prepare: Callable[[], tuple], call: Callable[..., object], calls: int,
+            counter: QueryCounter) -> Dict[str, float]:
+    """
+    Ejecuta `call(*prepare())` `calls` veces midiendo solo `call`.
+
+    Returns:
+        Latencias p50/p99/media en ms y sentencias SQL por llamada
+    """
+    call(*prepare())  # Calentamiento: cachés del plano de mesas y del índice de ocupación
+    latencies = []
+    queries = 0
+    for _ in range(calls):
+        args = prepare()
+        queries_before = counter.count
+        started = time.perf_counter()
+        call(*args)
+        latencies.append((time.perf_counter() - started) * 1000)
+        queries += counter.count - queries_before
+    latencies.sort()
+    return {
+        "calls": calls,
+        "p50_ms": round(_percentile(latencies, 50), 4),
+        "p99_ms": round(_percentile(latencies, 99), 4),
+        "mean_ms": round(statistics.fmean(latencies), 4),
+        "queries_per_call": round(queries / calls, 2),
+    }
+
+
+def run(tables: int, days: int, per_day: int, calls: int, seed: int, db_path: str) -> Dict[str, object]:
+    generated = generate_restaurant(db_path, tables, days, per_day, seed)
+
+    from core.services.booking_service import BookingService
+    from core.services.table_service import TableService
+    from infrastructure.repositories.sql_reservation_repository import SQLReservationRepository
+    from infrastructure.repositories.sql_table_repository import SQLTableRepository
+
+    table_repo = SQLTableRepository()
+    reservation_repo = SQLReservationRepository()
+    holidays = NoHolidays()
+    booking_service = BookingService(reservation_repo, table_repo, holidays)
+    table_service = TableService(table_repo, holidays)
+
+    counter = QueryCounter()
+    counter.install()
+    rng = random.Random(seed)
+    # Los benchmarks trabajan sobre los próximos días, que ya tienen reservas generadas
+    future_days = opening_days(date.today() + timedelta(days=1), 28)
+
+    def random_slot():
+        return rng.choice(future_days), f"{rng.randint(13, 22):02d}:{rng.choice((0, 15, 30, 45)):02d}"
+
+    def random_search():
+        day, time_str = random_slot()
+        return rng.choice(GUESTS), rng.choice(LOCATIONS), day, time_str
+
+    phones = iter(range(10 ** 8, 2 * 10 ** 8))
+    created: List[tuple] = []
+    outcomes = {"create": 0, "create_ok": 0}
+
+    def prepare_create():
+        # Se elige la mesa con find_table (no se mide), como hace el agente
+        while True:
+            guests, location, day, time_str = random_search()
+            found = table_service.find_table(guests, location, day, time_str)
+            if found.get("success"):
+                table = found["available_tables"][0]
+                phone = str(next(phones))
+                return (table["id"], f"Bench {phone}", guests, day, time_str, phone, None,
+                        table.get("table_ids") if found["merged"] else None)
+
+    def create(*args):
+        result = booking_service.create_reservation(*args)
+        outcomes["create"] += 1
+        if result["success"]:
+            outcomes["create_ok"] += 1
+            created.append((args[5], args[3]))
+
+    def prepare_modify():
+        phone, day = rng.choice(created)
+        return phone, day, {"guests": rng.choice(GUESTS)}
+
+    def prepare_is_available():
+        day, time_str = random_slot()
+        return rng.randint(1, tables), day, time_str, 90
+
+    benchmarks = {
+        "TableService.find_table": (random_search, table_service.find_table),
+        "TableService.find_free_slots": (
+            lambda: (rng.choice(GUESTS), rng.choice(LOCATIONS), rng.choice(future_days)),
+            table_service.find_free_slots,
+        ),
+        "SQLTableRepository.is_table_available": (prepare_is_available, table_repo.is_table_available),
+        "BookingService.create_reservation": (prepare_create, create),
+        "BookingService.modify_reservation": (prepare_modify, booking_service.modify_reservation),
+    }
+    results = {name: measure(prepare, call, calls, counter) for name, (prepare, call) in benchmarks.items()}
+    results["BookingService.create_reservation"]["success_rate"] = round(
+        outcomes["create_ok"] / outcomes["create"], 3
+    )
+    return {"dataset": generated, "results": results}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict[str, object], baseline: Dict[str, object]) -> None:
+    """Imprime la variación de p50/p99 y sentencias por llamada respecto a una ejecución anterior."""
+    print(f"\nComparación con {baseline.get('commit') or 'la ejecución anterior'}:")
+    for name, result in current["results"].items():
+        old = baseline["results"].get(name)
+        if not old:
+            continue
+        deltas = []
+        for metric in ("p50_ms", "p99_ms", "queries_per_call"):
+            before, after = old[metric], result[metric]
+            change = (after - before) / before * 100 if before else 0.0
+            deltas.append(f"{metric} {before} -> {after} ({change:+.0f}%)")
+        print(f"  {name}: " + ", ".join(deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de los servicios de reservas con carga sintética")
+    parser.add_argument("--tables", type=int, default=200, help="Mesas del restaurante (50-500)")
+    parser.add_argument("--days", type=int, default=240, help="Días de reservas generadas")
+    parser.add_argument("--per-day", type=int, default=1000, help="Intentos de reserva por día")
+    parser.add_argument("--calls", type=int, default=500, help="Llamadas medidas por método")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Fichero JSON donde guardar los resultados")
+    parser.add_argument("--compare", help="JSON de una ejecución anterior con el que comparar")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.sqlite")
+        # Debe fijarse antes de importar la capa de infraestructura
+        os.environ["DATABASE_PATH"] = db_path
+        started = time.perf_counter()
+        report = run(args.tables, args.days, args.per_day, args.calls, args.seed, db_path)
+
+        from infrastructure.database.sql_connection import close_connections
+        close_connections()
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "params": vars(args) | {"output": None, "compare": None},
+        "elapsed_s": round(time.perf_counter() - started, 2),
+        **report,
+    }
+
+    dataset = report["dataset"]
+    print(f"Restaurante sintético: {dataset['tables']} mesas, {dataset['reservations']} reservas en {dataset['days']} días")
+    print(f"{'método':<42}{'p50 ms':>10}{'p99 ms':>10}{'SQL/llamada':>13}")
+    for name, result in report["results"].items():
+        print(f"{name:<42}{result['p50_ms']:>10.3f}{result['p99_ms']:>10.3f}{result['queries_per_call']:>13.2f}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(report, json.load(f))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
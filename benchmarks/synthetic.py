@@ -0,0 +1,152 @@
+"""Generador de restaurantes sintéticos para benchmarks.
+
+Crea una base de datos con N mesas en interior y terraza (con grafo de
+adyacencia por filas), meses de historial y reservas futuras, incluidas
+reservas de mesas combinadas, sin solapamientos. Las filas se insertan con
+executemany directamente, sin pasar por los servicios.
+
+Uso:
+    python -m benchmarks.synthetic restaurant.sqlite [--tables 200] [--days 240] [--per-day 1000]
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+from datetime import date, timedelta
+from typing import Dict, List, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LOCATIONS = ("interior", "terrace")
+CAPACITIES = (2, 2, 2, 4, 4, 4, 6, 8)
+# Mesas por fila: las mesas contiguas de una fila se pueden juntar
+ROW_LENGTH = 5
+# Proporción de reservas de grupos que ocupan dos mesas contiguas
+MERGED_RATIO = 0.1
+
+
+class NoHolidays:
+    """Repositorio de festivos vacío para benchmarks."""
+
+    def get_holiday_name(self, date_str):
+        return None
+
+    def get_holidays_between(self, start_date, end_date):
+        return {}
+
+
+def opening_days(start: date, days: int) -> List[str]:
+    """Fechas YYYY-MM-DD desde `start`, saltando los lunes (cerrado)."""
+    return [
+        (start + timedelta(days=i)).isoformat()
+        for i in range(days)
+        if (start + timedelta(days=i)).weekday() != 0
+    ]
+
+
+def generate_tables(n_tables: int, rng: random.Random) -> Tuple[List[tuple], List[tuple]]:
+    """Devuelve (mesas, adyacencias). 2/3 de las mesas en interior."""
+    tables = []
+    adjacency = []
+    for table_id in range(1, n_tables + 1):
+        location = LOCATIONS[0] if table_id <= n_tables * 2 // 3 else LOCATIONS[1]
+        tables.append((table_id, rng.choice(CAPACITIES), location))
+        previous = table_id - 1
+        if previous >= 1 and (table_id - 1) % ROW_LENGTH and tables[previous - 1][2] == location:
+            adjacency.append((previous, table_id))
+    return tables, adjacency
+
+
+def generate_day(day: str, tables: List[tuple], adjacency: List[tuple], per_day: int,
+                 rng: random.Random, first_id: int) -> List[tuple]:
+    """
+    Reservas de un día sin solapamientos: cada mesa guarda el minuto en que
+    queda libre y las reservas se colocan en orden de hora de inicio.
+    """
+    from core.utils.reservation_utils import estimate_duration
+
+    free_at: Dict[int, int] = {t[0]: 0 for t in tables}
+    capacity = {t[0]: t[1] for t in tables}
+    starts = sorted(rng.randrange(13 * 60, 22 * 60 + 1, 15) for _ in range(per_day))
+    rows = []
+    next_id = first_id
+    for start in starts:
+        if adjacency and rng.random() < MERGED_RATIO:
+            a, b = rng.choice(adjacency)
+            guests = rng.randint(max(capacity[a], capacity[b]) + 1, capacity[a] + capacity[b])
+            table_ids = [a, b]
+        else:
+            table_id = rng.choice(tables)[0]
+            guests = rng.randint(1, capacity[table_id])
+            table_ids = [table_id]
+        if any(free_at[tid] > start for tid in table_ids):
+            continue
+        time = f"{start // 60:02d}:{start % 60:02d}"
+        duration = estimate_duration(guests, time)
+        for tid in table_ids:
+            free_at[tid] = start + duration
+        rows.append((
+            next_id, table_ids[0], f"Cliente {next_id}", guests, day,
+            time, f"6{next_id:08d}", duration,
+            None, None, json.dumps(table_ids) if len(table_ids) > 1 else None,
+        ))
+        next_id += 1
+    return rows
+
+
+def generate_restaurant(db_path: str, n_tables: int = 200, days: int = 240, per_day: int = 1000,
+                        seed: int = 42, future_days: int = 30) -> Dict[str, int]:
+    """
+    Crea una base de datos nueva con un restaurante sintético.
+    Las fechas van de `days - future_days` días atrás a `future_days` días en el futuro.
+
+    Returns:
+        Resumen con el número de mesas, días y reservas generadas
+    """
+    from infrastructure.database.migrations import migrate
+    from infrastructure.database.schema import POPULATE_RESERVATION_TABLES
+
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    migrate(conn)
+    tables, adjacency = generate_tables(n_tables, rng)
+    conn.executemany("INSERT INTO tables (id, capacity, location) VALUES (?, ?, ?)", tables)
+    conn.executemany("INSERT INTO table_adjacency (table_id, adjacent_table_id) VALUES (?, ?)", adjacency)
+
+    start = date.today() - timedelta(days=days - future_days)
+    next_id = 1
+    for day in opening_days(start, days):
+        rows = generate_day(day, tables, adjacency, per_day, rng, next_id)
+        conn.executemany(
+            """INSERT INTO reservations (id, table_id, name, guests, date, time, phone, duration,
+                                         notes, calendar_event_id, merged_tables)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            rows,
+        )
+        next_id += len(rows)
+    conn.execute(POPULATE_RESERVATION_TABLES)
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+    return {"tables": n_tables, "days": days, "reservations": next_id - 1}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera un restaurante sintético para benchmarks")
+    parser.add_argument("db_path")
+    parser.add_argument("--tables", type=int, default=200)
+    parser.add_argument("--days", type=int, default=240)
+    parser.add_argument("--per-day", type=int, default=1000, help="Intentos de reserva por día")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if os.path.exists(args.db_path):
+        sys.exit(f"{args.db_path} ya existe")
+    summary = generate_restaurant(args.db_path, args.tables, args.days, args.per_day, args.seed)
+    print(f"✅ {summary['reservations']} reservas en {summary['tables']} mesas y {summary['days']} días: {args.db_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,374 @@
-import sqlite3
-import pandas as pd
+"""Inspector de la base de datos.
+
+Nunca carga una tabla completa en memoria: las filas se leen con fetchmany en
+bloques y se escriben según llegan, y la paginación es por clave (rowid), así
+que pedir la página 1000 cuesta lo mismo que pedir la primera.
+
+    python check_db.py                                  # tablas y número de filas
+    python check_db.py show reservations --limit 20     # primera página
+    python check_db.py show reservations --after 1520   # página siguiente (la indica la anterior)
+    python check_db.py show reservations --desc         # las más recientes
+    python check_db.py show reservations --from 2025-10-01 --to 2025-10-31 --where guests>=6
+    python check_db.py show reservations --where phone=600123123 --columns id,date,time,guests
+    python check_db.py show reservations --all --format csv > reservas.csv
+    python check_db.py show waitlist --where status=waiting --count
+    python check_db.py summary                          # tamaños, índices y planes de consulta
+
+La base de datos se abre en solo lectura (DATABASE_PATH o --db).
+"""
+import argparse
+import csv
+import json
 import os
+import re
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
 from dotenv import load_dotenv
 
 load_dotenv()
 
+from core.domain.booking_date import parse_date
+
 # Obtener la ruta de la base de datos desde .env
 DB_PATH = os.getenv("DATABASE_PATH", "db/restaurant.sqlite")
+# Filas por página cuando no se pide --all
+PAGE_SIZE = 50
+# Filas leídas de SQLite en cada bloque
+FETCH_SIZE = 500
+# Ancho máximo de una columna en el formato texto
+MAX_TEXT_WIDTH = 40
+
+# Filtros --where: columna, operador y valor (~ = contiene)
+_FILTER = re.compile(r"^(\w+)\s*(!=|>=|<=|=|>|<|~)\s*(.*)$")
+_OPERATORS = {"=": "=", "!=": "!=", ">": ">", ">=": ">=", "<": "<", "<=": "<=", "~": "LIKE"}
+
+# Consultas habituales de la aplicación, para comprobar qué índice usa cada una (summary)
+TYPICAL_QUERIES = [
+    ("Ocupación de un día", "reservation_tables",
+     "SELECT reservation_id, table_id, start_minute, end_minute FROM reservation_tables WHERE date = ?"),
+    ("Solapamiento al reservar", "reservation_tables",
+     """SELECT table_id FROM reservation_tables
+        WHERE table_id IN (?, ?) AND date = ? AND start_minute < ? AND end_minute > ? LIMIT 1"""),
+    ("Ocupación de un rango (next_available, informes)", "reservation_tables",
+     "SELECT date, table_id, start_minute, end_minute FROM reservation_tables WHERE date BETWEEN ? AND ?"),
+    ("Reserva por teléfono y fecha", "reservations",
+     "SELECT * FROM reservations WHERE phone = ? AND date = ?"),
+    ("Exportación por fechas", "reservations",
+     "SELECT * FROM reservations WHERE date >= ? AND date <= ? ORDER BY date, time, id"),
+    ("Evento de calendario de una reserva", "calendar_outbox",
+     """SELECT calendar_event_id FROM calendar_outbox
+        WHERE reservation_id = ? AND status = 'done' AND operation = 'create' ORDER BY id DESC LIMIT 1"""),
+    ("Outbox de calendario pendiente", "calendar_outbox",
+     "SELECT * FROM calendar_outbox WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY id"),
+    ("Lista de espera de una franja", "waitlist",
+     "SELECT * FROM waitlist WHERE date = ? AND location = ? AND status = 'waiting' ORDER BY created_at"),
+    ("Pedidos de un cliente", "orders",
+     "SELECT * FROM orders WHERE customer_phone = ?"),
+]
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """Abre la base de datos en solo lectura (no la crea si no existe)."""
+    if not os.path.exists(db_path):
+        raise SystemExit(f"⚠️ No existe la base de datos: {db_path}")
+    return sqlite3.connect(Path(db_path).absolute().as_uri() + "?mode=ro", uri=True)
+
+
+def table_names(conn: sqlite3.Connection) -> List[str]:
+    rows = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+    ).fetchall()
+    return [r[0] for r in rows]
 
-print(f"Conectando a: {DB_PATH}\n")
 
-# Conectar a la base de datos
-conn = sqlite3.connect(DB_PATH)
+def table_columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [r[1] for r in conn.execute(f"PRAGMA table_info({_quote(table)})")]
 
-# Obtener todas las tablas
-tables = pd.read_sql_query("SELECT name FROM sqlite_master WHERE type='table';", conn)
-print("=== TABLAS ENCONTRADAS ===")
-print(tables, "\n")
 
-# Mostrar todas las filas de cada tabla
-for t in tables["name"]:
-    print(f"==================== {t.upper()} ====================")
+def count_rows(conn: sqlite3.Connection, table: str, where: str = "", params: tuple = ()) -> int:
+    return conn.execute(f"SELECT COUNT(*) FROM {_quote(table)}{where}", params).fetchone()[0]
+
+
+# ============================================================
+# FILTROS Y PAGINACIÓN
+# ============================================================
+def build_filters(columns: List[str], filters: List[str], date_column: str,
+                  date_from: Optional[str], date_to: Optional[str]) -> Tuple[List[str], List[str]]:
+    """
+    Convierte los filtros de la línea de comandos en condiciones SQL con
+    parámetros. Los nombres de columna se validan contra la tabla.
+
+    Returns:
+        (condiciones, parámetros)
+    """
+    conditions, params = [], []
+    for f in filters:
+        match = _FILTER.match(f)
+        if not match:
+            raise SystemExit(f"⚠️ Filtro no válido: {f} (usa columna=valor, !=, >, >=, <, <= o ~ para 'contiene')")
+        column, operator, value = match.groups()
+        if column not in columns:
+            raise SystemExit(f"⚠️ La columna {column} no existe. Columnas: {', '.join(columns)}")
+        conditions.append(f"{_quote(column)} {_OPERATORS[operator]} ?")
+        params.append(f"%{value}%" if operator == "~" else value)
+
+    if date_from or date_to:
+        if date_column not in columns:
+            raise SystemExit(f"⚠️ La tabla no tiene columna {date_column}; indica otra con --date-column")
+        try:
+            if date_from:
+                conditions.append(f"{_quote(date_column)} >= ?")
+                params.append(parse_date(date_from).isoformat())
+            if date_to:
+                conditions.append(f"{_quote(date_column)} <= ?")
+                params.append(parse_date(date_to).isoformat())
+        except ValueError as e:
+            raise SystemExit(f"⚠️ {e}")
+    return conditions, params
+
+
+def iter_page(conn: sqlite3.Connection, table: str, columns: List[str], conditions: List[str], params: List[str],
+              after: Optional[int], limit: Optional[int], descending: bool,
+              fetch_size: int = FETCH_SIZE) -> Iterator[List[tuple]]:
+    """
+    Genera las filas de una página en bloques de `fetch_size`. Cada fila lleva
+    delante su rowid, que es la clave de paginación: la siguiente página
+    empieza después del último rowid devuelto, sin OFFSET.
+    """
+    conditions = list(conditions)
+    params = list(params)
+    if after is not None:
+        conditions.append("rowid < ?" if descending else "rowid > ?")
+        params.append(after)
+    sql = f"SELECT rowid, {', '.join(_quote(c) for c in columns)} FROM {_quote(table)}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY rowid" + (" DESC" if descending else "")
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+
+    cur = conn.execute(sql, params)
     try:
-        df = pd.read_sql_query(f"SELECT * FROM {t};", conn)
-        if df.empty:
-            print("(La tabla está vacía)\n")
+        while True:
+            rows = cur.fetchmany(fetch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cur.close()
+
+
+# ============================================================
+# SALIDA
+# ============================================================
+class RowWriter:
+    """Escribe filas en texto alineado, CSV o JSONL sin acumularlas."""
+
+    def __init__(self, out, fmt: str, columns: List[str]):
+        self.out = out
+        self.fmt = fmt
+        self.columns = columns
+        self.widths: Optional[List[int]] = None
+        if fmt == "csv":
+            self._csv = csv.writer(out)
+            self._csv.writerow(columns)
+
+    def write(self, rows: List[tuple]) -> None:
+        if self.fmt == "csv":
+            self._csv.writerows(rows)
+        elif self.fmt == "jsonl":
+            for row in rows:
+                self.out.write(json.dumps(dict(zip(self.columns, row)), ensure_ascii=False) + "\n")
         else:
-            print(df.to_string(index=False), "\n")
-    except Exception as e:
-        print(f"(Error leyendo {t}: {e})\n")
+            self._write_text(rows)
+
+    def _write_text(self, rows: List[tuple]) -> None:
+        cells = [[self._cell(v) for v in row] for row in rows]
+        if self.widths is None:
+            # Anchos calculados con el primer bloque; los siguientes los reutilizan
+            self.widths = [
+                max([len(c)] + [len(row[i]) for row in cells])
+                for i, c in enumerate(self.columns)
+            ]
+            self.out.write("  ".join(c.ljust(w) for c, w in zip(self.columns, self.widths)).rstrip() + "\n")
+            self.out.write("  ".join("-" * w for w in self.widths) + "\n")
+        for row in cells:
+            self.out.write("  ".join(c.ljust(w) for c, w in zip(row, self.widths)).rstrip() + "\n")
+
+    @staticmethod
+    def _cell(value) -> str:
+        text = "NULL" if value is None else str(value).replace("\n", " ")
+        return text if len(text) <= MAX_TEXT_WIDTH else text[:MAX_TEXT_WIDTH - 1] + "…"
+
 
-conn.close()
+# ============================================================
+# COMANDOS
+# ============================================================
+def cmd_tables(conn: sqlite3.Connection) -> int:
+    names = table_names(conn)
+    if not names:
+        print("(La base de datos no tiene tablas; ejecuta init_db.py)")
+        return 0
+    width = max(len(n) for n in names)
+    print("=== TABLAS ENCONTRADAS ===")
+    for name in names:
+        print(f"{name.ljust(width)}  {count_rows(conn, name):>10} filas")
+    print("\nUsa 'python check_db.py show <tabla>' para ver filas y 'summary' para tamaños e índices.")
+    return 0
+
+
+def cmd_show(conn: sqlite3.Connection, args) -> int:
+    if args.table not in table_names(conn):
+        raise SystemExit(f"⚠️ La tabla {args.table} no existe. Tablas: {', '.join(table_names(conn))}")
+    all_columns = table_columns(conn, args.table)
+    columns = all_columns
+    if args.columns:
+        columns = [c.strip() for c in args.columns.split(",") if c.strip()]
+        unknown = [c for c in columns if c not in all_columns]
+        if unknown:
+            raise SystemExit(f"⚠️ Columnas desconocidas: {', '.join(unknown)}. Columnas: {', '.join(all_columns)}")
+
+    conditions, params = build_filters(all_columns, args.where, args.date_column, args.date_from, args.date_to)
+    if args.count:
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        print(count_rows(conn, args.table, where, tuple(params)))
+        return 0
+
+    limit = None if args.all else args.limit
+    writer = RowWriter(sys.stdout, args.format, columns)
+    written, last_key = 0, None
+    for rows in iter_page(conn, args.table, columns, conditions, params, args.after, limit, args.desc, args.fetch_size):
+        writer.write([row[1:] for row in rows])
+        written += len(rows)
+        last_key = rows[-1][0]
+
+    if written == 0:
+        print("(Sin filas)", file=sys.stderr)
+    elif limit is not None and written == limit:
+        # Puede haber más: la siguiente página empieza tras la última clave
+        print(f"\n{written} filas. Siguiente página: --after {last_key}", file=sys.stderr)
+    else:
+        print(f"\n{written} filas.", file=sys.stderr)
+    return 0
+
+
+def cmd_summary(conn: sqlite3.Connection, db_path: str) -> int:
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    print("=== BASE DE DATOS ===")
+    print(f"Fichero:          {db_path} ({_size(os.path.getsize(db_path))})")
+    print(f"Versión esquema:  {conn.execute('PRAGMA user_version').fetchone()[0]}")
+    print(f"Modo de diario:   {conn.execute('PRAGMA journal_mode').fetchone()[0]}")
+    print(f"Páginas:          {page_count} de {page_size} B, {freelist} libres ({_size(freelist * page_size)} recuperables con VACUUM)")
+
+    sizes = _object_sizes(conn)
+    names = table_names(conn)
+    # PRAGMA index_list: (seq, nombre, único, origen, parcial); los únicos imponen una restricción
+    indexes = {name: sorted((r[1], bool(r[2])) for r in conn.execute(f"PRAGMA index_list({_quote(name)})"))
+               for name in names}
+
+    print("\n=== TABLAS ===")
+    width = max([len(n) for n in names] + [len(i) + 4 for idx in indexes.values() for i, _ in idx] + [5])
+    for name in names:
+        size = _size(sizes[name]) if sizes is not None else "n/d"
+        print(f"{name.ljust(width)}  {count_rows(conn, name):>10} filas  {size:>10}")
+        for index, unique in indexes[name]:
+            size = _size(sizes.get(index, 0)) if sizes is not None else "n/d"
+            label = f"  · {index}"
+            print(f"{label.ljust(width)}  {'(único)' if unique else '':>16}  {size:>10}")
+    if sizes is None:
+        print("(Tamaño por tabla no disponible: este SQLite no incluye la tabla virtual dbstat)")
+
+    print("\n=== PLANES DE LAS CONSULTAS HABITUALES ===")
+    used = set()
+    for description, table, sql in TYPICAL_QUERIES:
+        if table not in names:
+            continue
+        plan = [r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, [None] * sql.count("?"))]
+        used.update(_plan_indexes(plan))
+        full_scan = any(step.startswith("SCAN ") and " USING " not in step for step in plan)
+        print(f"{'⚠️' if full_scan else '✅'} {description}")
+        for step in plan:
+            print(f"     {step}")
+
+    unused = [i for table in names for i, unique in indexes[table] if i not in used and not unique]
+    if unused:
+        print("\nÍndices que no usa ninguna de estas consultas (revisar si siguen siendo necesarios):")
+        for index in unused:
+            print(f"  · {index}")
+    return 0
+
+
+def _object_sizes(conn: sqlite3.Connection) -> Optional[Dict[str, int]]:
+    """Bytes ocupados por cada tabla e índice (None si SQLite no tiene dbstat)."""
+    try:
+        return {name: size for name, size in conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name")}
+    except sqlite3.OperationalError:
+        return None
+
+
+def _plan_indexes(plan: List[str]) -> List[str]:
+    return re.findall(r"USING (?:COVERING )?INDEX (\w+)", " ".join(plan))
+
+
+def _size(n: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if n < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Inspector de la base de datos (solo lectura)")
+    parser.add_argument("--db", default=DB_PATH, help="Ruta de la base de datos (por defecto DATABASE_PATH)")
+    sub = parser.add_subparsers(dest="command")
+
+    sub.add_parser("tables", help="Tablas y número de filas (por defecto)")
+
+    show = sub.add_parser("show", help="Filas de una tabla, paginadas o en streaming")
+    show.add_argument("table")
+    show.add_argument("--columns", help="Columnas separadas por comas")
+    show.add_argument("--where", action="append", default=[],
+                      help="Filtro columna=valor (también !=, >, >=, <, <= y ~ para 'contiene'); se puede repetir")
+    show.add_argument("--from", dest="date_from", help="Fecha inicial (incluida)")
+    show.add_argument("--to", dest="date_to", help="Fecha final (incluida)")
+    show.add_argument("--date-column", default="date", help="Columna a la que se aplican --from/--to")
+    show.add_argument("--limit", type=int, default=PAGE_SIZE, help="Filas por página")
+    show.add_argument("--after", type=int, help="Empezar tras este rowid (lo indica la página anterior)")
+    show.add_argument("--desc", action="store_true", help="De las más recientes a las más antiguas")
+    show.add_argument("--all", action="store_true", help="Todas las filas, en streaming")
+    show.add_argument("--count", action="store_true", help="Solo contar las filas que cumplen los filtros")
+    show.add_argument("--format", choices=["text", "csv", "jsonl"], default="text")
+    show.add_argument("--fetch-size", type=int, default=FETCH_SIZE, help="Filas leídas por bloque")
+
+    sub.add_parser("summary", help="Tamaño de tablas e índices y plan de las consultas habituales")
+
+    args = parser.parse_args(argv)
+    conn = connect(args.db)
+    try:
+        if args.command == "show":
+            return cmd_show(conn, args)
+        if args.command == "summary":
+            return cmd_summary(conn, args.db)
+        print(f"Conectando a: {args.db}\n")
+        return cmd_tables(conn)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except BrokenPipeError:
+        # Salida cortada (p. ej. con | head): no es un error
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(0)
@@ -1,19 +1,91 @@
 from core.domain.holiday_repository import HolidayRepository
-from datetime import date, datetime
+from datetime import date, datetime, time
+from functools import lru_cache
 from dotenv import load_dotenv
 import json
 import os
+import re
 
 load_dotenv()
 OPEN_TIME = os.getenv("OPEN_TIME", "09:00")
 CLOSE_TIME = os.getenv("CLOSE_TIME", "00:00")
 MAX_BOOKING_TIME = os.getenv("MAX_BOOKING_TIME", "22:00")
 
+# Formatos de fecha aceptados: DD/MM/YYYY, DD-MM-YYYY, YYYY/MM/DD y YYYY-MM-DD
+_DAY_FIRST = re.compile(r"(\d{1,2})([/-])(\d{1,2})\2(\d{4})")
+_YEAR_FIRST = re.compile(r"(\d{4})([/-])(\d{1,2})\2(\d{1,2})")
+_TIME = re.compile(r"(\d{1,2}):(\d{1,2})")
+# Número de fechas/horas distintas que se recuerdan ya convertidas
+PARSE_CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_date(date_str: str) -> date:
+    """Convierte una fecha en cualquiera de los formatos aceptados a objeto date."""
+    match = _YEAR_FIRST.fullmatch(date_str)
+    if match:
+        year, _, month, day = match.groups()
+    else:
+        match = _DAY_FIRST.fullmatch(date_str)
+        if not match:
+            raise ValueError(f"Formato de fecha no válido: {date_str}")
+        day, _, month, year = match.groups()
+    try:
+        return date(int(year), int(month), int(day))
+    except ValueError:
+        raise ValueError(f"Formato de fecha no válido: {date_str}") from None
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_time(time_str: str) -> time:
+    """Convierte una hora HH:MM a objeto time."""
+    match = _TIME.fullmatch(time_str)
+    if not match:
+        raise ValueError(f"Formato de hora no válido: {time_str}")
+    try:
+        return time(int(match.group(1)), int(match.group(2)))
+    except ValueError:
+        raise ValueError(f"Formato de hora no válido: {time_str}") from None
+
+
+class OpeningHours:
+    """
+    Horario de un restaurante. La ventana de reservas se calcula una sola vez.
+    MAX_BOOKING_TIME = 00:00 significa "hasta el final del día".
+    """
+
+    __slots__ = ("open_time", "close_time", "max_booking_time", "_open", "_last_booking", "until_midnight", "window")
+
+    def __init__(self, open_time: str = "09:00", close_time: str = "00:00", max_booking_time: str = "22:00"):
+        self.open_time = open_time
+        self.close_time = close_time
+        self.max_booking_time = max_booking_time
+        self._open = parse_time(open_time)
+        self._last_booking = parse_time(max_booking_time)
+        self.until_midnight = self._last_booking == time(0, 0)
+        # Primera y última hora de reserva del día, en minutos desde medianoche
+        self.window = (
+            self._open.hour * 60 + self._open.minute,
+            23 * 60 + 59 if self.until_midnight else self._last_booking.hour * 60 + self._last_booking.minute,
+        )
+
+    def allows(self, t: time) -> bool:
+        """Indica si se puede reservar a la hora `t`."""
+        if self.until_midnight:
+            return t >= self._open
+        return self._open <= t <= self._last_booking
+
+
+# Horario de la configuración global (.env), usado cuando el restaurante no define el suyo
+DEFAULT_OPENING_HOURS = OpeningHours(OPEN_TIME, CLOSE_TIME, MAX_BOOKING_TIME)
+
 class BookingDate:
-    def __init__(self, date_str: str, time_str: str, holiday_repo: HolidayRepository):
+    def __init__(self, date_str: str, time_str: str, holiday_repo: HolidayRepository,
+                 opening_hours: OpeningHours = DEFAULT_OPENING_HOURS):
         self.date_str = date_str
         self.time_str = time_str
         self.holiday_repo = holiday_repo
+        self.opening_hours = opening_hours
         
         self.date = self._parse_date(date_str)
         self.time = self._parse_time(time_str)
@@ -31,22 +103,16 @@ class BookingDate:
         if self._is_closed_day():
             return f"El restaurante está cerrado por descanso el {normalized}. Los lunes no abrimos."
         if not self._is_within_opening_hours():
-            return f"El restaurante está cerrado a las {self.time_str}. Nuestro horario de reserva es de {OPEN_TIME} a {MAX_BOOKING_TIME}."
+            return f"El restaurante está cerrado a las {self.time_str}. Nuestro horario de reserva es de {self.opening_hours.open_time} a {self.opening_hours.max_booking_time}."
         return None
 
     def _parse_date(self, date_str: str) -> datetime.date:
         """Normaliza y convierte la fecha a objeto date."""
-        # Intentar varios formatos
-        for fmt in ("%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d", "%Y-%m-%d"):
-            try:
-                return datetime.strptime(date_str, fmt).date()
-            except ValueError:
-                continue
-        raise ValueError(f"Formato de fecha no válido: {date_str}")
+        return parse_date(date_str)
 
     def _parse_time(self, time_str: str) -> datetime.time:
         """Convierte una hora normalizada (HH:MM) a objeto time."""
-        return datetime.strptime(time_str, "%H:%M").time()
+        return parse_time(time_str)
     
     def _is_closed_day(self) -> bool:
         # El restaurante está cerrado el lunes
@@ -58,14 +124,12 @@ class BookingDate:
         Maneja el caso especial donde CLOSE_TIME es 00:00 (medianoche),
         que significa el final del día (23:59:59).
         """
-        open_time = datetime.strptime(OPEN_TIME, "%H:%M").time()
-        close_time = datetime.strptime(MAX_BOOKING_TIME, "%H:%M").time()
-        
-        if close_time == datetime.strptime("00:00", "%H:%M").time():
-            return self.time >= open_time
-
-        return open_time <= self.time <= close_time
+        return self.opening_hours.allows(self.time)
+    
+    def booking_window(self) -> tuple[int, int]:
+        """Devuelve la primera y la última hora de reserva del día, en minutos desde medianoche."""
+        return self.opening_hours.window
     
     def normalized_date(self) -> str:
         """Devuelve la fecha normalizada en formato YYYY-MM-DD."""
-        return self.date.strftime("%Y-%m-%d")
\ No newline at end of file
+        return self.date.isoformat()
\ No newline at end of file
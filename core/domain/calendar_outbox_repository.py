@@ -0,0 +1,54 @@
+"""Interfaz abstracta para la cola (outbox) de sincronización con el calendario."""
+from abc import ABC, abstractmethod
+from typing import Optional, Dict, Any, List
+
+
+class CalendarOutboxRepository(ABC):
+    """
+    Contrato para la cola persistente de operaciones de calendario.
+
+    Las entradas se escriben en la misma transacción que la reserva y un
+    proceso en segundo plano las envía al calendario externo.
+    """
+    
+    @abstractmethod
+    def enqueue(self, reservation_id: int, operation: str, payload: Dict[str, Any]) -> int:
+        """
+        Añade una operación pendiente ('create', 'update' o 'delete').
+        
+        Returns:
+            ID de la entrada creada
+        """
+        pass
+    
+    @abstractmethod
+    def fetch_due(self, now: float, limit: int) -> List[Dict[str, Any]]:
+        """
+        Devuelve las entradas pendientes cuyo reintento ya toca, en orden de
+        creación. No devuelve una entrada mientras haya otra anterior pendiente
+        de la misma reserva, para respetar el orden crear -> modificar -> borrar.
+        """
+        pass
+    
+    @abstractmethod
+    def created_event_id(self, reservation_id: int) -> Optional[str]:
+        """ID del evento creado por el outbox para una reserva (None si no existe)."""
+        pass
+    
+    @abstractmethod
+    def mark_done(self, entry_id: int, calendar_event_id: Optional[str] = None) -> None:
+        pass
+    
+    @abstractmethod
+    def mark_retry(self, entry_id: int, error: str, next_attempt_at: float) -> None:
+        pass
+    
+    @abstractmethod
+    def mark_failed(self, entry_id: int, error: str) -> None:
+        """Descarta definitivamente una entrada tras agotar los reintentos."""
+        pass
+    
+    @abstractmethod
+    def purge_done(self, older_than: float) -> int:
+        """Elimina las entradas completadas antes de `older_than`. Devuelve cuántas."""
+        pass
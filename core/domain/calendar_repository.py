@@ -1,6 +1,6 @@
 """Interfaz abstracta para repositorios de calendario."""
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 
 class CalendarRepository(ABC):
@@ -13,7 +13,8 @@ class CalendarRepository(ABC):
         description: str,
         start_datetime: str,
         end_datetime: str,
-        attendee_email: Optional[str] = None
+        attendee_email: Optional[str] = None,
+        event_id: Optional[str] = None
     ) -> Optional[str]:
         """
         Crea un evento en el calendario.
@@ -24,6 +25,8 @@ class CalendarRepository(ABC):
             start_datetime: Fecha/hora inicio (ISO 8601)
             end_datetime: Fecha/hora fin (ISO 8601)
             attendee_email: Email del invitado (opcional)
+            event_id: ID que se asigna al evento (opcional). Si ya existe un evento
+                con ese ID se da por creado, así que repetir la llamada no lo duplica
             
         Returns:
             ID del evento creado o None si falla
@@ -79,3 +82,49 @@ class CalendarRepository(ABC):
             Diccionario con los datos del evento o None si no existe
         """
         pass
+    
+    def is_available(self) -> bool:
+        """
+        Indica si merece la pena llamar al calendario ahora. Las implementaciones
+        con circuit breaker devuelven False mientras el circuito está abierto.
+        """
+        return True
+    
+    # ============================================================
+    # OPERACIONES EN LOTE
+    # ============================================================
+    # Implementación por defecto: una llamada por evento. Los calendarios con
+    # API de lotes (Google) las sobrescriben para enviar una sola petición.
+    
+    def create_events(self, events: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """
+        Crea varios eventos.
+        
+        Args:
+            events: Lista de diccionarios con los argumentos de create_event
+            
+        Returns:
+            IDs de los eventos creados, en el mismo orden (None en los que fallen)
+        """
+        return [self.create_event(**event) for event in events]
+    
+    def update_events(self, updates: List[Dict[str, Any]]) -> List[bool]:
+        """
+        Actualiza varios eventos.
+        
+        Args:
+            updates: Lista de diccionarios con los argumentos de update_event (incluido event_id)
+            
+        Returns:
+            True/False por evento, en el mismo orden
+        """
+        return [self.update_event(**update) for update in updates]
+    
+    def delete_events(self, event_ids: List[str]) -> List[bool]:
+        """
+        Elimina varios eventos.
+        
+        Returns:
+            True/False por evento, en el mismo orden
+        """
+        return [self.delete_event(event_id) for event_id in event_ids]
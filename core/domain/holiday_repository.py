@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import Dict
 
 class HolidayRepository(ABC):
     """Contrato para cualquier fuente de datos de festivos."""
@@ -6,3 +7,8 @@ class HolidayRepository(ABC):
     @abstractmethod
     def get_holiday_name(self, date_str: str) -> str | None:
         pass
+    
+    @abstractmethod
+    def get_holidays_between(self, start_date: str, end_date: str) -> Dict[str, str]:
+        """Devuelve {fecha: nombre} de los festivos entre dos fechas YYYY-MM-DD (ambas incluidas)."""
+        pass
@@ -1,5 +1,17 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
+
+
+class DuplicateReservationError(Exception):
+    """Ya existe una reserva con el mismo teléfono para esa fecha."""
+
+
+class TableUnavailableError(Exception):
+    """Una de las mesas se ha ocupado antes de poder confirmar la reserva."""
+
+    def __init__(self, table_id: int):
+        super().__init__(f"La mesa {table_id} no está disponible")
+        self.table_id = table_id
 
 
 class ReservationRepository(ABC):
@@ -15,6 +27,34 @@ class ReservationRepository(ABC):
         """Inserta una nueva reserva."""
         pass
     
+    @abstractmethod
+    def insert_if_available(self, reservation, table_ids: List[int]) -> int:
+        """
+        Inserta la reserva de forma atómica solo si no hay otra con el mismo
+        teléfono ese día y todas las mesas siguen libres en su franja.
+        
+        Returns:
+            ID de la reserva creada
+            
+        Raises:
+            DuplicateReservationError: Si ya hay una reserva con ese teléfono y fecha
+            TableUnavailableError: Si alguna mesa está ocupada en esa franja
+        """
+        pass
+    
+    @abstractmethod
+    def atomic(self):
+        """
+        Context manager que agrupa varias escrituras en una única transacción
+        (p. ej. la reserva y su entrada en el outbox del calendario).
+        """
+        pass
+    
+    @abstractmethod
+    def set_calendar_event_id(self, reservation_id: int, calendar_event_id: str) -> None:
+        """Guarda el ID del evento de calendario asociado a una reserva."""
+        pass
+    
     @abstractmethod
     def delete_by_phone_and_date(self, phone: str, date: str) -> None:
         """Elimina una reserva por teléfono y fecha."""
@@ -22,5 +62,32 @@ class ReservationRepository(ABC):
     
     @abstractmethod
     def update(self, phone: str, date: str, updates: Dict[str, Any]) -> None:
-        """Actualiza una reserva existente."""
+        """
+        Actualiza una reserva existente.
+
+        Raises:
+            DuplicateReservationError: Si la nueva fecha ya tiene una reserva con ese teléfono
+        """
+        pass
+    
+    @abstractmethod
+    def update_if_available(self, phone: str, date: str, updates: Dict[str, Any]) -> None:
+        """
+        Actualiza la reserva de forma atómica solo si todas sus mesas (las
+        nuevas, si cambian) siguen libres en la fecha, hora y duración
+        resultantes. La propia reserva no cuenta como ocupación.
+        
+        Raises:
+            DuplicateReservationError: Si la nueva fecha ya tiene una reserva con ese teléfono
+            TableUnavailableError: Si alguna mesa está ocupada en esa franja
+        """
+        pass
+    
+    @abstractmethod
+    def get_table_usage_between(self, start_date: str, end_date: str) -> List[Tuple[str, int, int, int, int, int]]:
+        """
+        Ocupación de mesas de las reservas de un rango de fechas (ambas incluidas),
+        una tupla por mesa y reserva: (fecha, mesa, inicio, fin, comensales,
+        ID de la reserva). Inicio y fin en minutos desde medianoche.
+        """
         pass
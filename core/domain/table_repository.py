@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Set, Tuple
 
 
 class TableRepository(ABC):
@@ -20,6 +20,26 @@ class TableRepository(ABC):
         """Verifica si una mesa está disponible en una fecha/hora específica."""
         pass
     
+    @abstractmethod
+    def available_tables(self, location: str, date: str, time: str, duration: int, min_capacity: int = 1) -> List[Dict[str, Any]]:
+        """Obtiene todas las mesas libres de una ubicación para una franja horaria, ordenadas por capacidad."""
+        pass
+    
+    @abstractmethod
+    def get_occupancy(self, date: str) -> Dict[int, List[Tuple[int, int]]]:
+        """Obtiene los intervalos ocupados [inicio, fin) de cada mesa en una fecha, en minutos desde medianoche."""
+        pass
+    
+    @abstractmethod
+    def get_occupancy_between(self, start_date: str, end_date: str) -> Dict[str, Dict[int, List[Tuple[int, int]]]]:
+        """Obtiene los intervalos ocupados de cada mesa en cada fecha del rango (ambas incluidas): {fecha: {mesa: intervalos}}."""
+        pass
+    
+    @abstractmethod
+    def get_adjacency(self) -> Dict[int, Set[int]]:
+        """Obtiene el grafo mesa -> mesas con las que se puede juntar (vacío si no hay restricciones)."""
+        pass
+    
     @abstractmethod
     def get_all_available(self) -> List[Dict[str, Any]]:
         """Obtiene todas las mesas disponibles."""
@@ -0,0 +1,69 @@
+"""Interfaz abstracta para la lista de espera."""
+from abc import ABC, abstractmethod
+from typing import Optional, Dict, Any, List
+
+
+class DuplicateWaitlistEntryError(Exception):
+    """Ya hay una entrada activa en la lista de espera para ese teléfono y fecha."""
+
+    def __init__(self, phone: str):
+        super().__init__(phone)
+        self.phone = phone
+
+
+class WaitlistRepository(ABC):
+    """
+    Contrato para la lista de espera.
+
+    Cada entrada guarda fecha, ubicación, comensales y la ventana horaria
+    aceptable (minutos desde medianoche). Estados: 'waiting', 'offered'
+    (se le ha ofrecido una hora), 'booked' y 'cancelled'.
+    """
+
+    @abstractmethod
+    def add(self, name: str, phone: str, guests: int, date: str, location: str,
+            earliest_minute: int, latest_minute: int, auto_book: bool = False,
+            notes: Optional[str] = None) -> int:
+        """
+        Añade una entrada en espera.
+
+        Returns:
+            ID de la entrada
+
+        Raises:
+            DuplicateWaitlistEntryError: Si el teléfono ya espera para esa fecha
+        """
+        pass
+
+    @abstractmethod
+    def find_active(self, phone: str, date: str) -> Optional[Dict[str, Any]]:
+        """Entrada en espera u ofrecida de un teléfono para una fecha (None si no hay)."""
+        pass
+
+    @abstractmethod
+    def find_waiting(self, date: str, location: str) -> List[Dict[str, Any]]:
+        """Entradas en espera de una fecha y ubicación, por orden de llegada."""
+        pass
+
+    @abstractmethod
+    def expire_offers(self, date: str, location: str, now: float) -> List[int]:
+        """Devuelve a 'waiting' las ofertas caducadas de una fecha y ubicación. Devuelve sus IDs."""
+        pass
+
+    @abstractmethod
+    def mark_offered(self, entry_id: int, offered_time: str, table_ids: List[int], expires_at: float) -> None:
+        pass
+
+    @abstractmethod
+    def mark_waiting(self, entry_id: int) -> None:
+        """Descarta la oferta de una entrada y la devuelve a la espera."""
+        pass
+
+    @abstractmethod
+    def mark_booked(self, entry_id: int, reservation_id: Optional[int]) -> None:
+        pass
+
+    @abstractmethod
+    def cancel(self, phone: str, date: str) -> bool:
+        """Saca de la lista la entrada activa. Devuelve False si no había ninguna."""
+        pass
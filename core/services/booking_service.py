@@ -1,10 +1,12 @@
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable
 from datetime import datetime, timedelta
 import json
 from core.domain.booking_date import BookingDate
 from core.domain.reservation import Reservation
-from core.domain.calendar_repository import CalendarRepository
+from core.domain.reservation_repository import DuplicateReservationError, TableUnavailableError
+from core.domain.calendar_outbox_repository import CalendarOutboxRepository
 from core.utils.reservation_utils import estimate_duration
+from core.utils.table_combinations import find_best_combination
 
 
 class BookingService:
@@ -13,11 +15,21 @@ class BookingService:
     Orquesta las entidades del dominio y los repositorios de infraestructura.
     """
 
-    def __init__(self, reservation_repo, table_repo, holiday_repo, calendar_repo: Optional[CalendarRepository] = None):
+    def __init__(self, reservation_repo, table_repo, holiday_repo, calendar_outbox: Optional[CalendarOutboxRepository] = None):
         self.reservation_repo = reservation_repo
         self.table_repo = table_repo
         self.holiday_repo = holiday_repo
-        self.calendar_repo = calendar_repo
+        # Los cambios de calendario se encolan aquí y los envía CalendarSyncWorker
+        self.calendar_outbox = calendar_outbox
+        # Funciones avisadas cuando una cancelación o modificación libera sitio (p. ej. la lista de espera)
+        self._capacity_listeners: List[Callable[[Dict[str, Any]], None]] = []
+    
+    def on_capacity_freed(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """
+        Registra una función que recibe {"date", "location", "table_ids"} cada vez
+        que se libera sitio. Se llama tras confirmar la transacción.
+        """
+        self._capacity_listeners.append(listener)
     
     # ============================================================
     # CREAR RESERVA
@@ -81,12 +93,6 @@ class BookingService:
             if not self.table_repo.is_table_available(tid, normalized, time, duration):
                 return {"success": False, "message": f"La mesa {tid} no está disponible a las {time} el {normalized}."}
 
-        # Crear evento en Google Calendar si está configurado
-        calendar_event_id = None
-        if self.calendar_repo:
-            table_info = f"mesas {merged_tables}" if merged_tables else f"mesa {table_id}"
-            calendar_event_id = self._create_calendar_event(name, guests, normalized, time, duration, phone, table_info)
-        
         # Convertir lista de mesas a JSON si existe
         merged_tables_json = json.dumps(merged_tables) if merged_tables else None
         
@@ -100,10 +106,27 @@ class BookingService:
             phone=phone,
             duration=duration,
             notes=notes,
-            calendar_event_id=calendar_event_id,
             merged_tables=merged_tables_json
         )
-        self.reservation_repo.insert(reservation)
+        
+        # Las comprobaciones anteriores son una vía rápida; la definitiva se repite
+        # junto con la inserción en una única transacción para evitar dobles reservas.
+        # El evento de calendario se encola en la misma transacción.
+        try:
+            with self.reservation_repo.atomic():
+                reservation_id = self.reservation_repo.insert_if_available(
+                    reservation, list(dict.fromkeys([table_id, *tables_to_check]))
+                )
+                if self.calendar_outbox:
+                    table_info = f"mesas {merged_tables}" if merged_tables else f"mesa {table_id}"
+                    self.calendar_outbox.enqueue(
+                        reservation_id, "create",
+                        self._calendar_event_fields(name, guests, normalized, time, duration, phone, table_info)
+                    )
+        except DuplicateReservationError:
+            return {"success": False, "message": f"Ya existe una reserva registrada con el número {phone} para el {normalized}."}
+        except TableUnavailableError as e:
+            return {"success": False, "message": f"La mesa {e.table_id} acaba de ser reservada para las {time} del {normalized}. Usa find_table para buscar otra mesa."}
         
         # Mensaje de confirmación
         if merged_tables:
@@ -112,8 +135,8 @@ class BookingService:
             table_msg = f"mesa {table_id}"
         
         message = f"Reserva creada con éxito para {table_msg} (duración estimada: {duration} min)."
-        if calendar_event_id:
-            message += " Evento sincronizado con Google Calendar."
+        if self.calendar_outbox:
+            message += " El evento se sincronizará con Google Calendar en segundo plano."
         
         return {
             "success": True,
@@ -121,7 +144,7 @@ class BookingService:
             "table_id": table_id,
             "merged_tables": merged_tables,
             "duration": duration,
-            "calendar_event_id": calendar_event_id
+            "reservation_id": reservation_id
         }
 
     # ============================================================
@@ -143,12 +166,16 @@ class BookingService:
         if not existing:
             return {"success": False, "message": f"No existe ninguna reserva con el número {phone} para el {date}."}
         
-        # Eliminar evento de Google Calendar si existe
+        # Encolar el borrado del evento de calendario junto con la cancelación
         reservation = existing[0]
-        if self.calendar_repo and reservation.get("calendar_event_id"):
-            self.calendar_repo.delete_event(reservation["calendar_event_id"])
-        
-        self.reservation_repo.delete_by_phone_and_date(phone, date)
+        with self.reservation_repo.atomic():
+            self.reservation_repo.delete_by_phone_and_date(phone, date)
+            if self.calendar_outbox:
+                self.calendar_outbox.enqueue(
+                    reservation["id"], "delete",
+                    {"calendar_event_id": reservation.get("calendar_event_id")}
+                )
+        self._notify_capacity_freed(reservation)
         return {"success": True, "message": f"Reserva eliminada con éxito para el {date} y número {phone}."}
 
     # ============================================================
@@ -183,9 +210,9 @@ class BookingService:
                     
                     # Si la mesa actual NO es suficiente, buscar una mejor
                     if current_table["capacity"] < new_guests:
-                        # Obtener información de la reserva actual
-                        current_time = reservation["time"]
-                        current_date = reservation["date"]
+                        # Fecha y hora que tendrá la reserva (pueden cambiar a la vez)
+                        current_time = updates.get("time", reservation["time"])
+                        current_date = updates.get("date", reservation["date"])
                         
                         # Calcular duración para los nuevos comensales
                         duration = estimate_duration(new_guests, current_time)
@@ -212,28 +239,60 @@ class BookingService:
                         # La mesa actual es suficiente, no reasignar
                         mesa_msg = ""
                 else:
-                    # Si disminuyen los comensales, mantener la misma mesa
+                    # Si disminuyen los comensales, mantener la misma mesa con la nueva duración (más corta)
+                    duration = estimate_duration(new_guests, updates.get("time", reservation["time"]))
+                    if duration < reservation["duration"]:
+                        updates["duration"] = duration
                     mesa_msg = ""
             else:
                 mesa_msg = ""
         else:
             mesa_msg = ""
         
-        # Actualizar evento en Google Calendar si existe
-        if self.calendar_repo and reservation.get("calendar_event_id"):
-            self._update_calendar_event(
-                reservation["calendar_event_id"],
-                reservation,
-                updates
-            )
-        
-        self.reservation_repo.update(phone, date, updates)
+        # La disponibilidad de las mesas se comprueba de nuevo junto con la modificación
+        # (nueva fecha, hora o mesas) y el evento de calendario se encola en la misma transacción
+        try:
+            with self.reservation_repo.atomic():
+                self.reservation_repo.update_if_available(phone, date, updates)
+                if self.calendar_outbox:
+                    self.calendar_outbox.enqueue(
+                        reservation["id"], "update",
+                        self._calendar_update_fields(reservation, updates)
+                    )
+        except DuplicateReservationError:
+            return {"success": False, "message": f"Ya existe una reserva registrada con el número {phone} para el {updates['date']}."}
+        except TableUnavailableError as e:
+            return {"success": False, "message": f"La mesa {e.table_id} acaba de ser reservada para las {updates.get('time', reservation['time'])} del {updates.get('date', date)}. Usa find_table para buscar otra mesa."}
+        # Una reserva más corta o trasladada deja libre (parte de) su hueco original
+        if updates.get("duration", reservation["duration"]) < reservation["duration"] \
+                or updates.get("date", date) != reservation["date"] \
+                or updates.get("time", reservation["time"]) != reservation["time"]:
+            self._notify_capacity_freed(reservation)
         msg = f"Reserva modificada con éxito."
         if mesa_msg:
             msg += f" {mesa_msg}."
         
         return {"success": True, "message": msg}
     
+    # ============================================================
+    # AVISO DE SITIO LIBERADO
+    # ============================================================
+    def _notify_capacity_freed(self, reservation: Dict[str, Any]) -> None:
+        """Avisa a los listeners del hueco que deja `reservation` (fila anterior al cambio)."""
+        if not self._capacity_listeners:
+            return
+        table = self.table_repo.get_table_by_id(reservation["table_id"])
+        if not table:
+            return
+        table_ids = json.loads(reservation["merged_tables"]) if reservation.get("merged_tables") else [reservation["table_id"]]
+        event = {"date": reservation["date"], "location": table["location"], "table_ids": table_ids}
+        for listener in self._capacity_listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                # La cancelación ya está confirmada: un fallo del listener no debe deshacerla
+                print(f"⚠️ Error al avisar del sitio liberado el {event['date']}: {e}")
+    
     # ============================================================
     # MÉTODO PRIVADO: BUSCAR MESA ÓPTIMA
     # ============================================================
@@ -258,42 +317,31 @@ class BookingService:
                 "table_ids": [ids] (si merged)
             }
         """
-        # 1. Buscar mesa individual
-        candidate_tables = self.table_repo.find_by_location_and_capacity(location, guests)
+        # Todas las mesas libres de la ubicación en una sola consulta (excluyendo la actual)
+        free_tables = [
+            t for t in self.table_repo.available_tables(location, date, time, duration)
+            if not (exclude_table_id and t["id"] == exclude_table_id)
+        ]
         
-        available_tables = []
-        for table in candidate_tables:
-            # Excluir la mesa actual
-            if exclude_table_id and table["id"] == exclude_table_id:
-                continue
-            
-            if self.table_repo.is_table_available(table["id"], date, time, duration):
-                available_tables.append(table)
+        # 1. Buscar mesa individual (la más pequeña que cabe)
+        available_tables = [t for t in free_tables if t["capacity"] >= guests]
         
         if available_tables:
-            # Retornar la primera mesa disponible (la más pequeña que cabe)
             return {
                 "status": "single",
                 "table_id": available_tables[0]["id"]
             }
         
         # 2. Si no hay mesa individual, buscar combinación de mesas
-        all_tables = self.table_repo.find_by_location_and_capacity(location, 1)
-        
-        available_for_merge = []
-        for table in all_tables:
-            # Excluir la mesa actual
-            if exclude_table_id and table["id"] == exclude_table_id:
-                continue
-            
-            if self.table_repo.is_table_available(table["id"], date, time, duration):
-                available_for_merge.append(table)
-        
-        if not available_for_merge:
+        if not free_tables:
             return {"status": "unavailable"}
         
         # Buscar mejor combinación
-        best_combination = self._find_best_combination_for_merge(available_for_merge, guests)
+        best_combination = find_best_combination(
+            free_tables,
+            guests,
+            adjacency=self.table_repo.get_adjacency()
+        )
         
         if best_combination:
             return {
@@ -303,30 +351,10 @@ class BookingService:
         
         return {"status": "unavailable"}
     
-    def _find_best_combination_for_merge(self, tables: List[Dict[str, Any]], target_capacity: int) -> Optional[List[Dict[str, Any]]]:
-        """Encuentra la mejor combinación de mesas (mínimo número de mesas)."""
-        # Ordenar por capacidad descendente
-        tables_sorted = sorted(tables, key=lambda t: t["capacity"], reverse=True)
-        
-        # Intentar con 2 mesas
-        for i in range(len(tables_sorted)):
-            for j in range(i + 1, len(tables_sorted)):
-                if tables_sorted[i]["capacity"] + tables_sorted[j]["capacity"] >= target_capacity:
-                    return [tables_sorted[i], tables_sorted[j]]
-        
-        # Intentar con 3 mesas
-        for i in range(len(tables_sorted)):
-            for j in range(i + 1, len(tables_sorted)):
-                for k in range(j + 1, len(tables_sorted)):
-                    if tables_sorted[i]["capacity"] + tables_sorted[j]["capacity"] + tables_sorted[k]["capacity"] >= target_capacity:
-                        return [tables_sorted[i], tables_sorted[j], tables_sorted[k]]
-        
-        return None
-    
     # ============================================================
     # MÉTODOS PRIVADOS PARA GOOGLE CALENDAR
     # ============================================================
-    def _create_calendar_event(
+    def _calendar_event_fields(
         self, 
         name: str, 
         guests: int, 
@@ -335,54 +363,34 @@ class BookingService:
         duration: int, 
         phone: str,
         table_info: str = None
-    ) -> Optional[str]:
-        """Crea un evento en Google Calendar para la reserva."""
-        try:
-            # Construir fecha/hora en formato ISO 8601
-            start_dt = datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M")
-            end_dt = start_dt + timedelta(minutes=duration)
-            
-            title = f"Reserva: {name} ({guests} personas)"
-            description = f"Reserva para {guests} personas\nTeléfono: {phone}\nDuración estimada: {duration} min"
-            
-            if table_info:
-                description += f"\n{table_info}"
-            
-            event_id = self.calendar_repo.create_event(
-                title=title,
-                description=description,
-                start_datetime=start_dt.isoformat(),
-                end_datetime=end_dt.isoformat()
-            )
-            
-            return event_id
-        except Exception as e:
-            print(f"Error al crear evento en calendario: {e}")
-            return None
+    ) -> Dict[str, Any]:
+        """Construye los campos del evento de calendario de una reserva."""
+        # Construir fecha/hora en formato ISO 8601
+        start_dt = datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M")
+        end_dt = start_dt + timedelta(minutes=duration)
+        
+        title = f"Reserva: {name} ({guests} personas)"
+        description = f"Reserva para {guests} personas\nTeléfono: {phone}\nDuración estimada: {duration} min"
+        
+        if table_info:
+            description += f"\n{table_info}"
+        
+        return {
+            "title": title,
+            "description": description,
+            "start_datetime": start_dt.isoformat(),
+            "end_datetime": end_dt.isoformat()
+        }
     
-    def _update_calendar_event(self, event_id: str, current_reservation: dict, updates: dict):
-        """Actualiza un evento existente en Google Calendar."""
-        try:
-            # Determinar nuevos valores
-            new_date = updates.get("date", current_reservation["date"])
-            new_time = updates.get("time", current_reservation["time"])
-            new_name = updates.get("name", current_reservation["name"])
-            new_guests = updates.get("guests", current_reservation["guests"])
-            new_duration = updates.get("duration", current_reservation["duration"])
-            
-            # Construir nuevas fechas
-            start_dt = datetime.strptime(f"{new_date} {new_time}", "%Y-%m-%d %H:%M")
-            end_dt = start_dt + timedelta(minutes=new_duration)
-            
-            title = f"Reserva: {new_name} ({new_guests} personas)"
-            description = f"Reserva para {new_guests} personas\nTeléfono: {current_reservation['phone']}\nDuración estimada: {new_duration} min"
-            
-            self.calendar_repo.update_event(
-                event_id=event_id,
-                title=title,
-                description=description,
-                start_datetime=start_dt.isoformat(),
-                end_datetime=end_dt.isoformat()
-            )
-        except Exception as e:
-            print(f"Error al actualizar evento en calendario: {e}")
+    def _calendar_update_fields(self, current_reservation: dict, updates: dict) -> Dict[str, Any]:
+        """Campos actualizados del evento de calendario tras modificar una reserva."""
+        fields = self._calendar_event_fields(
+            updates.get("name", current_reservation["name"]),
+            updates.get("guests", current_reservation["guests"]),
+            updates.get("date", current_reservation["date"]),
+            updates.get("time", current_reservation["time"]),
+            updates.get("duration", current_reservation["duration"]),
+            current_reservation["phone"]
+        )
+        fields["calendar_event_id"] = current_reservation.get("calendar_event_id")
+        return fields
@@ -1,22 +1,19 @@
-import os
-from core.domain.booking_date import BookingDate
-
-OPEN_TIME = os.getenv("OPEN_TIME", "09:00")
-CLOSE_TIME = os.getenv("CLOSE_TIME", "00:00")
+from core.domain.booking_date import BookingDate, OpeningHours, DEFAULT_OPENING_HOURS
 
 class InformationService:
-    def __init__(self):
-        pass
+    def __init__(self, opening_hours: OpeningHours = DEFAULT_OPENING_HOURS):
+        self.opening_hours = opening_hours
 
     def get_opening_hours(self) -> str:
-        return f"El restaurante está abierto de {OPEN_TIME} a {CLOSE_TIME}, excepto los lunes que está cerrado."
+        hours = self.opening_hours
+        return f"El restaurante está abierto de {hours.open_time} a {hours.close_time}, excepto los lunes que está cerrado."
     
     def get_opening_days(self) -> str:
         return "El restaurante está abierto de martes a domingo. Los lunes está cerrado."
     
     def is_open(self, date, time, holiday_repo) -> dict:
         """Indica si el restaurante está abierto y devuelve la razón si está cerrado."""
-        booking_date = BookingDate(date, time, holiday_repo)
+        booking_date = BookingDate(date, time, holiday_repo, self.opening_hours)
         reason = booking_date.get_invalid_reason()
         return reason
         
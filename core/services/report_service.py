@@ -0,0 +1,172 @@
+from datetime import timedelta
+import numpy as np
+from core.domain.booking_date import OpeningHours, DEFAULT_OPENING_HOURS, parse_date
+from core.utils.reservation_utils import from_minutes, to_minutes
+
+# Rango máximo de un informe (dos años)
+REPORT_MAX_DAYS = 731
+# Tamaños de franja permitidos (deben dividir la hora)
+REPORT_BUCKETS = (15, 30, 60)
+
+
+class ReportService:
+    """
+    Informes de ocupación y cubiertos sobre rangos largos de fechas.
+
+    Las reservas del rango se leen con una única consulta y se pasan a
+    columnas numpy. La ocupación se calcula como un array de diferencias por
+    minuto (+comensales al empezar la reserva, -comensales al terminar) que
+    se acumula con cumsum; así el coste depende del número de filas y de los
+    minutos del día, no de la duración de cada reserva.
+
+    En las reservas de mesas combinadas los comensales se reparten a partes
+    iguales entre sus mesas.
+    """
+
+    def __init__(self, reservation_repo, table_repo, holiday_repo, opening_hours: OpeningHours = DEFAULT_OPENING_HOURS):
+        self.reservation_repo = reservation_repo
+        self.table_repo = table_repo
+        self.holiday_repo = holiday_repo
+        self.opening_hours = opening_hours
+
+    # ============================================================
+    # INFORME DE OCUPACIÓN
+    # ============================================================
+    def occupancy_report(self, start_date: str, end_date: str, bucket_minutes: int = 60, by_table: bool = False):
+        """
+        Ocupación de plazas por franja horaria, cubiertos por día y distribución
+        del tamaño de los grupos entre dos fechas (ambas incluidas).
+
+        Args:
+            bucket_minutes: Tamaño de la franja (15, 30 o 60 minutos)
+            by_table: Incluir los minutos-plaza de cada mesa por franja
+
+        Returns:
+            - seat_utilisation: Por franja, plazas ocupadas de media en los días abiertos
+              y proporción sobre el total de plazas
+            - tables: Por mesa, proporción del horario en que ha estado ocupada
+            - covers_per_day / covers_by_weekday / party_sizes
+        """
+        try:
+            first_day, last_day = parse_date(start_date), parse_date(end_date)
+        except ValueError as e:
+            return {"success": False, "message": str(e)}
+        if first_day > last_day:
+            return {"success": False, "message": "La fecha inicial debe ser anterior a la final."}
+        n_days = (last_day - first_day).days + 1
+        if n_days > REPORT_MAX_DAYS:
+            return {"success": False, "message": f"El rango del informe no puede superar {REPORT_MAX_DAYS} días."}
+        if bucket_minutes not in REPORT_BUCKETS:
+            return {"success": False, "message": f"La franja debe ser de {', '.join(map(str, REPORT_BUCKETS))} minutos."}
+
+        plan = self.table_repo.get_all_available()
+        rows = self.reservation_repo.get_table_usage_between(first_day.isoformat(), last_day.isoformat())
+
+        # Días abiertos del rango: sin lunes ni festivos
+        holidays = self.holiday_repo.get_holidays_between(first_day.isoformat(), last_day.isoformat())
+        open_days = int(np.busday_count(
+            first_day, last_day + timedelta(days=1), weekmask="0111111", holidays=sorted(holidays)
+        ))
+
+        # Columnas: una fila por mesa y reserva
+        if rows:
+            dates, table_ids, starts, ends, guests, reservation_ids = zip(*rows)
+        else:
+            dates, table_ids, starts, ends, guests, reservation_ids = ((),) * 6
+        day = (np.array(dates, dtype="datetime64[D]") - np.datetime64(first_day)).astype(np.int64)
+        table_ids = np.array(table_ids, dtype=np.int64)
+        starts = np.array(starts, dtype=np.int64)
+        ends = np.array(ends, dtype=np.int64)
+        guests = np.array(guests, dtype=np.int64)
+        # Peso de cada fila: fracción de la reserva que le corresponde a la mesa
+        _, reservation_index, n_tables = np.unique(
+            np.array(reservation_ids, dtype=np.int64), return_inverse=True, return_counts=True
+        )
+        weight = 1.0 / n_tables[reservation_index]
+        seats = guests * weight
+
+        # Eje de minutos desde el inicio de la primera franja con servicio hasta
+        # el final de la última reserva (puede pasar de medianoche)
+        open_minute, _ = self.opening_hours.window
+        close = self._close_minute()
+        origin = min(open_minute, int(starts.min()) if rows else open_minute) // bucket_minutes * bucket_minutes
+        limit = max(close, int(ends.max()) if rows else close)
+        n_buckets = -(-(limit - origin) // bucket_minutes)
+        axis = n_buckets * bucket_minutes
+
+        # Plan de mesas (más las que aparecen en reservas aunque ya no estén disponibles)
+        capacity_by_id = {t["id"]: t["capacity"] for t in plan}
+        all_ids = np.union1d(np.array(sorted(capacity_by_id), dtype=np.int64), table_ids)
+        table_index = np.searchsorted(all_ids, table_ids)
+        n_tables_total = len(all_ids)
+        total_seats = sum(capacity_by_id.values())
+
+        # Plazas ocupadas por mesa y minuto (sumadas en todos los días): array de diferencias
+        flat_start = table_index * (axis + 1) + (starts - origin)
+        flat_end = table_index * (axis + 1) + (ends - origin)
+        size = n_tables_total * (axis + 1)
+        diff = (np.bincount(flat_start, weights=seats, minlength=size)
+                - np.bincount(flat_end, weights=seats, minlength=size))
+        seat_minutes = np.cumsum(diff.reshape(n_tables_total, axis + 1), axis=1)[:, :axis]
+        by_bucket = seat_minutes.reshape(n_tables_total, n_buckets, bucket_minutes).sum(axis=2)
+        totals = by_bucket.sum(axis=0)
+
+        service_days = max(open_days, 1)
+        avg_seats = totals / (bucket_minutes * service_days)
+        utilisation = avg_seats / total_seats if total_seats else np.zeros_like(avg_seats)
+        seat_utilisation = [
+            {"time": from_minutes((origin + i * bucket_minutes) % (24 * 60)),
+             "avg_occupied_seats": round(float(avg_seats[i]), 2),
+             "utilisation": round(float(utilisation[i]), 4)}
+            for i in range(n_buckets)
+        ]
+
+        # Mesas: minutos ocupados sobre los minutos de servicio del periodo
+        busy = np.bincount(table_index, weights=(ends - starts), minlength=n_tables_total)
+        service_minutes = (close - open_minute) * service_days
+        tables = []
+        for i, tid in enumerate(all_ids.tolist()):
+            entry = {
+                "table_id": tid,
+                "capacity": capacity_by_id.get(tid),
+                "utilisation": round(float(busy[i]) / service_minutes, 4) if service_minutes else 0.0,
+            }
+            if by_table:
+                entry["seat_minutes"] = [round(float(v), 1) for v in by_bucket[i]]
+            tables.append(entry)
+
+        # Cubiertos por día y día de la semana (lunes = 0) y tamaño de los grupos
+        covers_day = np.bincount(day, weights=seats, minlength=n_days)
+        weekday = (np.arange(n_days) + first_day.weekday()) % 7
+        covers_weekday = np.bincount(weekday, weights=covers_day, minlength=7)
+        party_sizes = np.bincount(guests, weights=weight) if rows else np.zeros(0)
+        reservations = float(weight.sum())
+        covers = float(seats.sum())
+
+        peak = int(np.argmax(avg_seats)) if rows else None
+        return {
+            "success": True,
+            "start_date": first_day.isoformat(),
+            "end_date": last_day.isoformat(),
+            "open_days": open_days,
+            "total_seats": total_seats,
+            "reservations": round(reservations),
+            "covers": round(covers),
+            "avg_party_size": round(covers / reservations, 2) if reservations else 0.0,
+            "bucket_minutes": bucket_minutes,
+            "peak": seat_utilisation[peak] if peak is not None else None,
+            "seat_utilisation": seat_utilisation,
+            "tables": tables,
+            "covers_per_day": [
+                {"date": (first_day + timedelta(days=i)).isoformat(), "covers": int(round(c))}
+                for i, c in enumerate(covers_day.tolist()) if c
+            ],
+            "covers_by_weekday": [int(round(c)) for c in covers_weekday.tolist()],
+            "party_sizes": {str(size): int(round(n)) for size, n in enumerate(party_sizes.tolist()) if round(n)},
+        }
+
+    def _close_minute(self) -> int:
+        """Hora de cierre en minutos desde la medianoche del día de apertura (cerrar a las 00:00 o a las 02:00 cuenta como del día siguiente)."""
+        close = to_minutes(self.opening_hours.close_time)
+        open_minute, _ = self.opening_hours.window
+        return close + 24 * 60 if close <= open_minute else close
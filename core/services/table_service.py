@@ -1,36 +1,39 @@
-from core.domain.booking_date import BookingDate
-from core.utils.reservation_utils import estimate_duration
-from typing import List, Dict, Any, Optional
-import json
+from core.domain.booking_date import BookingDate, OpeningHours, DEFAULT_OPENING_HOURS, parse_date, parse_time
+from core.utils.reservation_utils import estimate_duration, from_minutes, to_minutes
+from core.utils.table_combinations import find_best_combination
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple
+
+# Máximo de días que puede recorrer next_available (acota la consulta de ocupación)
+NEXT_AVAILABLE_MAX_DAYS = 60
 
 
 class TableService:
-    def __init__(self, table_repo, holiday_repo):
+    def __init__(self, table_repo, holiday_repo, opening_hours: OpeningHours = DEFAULT_OPENING_HOURS):
         self.table_repo = table_repo
         self.holiday_repo = holiday_repo
+        self.opening_hours = opening_hours
 
     def find_table(self, guests: int, location: str, date: str, time: str):
         """
         Busca una mesa disponible. Si no hay una mesa individual suficiente,
         intenta combinar mesas de la misma ubicación.
         """
-        date_obj = BookingDate(date, time, self.holiday_repo)
+        date_obj = BookingDate(date, time, self.holiday_repo, self.opening_hours)
         normalized_date = date_obj.normalized_date()
         duration = estimate_duration(guests, time)
 
+        # Todas las mesas libres de la ubicación en una sola consulta
+        free_tables = self.table_repo.available_tables(location, normalized_date, time, duration)
+
         # 1. Buscar mesa individual que cumpla la capacidad
-        candidate_tables = self.table_repo.find_by_location_and_capacity(location, guests)
-        
-        available_tables = []
-        for table in candidate_tables:
-            if self.table_repo.is_table_available(table["id"], normalized_date, time, duration):
-                available_tables.append(table)
+        available_tables = [t for t in free_tables if t["capacity"] >= guests]
 
         if available_tables:
             return {"success": True, "available_tables": available_tables, "merged": False}
 
         # 2. Si no hay mesa individual, buscar combinación de mesas
-        merged_option = self._find_merged_tables(guests, location, normalized_date, time, duration)
+        merged_option = self._find_merged_tables(guests, location, free_tables)
         
         if merged_option:
             return {
@@ -46,31 +49,21 @@ class TableService:
         self, 
         guests: int, 
         location: str, 
-        date: str, 
-        time: str, 
-        duration: int
+        free_tables: List[Dict[str, Any]]
     ) -> Optional[Dict[str, Any]]:
         """
         Encuentra una combinación de mesas en la misma ubicación que sumen
-        la capacidad necesaria.
+        la capacidad necesaria, a partir de las mesas libres en la franja.
         """
-        # Obtener todas las mesas de esa ubicación (sin filtro de capacidad mínima)
-        all_tables = self.table_repo.find_by_location_and_capacity(location, 1)
-        
-        # Filtrar solo las disponibles
-        available_tables = []
-        for table in all_tables:
-            if self.table_repo.is_table_available(table["id"], date, time, duration):
-                available_tables.append(table)
-        
-        if not available_tables:
+        if not free_tables:
             return None
         
-        # Ordenar por capacidad descendente para optimizar combinaciones
-        available_tables.sort(key=lambda t: t["capacity"], reverse=True)
-        
-        # Buscar combinación más eficiente (mínimo número de mesas)
-        best_combination = self._find_best_combination(available_tables, guests)
+        # Buscar combinación más eficiente (mínimo número de mesas y de sillas sobrantes)
+        best_combination = find_best_combination(
+            free_tables,
+            guests,
+            adjacency=self.table_repo.get_adjacency()
+        )
         
         if not best_combination:
             return None
@@ -88,32 +81,188 @@ class TableService:
             "is_merged": True
         }
     
-    def _find_best_combination(
-        self, 
-        tables: List[Dict[str, Any]], 
-        target_capacity: int
-    ) -> Optional[List[Dict[str, Any]]]:
+    def get_unseatable_reason(self, guests: int, location: str) -> Optional[str]:
         """
-        Encuentra la mejor combinación de mesas (mínimo número de mesas)
-        que sume al menos la capacidad objetivo.
+        Motivo por el que un grupo no cabría nunca en una ubicación, ni con
+        todas sus mesas libres (None si el plano de mesas lo admite).
         """
-        # Intentar con 2 mesas primero
-        for i in range(len(tables)):
-            for j in range(i + 1, len(tables)):
-                if tables[i]["capacity"] + tables[j]["capacity"] >= target_capacity:
-                    return [tables[i], tables[j]]
-        
-        # Intentar con 3 mesas
-        for i in range(len(tables)):
-            for j in range(i + 1, len(tables)):
-                for k in range(j + 1, len(tables)):
-                    if tables[i]["capacity"] + tables[j]["capacity"] + tables[k]["capacity"] >= target_capacity:
-                        return [tables[i], tables[j], tables[k]]
-        
-        # Si necesita más de 3 mesas, no combinar (política del restaurante)
-        return None
+        if guests < 1:
+            return "El número de personas debe ser al menos 1."
+        tables = self.table_repo.find_by_location_and_capacity(location, 1)
+        if not tables:
+            return f"No hay mesas en la ubicación '{location}'."
+        if tables[-1]["capacity"] >= guests:
+            return None
+        if find_best_combination(tables, guests, adjacency=self.table_repo.get_adjacency()):
+            return None
+        return f"No hay mesas ni combinaciones de mesas en {location} para {guests} personas."
+
+    # ============================================================
+    # FRANJAS LIBRES DE UN DÍA
+    # ============================================================
+    def find_free_slots(self, guests: int, location: str, date: str, granularity: int = 15):
+        """
+        Devuelve todas las horas de inicio reservables de un día para un grupo,
+        cada `granularity` minutos dentro del horario de reservas.
+        
+        Las ocupaciones del día se leen una sola vez y se recorren con un
+        barrido por mesa, en vez de repetir find_table para cada hora.
+        """
+        if granularity <= 0:
+            return {"success": False, "message": "La granularidad debe ser un número positivo de minutos."}
+        
+        booking_date = BookingDate(date, self.opening_hours.open_time, self.holiday_repo, self.opening_hours)
+        normalized_date = booking_date.normalized_date()
+        reason = booking_date.get_invalid_reason()
+        if reason:
+            return {"success": False, "message": reason}
+        
+        first, last = booking_date.booking_window()
+        starts = list(range(first, last + 1, granularity))
+        slots = self._free_slots(guests, location, starts, self.table_repo.get_occupancy(normalized_date))
+        
+        if not slots:
+            return {"success": False, "message": f"No hay disponibilidad para {guests} personas en {location} el {normalized_date}."}
+        return {
+            "success": True,
+            "date": normalized_date,
+            "location": location,
+            "guests": guests,
+            "slots": slots
+        }
     
+    def _free_slots(
+        self,
+        guests: int,
+        location: str,
+        starts: List[int],
+        occupancy: Dict[int, List[Tuple[int, int]]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Calcula las franjas reservables a partir de los intervalos ocupados del día.
+        
+        Como la hora de fin (inicio + duración estimada) nunca decrece al avanzar
+        la hora de inicio, para cada mesa basta un único barrido conjunto sobre
+        las horas candidatas y sus intervalos ocupados ordenados.
+        """
+        tables = self.table_repo.find_by_location_and_capacity(location, 1)
+        if not tables:
+            return []
+        adjacency = self.table_repo.get_adjacency()
+        ends = [start + estimate_duration(guests, from_minutes(start)) for start in starts]
+        
+        # free_by_slot[i] = mesas libres (ordenadas por capacidad) para la hora starts[i]
+        free_by_slot: List[List[Dict[str, Any]]] = [[] for _ in starts]
+        for table in tables:
+            intervals = occupancy.get(table["id"], [])
+            pointer = 0
+            busy_until = 0  # Fin máximo de los intervalos que empiezan antes del fin de la franja
+            for i, (start, end) in enumerate(zip(starts, ends)):
+                while pointer < len(intervals) and intervals[pointer][0] < end:
+                    busy_until = max(busy_until, intervals[pointer][1])
+                    pointer += 1
+                if busy_until <= start:
+                    free_by_slot[i].append(table)
+        
+        slots = []
+        for start, free_tables in zip(starts, free_by_slot):
+            single = next((t for t in free_tables if t["capacity"] >= guests), None)
+            if single:
+                slots.append({"time": from_minutes(start), "merged": False, "table_ids": [single["id"]]})
+                continue
+            combination = find_best_combination(free_tables, guests, adjacency=adjacency)
+            if combination:
+                slots.append({"time": from_minutes(start), "merged": True, "table_ids": [t["id"] for t in combination]})
+        return slots
 
+    def free_slots_in_window(self, guests: int, location: str, date: str, earliest: int, latest: int,
+                             granularity: int = 15) -> List[Dict[str, Any]]:
+        """
+        Horas reservables de una fecha YYYY-MM-DD entre dos horas (minutos desde
+        medianoche, ambas incluidas), recortadas al horario de reservas.
+        """
+        first, last = self.opening_hours.window
+        starts = list(range(max(first, earliest), min(last, latest) + 1, granularity))
+        if not starts:
+            return []
+        return self._free_slots(guests, location, starts, self.table_repo.get_occupancy(date))
+    
+    # ============================================================
+    # PRÓXIMA DISPONIBILIDAD EN VARIOS DÍAS
+    # ============================================================
+    def next_available(
+        self,
+        guests: int,
+        location: str,
+        from_date: Optional[str] = None,
+        preferred_time: Optional[str] = None,
+        horizon_days: int = 14,
+        limit: int = 5,
+        per_day: int = 3,
+        granularity: int = 15
+    ):
+        """
+        Busca las primeras opciones con sitio a partir de una fecha, sin tener
+        que probar find_table día a día y hora a hora.
+        
+        Los lunes y festivos se descartan en memoria (una sola consulta de
+        festivos del rango) y la ocupación de todos los días se lee con una
+        única consulta. Dentro de cada día las horas se ordenan por cercanía a
+        `preferred_time` y se devuelven como mucho `per_day`; los días se
+        recorren en orden hasta reunir `limit` opciones.
+        """
+        if guests <= 0 or limit <= 0 or per_day <= 0 or granularity <= 0:
+            return {"success": False, "message": "El número de personas, de opciones y la granularidad deben ser positivos."}
+        if not 1 <= horizon_days <= NEXT_AVAILABLE_MAX_DAYS:
+            return {"success": False, "message": f"El horizonte de búsqueda debe estar entre 1 y {NEXT_AVAILABLE_MAX_DAYS} días."}
+        
+        now = datetime.now()
+        first_day = max(parse_date(from_date) if from_date else now.date(), now.date())
+        last_day = first_day + timedelta(days=horizon_days - 1)
+        preferred = None
+        if preferred_time:
+            t = parse_time(preferred_time)
+            preferred = t.hour * 60 + t.minute
+        
+        holidays = self.holiday_repo.get_holidays_between(first_day.isoformat(), last_day.isoformat())
+        days = [
+            day for day in (first_day + timedelta(days=i) for i in range(horizon_days))
+            if day.weekday() != 0 and day.isoformat() not in holidays  # Lunes cerrado
+        ]
+        if not days:
+            return {"success": False, "message": f"El restaurante está cerrado todos los días entre {first_day} y {last_day}."}
+        
+        occupancy = self.table_repo.get_occupancy_between(days[0].isoformat(), days[-1].isoformat())
+        first, last = self.opening_hours.window
+        all_starts = list(range(first, last + 1, granularity))
+        
+        options = []
+        for day in days:
+            starts = all_starts
+            if day == now.date():
+                # Hoy solo cuentan las horas que aún no han pasado
+                current = now.hour * 60 + now.minute
+                starts = [s for s in all_starts if s > current]
+            slots = self._free_slots(guests, location, starts, occupancy.get(day.isoformat(), {})) if starts else []
+            if preferred is not None:
+                slots.sort(key=lambda slot: abs(to_minutes(slot["time"]) - preferred))
+            for slot in slots[:per_day]:
+                option = {"date": day.isoformat(), **slot}
+                if preferred is not None:
+                    option["minutes_from_preferred"] = abs(to_minutes(slot["time"]) - preferred)
+                options.append(option)
+            if len(options) >= limit:
+                break
+        
+        if not options:
+            return {"success": False, "message": f"No hay disponibilidad para {guests} personas en {location} entre {first_day} y {last_day}."}
+        return {
+            "success": True,
+            "guests": guests,
+            "location": location,
+            "options": options[:limit]
+        }
+    
     # ============================================================
     # LISTAR MESAS DISPONIBLES
     # ============================================================
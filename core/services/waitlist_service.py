@@ -0,0 +1,201 @@
+import time
+from typing import Optional, Dict, Any, Iterable, List
+from core.domain.booking_date import BookingDate, OpeningHours, DEFAULT_OPENING_HOURS, parse_time
+from core.domain.waitlist_repository import DuplicateWaitlistEntryError
+from core.utils.reservation_utils import WAITLIST_OFFER_MINUTES
+
+
+class WaitlistService:
+    """
+    Lista de espera de reservas.
+
+    Se apunta a BookingService.on_capacity_freed: cuando una cancelación o
+    modificación libera sitio, solo se revisan las entradas de esa fecha y
+    ubicación (consulta indexada) y a la primera que cabe se le reserva la
+    mesa (auto_book) o se le ofrece la hora durante WAITLIST_OFFER_MINUTES.
+
+    Las ofertas no bloquean la mesa, así que cuando una caduca el sitio sigue
+    libre: se vuelve a ofrecer a la siguiente entrada en cuanto se detecta.
+    """
+
+    def __init__(self, waitlist_repo, reservation_repo, holiday_repo, table_service, booking_service,
+                 opening_hours: OpeningHours = DEFAULT_OPENING_HOURS):
+        self.waitlist_repo = waitlist_repo
+        self.reservation_repo = reservation_repo
+        self.holiday_repo = holiday_repo
+        self.table_service = table_service
+        self.booking_service = booking_service
+        self.opening_hours = opening_hours
+        booking_service.on_capacity_freed(self.handle_capacity_freed)
+
+    # ============================================================
+    # APUNTARSE / BORRARSE
+    # ============================================================
+    def join_waitlist(
+        self,
+        name: str,
+        phone: str,
+        guests: int,
+        date: str,
+        location: str,
+        earliest_time: str,
+        latest_time: str,
+        auto_book: bool = False,
+        notes: Optional[str] = None
+    ):
+        """
+        Apunta a un grupo a la lista de espera de una fecha y ubicación para
+        cualquier hora entre `earliest_time` y `latest_time`.
+
+        Args:
+            auto_book: Si es True, la reserva se crea automáticamente al liberarse sitio;
+                si no, se le ofrece la hora y debe aceptarla con accept_offer
+        """
+        try:
+            booking_date = BookingDate(date, self.opening_hours.open_time, self.holiday_repo, self.opening_hours)
+            earliest, latest = parse_time(earliest_time), parse_time(latest_time)
+        except ValueError as e:
+            return {"success": False, "message": str(e)}
+        normalized = booking_date.normalized_date()
+        reason = booking_date.get_invalid_reason()
+        if reason:
+            return {"success": False, "message": reason}
+
+        earliest_minute = earliest.hour * 60 + earliest.minute
+        latest_minute = latest.hour * 60 + latest.minute
+        if earliest_minute > latest_minute:
+            return {"success": False, "message": "La hora inicial de la ventana debe ser anterior a la final."}
+        first, last = self.opening_hours.window
+        if latest_minute < first or earliest_minute > last:
+            # Ninguna hora de la ventana es reservable: mismo motivo que una reserva fuera de horario
+            outside = BookingDate(normalized, earliest_time, self.holiday_repo, self.opening_hours)
+            return {"success": False, "message": outside.get_invalid_reason()}
+
+        # Un grupo que no cabe en el plano de mesas nunca recibiría sitio
+        reason = self.table_service.get_unseatable_reason(guests, location)
+        if reason:
+            return {"success": False, "message": reason}
+
+        if self.reservation_repo.find_by_phone_and_date(phone, normalized):
+            return {"success": False, "message": f"Ya existe una reserva registrada con el número {phone} para el {normalized}."}
+
+        # Si ya hay sitio no tiene sentido esperar
+        slots = self.table_service.free_slots_in_window(guests, location, normalized, earliest_minute, latest_minute)
+        if slots:
+            return {
+                "success": False,
+                "message": f"Ya hay sitio para {guests} personas el {normalized}; se puede reservar directamente.",
+                "slots": slots[:3]
+            }
+
+        try:
+            entry_id = self.waitlist_repo.add(
+                name, phone, guests, normalized, location, earliest_minute, latest_minute, auto_book, notes
+            )
+        except DuplicateWaitlistEntryError:
+            return {"success": False, "message": f"El número {phone} ya está en la lista de espera para el {normalized}."}
+
+        return {
+            "success": True,
+            "message": f"Apuntado en la lista de espera para el {normalized} entre {earliest_time} y {latest_time}. "
+                       + ("La reserva se creará automáticamente si se libera sitio."
+                          if auto_book else "Se le ofrecerá la hora si se libera sitio."),
+            "waitlist_id": entry_id
+        }
+
+    def leave_waitlist(self, phone: str, date: str):
+        date = BookingDate(date, "00:00", self.holiday_repo).normalized_date()
+        if not self.waitlist_repo.cancel(phone, date):
+            return {"success": False, "message": f"El número {phone} no está en la lista de espera para el {date}."}
+        return {"success": True, "message": f"Eliminado de la lista de espera para el {date}."}
+
+    def get_status(self, phone: str, date: str):
+        date = BookingDate(date, "00:00", self.holiday_repo).normalized_date()
+        entry = self.waitlist_repo.find_active(phone, date)
+        if not entry:
+            return {"success": False, "message": f"El número {phone} no está en la lista de espera para el {date}."}
+        if entry["status"] == "offered" and entry["offer_expires_at"] < time.time():
+            self._expire_offer(entry)
+            entry = self.waitlist_repo.find_active(phone, date)
+        return {"success": True, "entry": entry}
+
+    # ============================================================
+    # ACEPTAR UNA OFERTA
+    # ============================================================
+    def accept_offer(self, phone: str, date: str):
+        """Convierte en reserva la hora ofrecida, si sigue vigente y la mesa libre."""
+        date = BookingDate(date, "00:00", self.holiday_repo).normalized_date()
+        entry = self.waitlist_repo.find_active(phone, date)
+        if not entry or entry["status"] != "offered":
+            return {"success": False, "message": f"No hay ninguna oferta pendiente para el número {phone} el {date}."}
+        if entry["offer_expires_at"] < time.time():
+            self._expire_offer(entry)
+            return {"success": False, "message": "La oferta ha caducado. Sigue en la lista de espera."}
+
+        result = self._book(entry, entry["offered_time"], entry["offered_table_ids"])
+        if not result["success"]:
+            # Otra persona ocupó la mesa: vuelve a esperar
+            self.waitlist_repo.mark_waiting(entry["id"])
+            result["message"] += " Sigue en la lista de espera."
+        return result
+
+    # ============================================================
+    # SITIO LIBERADO (LLAMADO POR BookingService)
+    # ============================================================
+    def handle_capacity_freed(self, event: Dict[str, Any], skip_ids: Iterable[int] = ()) -> List[Dict[str, Any]]:
+        """
+        Busca la primera entrada en espera de la fecha y ubicación que cabe en
+        el sitio libre y le reserva u ofrece la hora.
+
+        Las ofertas caducadas de esa fecha y ubicación se atienden en la misma
+        pasada: cada una cuenta como un sitio libre más y se ofrece a otra
+        entrada (quien dejó caducar la oferta sigue esperando, pero no la
+        recupera en esta pasada).
+
+        Args:
+            skip_ids: Entradas que no deben recibir el sitio en esta pasada
+
+        Returns:
+            Las entradas atendidas (vacío si ninguna cabe)
+        """
+        now = time.time()
+        expired = self.waitlist_repo.expire_offers(event["date"], event["location"], now)
+        skip = set(skip_ids) | set(expired)
+        pending = 1 + len(expired)
+        # Mesas ya ofrecidas en esta pasada: no se ofrece la misma mesa a dos entradas
+        offered_tables = set()
+        served = []
+        for entry in self.waitlist_repo.find_waiting(event["date"], event["location"]):
+            if entry["id"] in skip:
+                continue
+            slots = [s for s in self.table_service.free_slots_in_window(
+                entry["guests"], entry["location"], entry["date"], entry["earliest_minute"], entry["latest_minute"]
+            ) if offered_tables.isdisjoint(s["table_ids"])]
+            if not slots:
+                continue
+            slot = slots[0]
+            if entry["auto_book"]:
+                if not self._book(entry, slot["time"], slot["table_ids"])["success"]:
+                    continue
+            else:
+                self.waitlist_repo.mark_offered(entry["id"], slot["time"], slot["table_ids"],
+                                                now + WAITLIST_OFFER_MINUTES * 60)
+                offered_tables.update(slot["table_ids"])
+            served.append(entry)
+            if len(served) == pending:
+                break
+        return served
+
+    def _expire_offer(self, entry: Dict[str, Any]) -> None:
+        """Devuelve a la espera una entrada con la oferta caducada y ofrece el sitio a la siguiente."""
+        self.waitlist_repo.mark_waiting(entry["id"])
+        self.handle_capacity_freed({"date": entry["date"], "location": entry["location"]}, skip_ids=(entry["id"],))
+
+    def _book(self, entry: Dict[str, Any], time_str: str, table_ids: list):
+        result = self.booking_service.create_reservation(
+            table_ids[0], entry["name"], entry["guests"], entry["date"], time_str, entry["phone"],
+            entry.get("notes"), table_ids if len(table_ids) > 1 else None
+        )
+        if result["success"]:
+            self.waitlist_repo.mark_booked(entry["id"], result.get("reservation_id"))
+        return result
@@ -16,6 +16,10 @@ LATE_DINNER_EXTRA = int(os.getenv("LATE_DINNER_EXTRA_MINUTES", "30"))
 OPEN_TIME = os.getenv("OPEN_TIME", "09:00")
 CLOSE_TIME = os.getenv("CLOSE_TIME", "00:00")
 HOLIDAYS_JSON = os.getenv("HOLIDAYS_JSON", "resources/holidays.json")
+# Número máximo de mesas que se pueden juntar para una misma reserva
+MAX_MERGED_TABLES = int(os.getenv("MAX_MERGED_TABLES", "3"))
+# Minutos de validez de una hora ofrecida a alguien de la lista de espera (no se bloquea la mesa)
+WAITLIST_OFFER_MINUTES = int(os.getenv("WAITLIST_OFFER_MINUTES", "30"))
 
 def estimate_duration(guests: int, time: str) -> int:
     """
@@ -35,3 +39,14 @@ def estimate_duration(guests: int, time: str) -> int:
 
     # Limitar al máximo configurado
     return min(duration, MAX_BOOKING_DURATION)
+
+
+def to_minutes(t: str) -> int:
+    """Convierte HH:MM a minutos desde medianoche."""
+    h, m = map(int, t.split(":"))
+    return h * 60 + m
+
+
+def from_minutes(minutes: int) -> str:
+    """Convierte minutos desde medianoche a HH:MM."""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
@@ -0,0 +1,178 @@
+"""Motor de combinación de mesas.
+
+Elige el conjunto de mesas libres que acomoda a los comensales con el menor
+número de mesas y, a igualdad, con el menor número de sillas sobrantes.
+Sin grafo de adyacencia se resuelve con una programación dinámica sobre las
+capacidades (las mesas con la misma capacidad son intercambiables). Con grafo
+de adyacencia solo se consideran conjuntos de mesas conectadas entre sí.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from core.utils.reservation_utils import MAX_MERGED_TABLES
+
+Table = Dict[str, Any]
+Adjacency = Dict[int, Set[int]]
+
+
+def find_best_combination(
+    tables: List[Table],
+    guests: int,
+    max_tables: int = MAX_MERGED_TABLES,
+    adjacency: Optional[Adjacency] = None,
+) -> Optional[List[Table]]:
+    """
+    Encuentra la mejor combinación de mesas para un número de comensales.
+
+    Args:
+        tables: Mesas libres candidatas (dicts con 'id' y 'capacity')
+        guests: Número de comensales
+        max_tables: Número máximo de mesas que se pueden juntar
+        adjacency: Grafo opcional mesa -> mesas con las que se puede juntar.
+                   Si se indica, solo se combinan mesas conectadas.
+
+    Returns:
+        Lista de mesas ordenadas por capacidad descendente, o None si no hay combinación
+    """
+    if not tables or max_tables < 1:
+        return None
+
+    capacity_plan = _best_capacity_plan(tables, guests, max_tables)
+    if capacity_plan is None:
+        return None
+
+    if not adjacency:
+        return _pick_tables(tables, capacity_plan)
+
+    # Sin restricciones de adyacencia nunca se puede usar menos mesas que el plan óptimo
+    return _best_connected_combination(tables, guests, len(capacity_plan), max_tables, adjacency)
+
+
+def _best_capacity_plan(tables: List[Table], guests: int, max_tables: int) -> Optional[List[int]]:
+    """
+    Programación dinámica sobre capacidades: devuelve la lista de capacidades
+    a usar (menos mesas primero y luego menos sobrante) o None si no hay solución.
+    """
+    counts: Dict[int, int] = {}
+    for t in tables:
+        counts[t["capacity"]] = counts.get(t["capacity"], 0) + 1
+
+    # Con el número mínimo de mesas nunca se supera guests + capacidad_máxima - 1:
+    # si se superase, quitando cualquier mesa seguiría habiendo sitio suficiente.
+    limit = guests + max(counts) - 1
+
+    # suma de capacidades -> (número de mesas, capacidades usadas)
+    states: Dict[int, Tuple[int, Tuple[int, ...]]] = {0: (0, ())}
+    for capacity, available in sorted(counts.items(), reverse=True):
+        next_states = dict(states)
+        for total, (n, used) in states.items():
+            for extra in range(1, min(available, max_tables - n) + 1):
+                new_total = total + capacity * extra
+                if new_total > limit:
+                    break
+                candidate = (n + extra, used + (capacity,) * extra)
+                current = next_states.get(new_total)
+                if current is None or candidate[0] < current[0]:
+                    next_states[new_total] = candidate
+        states = next_states
+
+    best = None
+    for total, (n, used) in states.items():
+        if n == 0 or total < guests:
+            continue
+        key = (n, total - guests)
+        if best is None or key < best[0]:
+            best = (key, used)
+    return list(best[1]) if best else None
+
+
+def _pick_tables(tables: List[Table], capacities: Iterable[int]) -> List[Table]:
+    """Asigna mesas concretas a una lista de capacidades respetando el orden de entrada."""
+    needed: Dict[int, int] = {}
+    for capacity in capacities:
+        needed[capacity] = needed.get(capacity, 0) + 1
+
+    chosen = []
+    for t in tables:
+        if needed.get(t["capacity"], 0) > 0:
+            needed[t["capacity"]] -= 1
+            chosen.append(t)
+    return _by_capacity_desc(chosen)
+
+
+def _best_connected_combination(
+    tables: List[Table],
+    guests: int,
+    min_tables: int,
+    max_tables: int,
+    adjacency: Adjacency,
+) -> Optional[List[Table]]:
+    """Busca, por tamaño creciente, el conjunto conexo de mesas con menos sobrante."""
+    by_id = {t["id"]: t for t in tables}
+    order = {tid: i for i, tid in enumerate(by_id)}
+    neighbours = {
+        tid: {n for n in adjacency.get(tid, ()) if n in by_id}
+        for tid in by_id
+    }
+
+    capacities = sorted((t["capacity"] for t in tables), reverse=True)
+
+    for size in range(min_tables, max_tables + 1):
+        # Ni juntando las mesas más grandes se llega: pasar al siguiente tamaño
+        if sum(capacities[:size]) < guests:
+            continue
+        best = _best_connected_subset(by_id, order, neighbours, size, guests, capacities[0])
+        if best is not None:
+            return _by_capacity_desc([by_id[tid] for tid in best])
+    return None
+
+
+def _best_connected_subset(
+    by_id: Dict[int, Table],
+    order: Dict[int, int],
+    neighbours: Dict[int, Set[int]],
+    size: int,
+    guests: int,
+    max_capacity: int,
+) -> Optional[Tuple[int, ...]]:
+    """
+    Recorre una vez cada conjunto conexo de `size` mesas (algoritmo ESU) y
+    devuelve el de menor sobrante, podando ramas que no pueden alcanzar a los
+    comensales o mejorar la mejor solución encontrada.
+    """
+    best_waste = None
+    best_subset = None
+
+    def extend(subset: Tuple[int, ...], total: int, extension: Set[int], root: int):
+        nonlocal best_waste, best_subset
+        if len(subset) == size:
+            if total >= guests and (best_waste is None or total - guests < best_waste):
+                best_waste, best_subset = total - guests, subset
+            return
+        if total + (size - len(subset)) * max_capacity < guests:
+            return
+        extension = set(extension)
+        while extension:
+            if best_waste == 0:
+                return
+            w = extension.pop()
+            new_total = total + by_id[w]["capacity"]
+            if best_waste is not None and new_total - guests >= best_waste and len(subset) + 1 == size:
+                continue
+            exclusive = {
+                u for u in neighbours[w]
+                if order[u] > order[root]
+                and u not in subset
+                and all(u not in neighbours[s] and u != s for s in subset)
+            }
+            extend(subset + (w,), new_total, extension | exclusive, root)
+
+    for root in by_id:
+        initial = {u for u in neighbours[root] if order[u] > order[root]}
+        extend((root,), by_id[root]["capacity"], initial, root)
+        if best_waste == 0:
+            break
+    return best_subset
+
+
+def _by_capacity_desc(tables: List[Table]) -> List[Table]:
+    return sorted(tables, key=lambda t: t["capacity"], reverse=True)
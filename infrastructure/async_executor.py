@@ -0,0 +1,75 @@
+"""Ejecución no bloqueante de código síncrono para el servidor MCP.
+
+Los repositorios (SQLite, Google Calendar) y los servicios son síncronos. Para
+que una llamada lenta no bloquee el bucle de eventos del servidor HTTP, se
+ejecutan en un pool de hilos acotado y se exponen como corrutinas.
+"""
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from dotenv import load_dotenv
+
+from infrastructure.database.sql_connection import use_database
+
+load_dotenv()
+
+# Número máximo de llamadas bloqueantes simultáneas (cada hilo tiene su propia conexión SQLite)
+MCP_WORKER_THREADS = int(os.getenv("MCP_WORKER_THREADS", "8"))
+
+_executor = ThreadPoolExecutor(max_workers=MCP_WORKER_THREADS, thread_name_prefix="mcp-worker")
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """Ejecuta una función síncrona en el pool acotado sin bloquear el bucle de eventos."""
+    loop = asyncio.get_running_loop()
+    # Propagar las variables de contexto (p. ej. métricas por petición) al hilo
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(_executor, functools.partial(ctx.run, fn, *args, **kwargs))
+
+
+def _in_database(database: str, fn, *args, **kwargs):
+    with use_database(database):
+        return fn(*args, **kwargs)
+
+
+class AsyncAdapter:
+    """
+    Variante asíncrona de un objeto síncrono (repositorio o servicio).
+
+    Cada método público del objeto envuelto se expone como corrutina que se
+    ejecuta en el pool de hilos:
+
+        async_repo = AsyncAdapter(SQLReservationRepository())
+        reservations = await async_repo.find_by_phone_and_date(phone, date)
+
+    Con `database`, las llamadas trabajan sobre esa base de datos (la del restaurante).
+    """
+
+    def __init__(self, wrapped, database: Optional[str] = None):
+        self._wrapped = wrapped
+        self._database = database
+
+    def __getattr__(self, name):
+        attr = getattr(self._wrapped, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        database = self._database
+
+        @functools.wraps(attr)
+        async def call(*args, **kwargs):
+            if database is None:
+                return await run_blocking(attr, *args, **kwargs)
+            return await run_blocking(_in_database, database, attr, *args, **kwargs)
+
+        # Cachear el envoltorio para no recrearlo en cada acceso
+        setattr(self, name, call)
+        return call
+
+
+def shutdown(wait: bool = True) -> None:
+    """Detiene el pool de hilos (al apagar el servidor)."""
+    _executor.shutdown(wait=wait)
@@ -0,0 +1,206 @@
+"""Sincronización en segundo plano de las reservas con el calendario externo.
+
+BookingService solo escribe en el outbox (en la misma transacción que la
+reserva); este worker lee las entradas pendientes y llama al calendario con
+reintentos y espera exponencial, de modo que la latencia de una reserva no
+depende de Google Calendar.
+"""
+import hashlib
+import os
+import random
+import threading
+import time
+from typing import Optional, Dict, Any, List
+from dotenv import load_dotenv
+
+from core.domain.calendar_outbox_repository import CalendarOutboxRepository
+from core.domain.calendar_repository import CalendarRepository
+from infrastructure.database.sql_connection import use_database
+
+load_dotenv()
+
+# Segundos entre revisiones del outbox
+CALENDAR_SYNC_INTERVAL = float(os.getenv("CALENDAR_SYNC_INTERVAL", "1.0"))
+# Entradas procesadas por revisión
+CALENDAR_SYNC_BATCH_SIZE = int(os.getenv("CALENDAR_SYNC_BATCH_SIZE", "20"))
+# Intentos antes de marcar una entrada como fallida
+CALENDAR_SYNC_MAX_ATTEMPTS = int(os.getenv("CALENDAR_SYNC_MAX_ATTEMPTS", "8"))
+# Espera del primer reintento y tope de la espera exponencial (segundos)
+CALENDAR_SYNC_BACKOFF = float(os.getenv("CALENDAR_SYNC_BACKOFF", "2.0"))
+CALENDAR_SYNC_MAX_BACKOFF = float(os.getenv("CALENDAR_SYNC_MAX_BACKOFF", "600"))
+# Días que se conservan las entradas completadas
+CALENDAR_OUTBOX_RETENTION_DAYS = int(os.getenv("CALENDAR_OUTBOX_RETENTION_DAYS", "7"))
+
+
+class CalendarSyncError(Exception):
+    """El calendario externo rechazó o no completó una operación."""
+
+
+def calendar_event_id(entry: Dict[str, Any]) -> str:
+    """
+    ID determinista del evento de una entrada 'create': el mismo en todos sus reintentos.
+
+    Google solo admite letras a-v y dígitos (base32hex). Además del ID de la
+    reserva incluye un hash de la hora de encolado, para no chocar con eventos
+    de otra base de datos (los IDs de reserva vuelven a empezar) ni con IDs de
+    eventos ya borrados, que Google no deja reutilizar.
+    """
+    digest = hashlib.sha1(f"{entry['reservation_id']}:{entry['created_at']}".encode()).hexdigest()
+    return f"reserva{entry['reservation_id']}{digest[:16]}"
+
+
+class CalendarSyncWorker:
+    """
+    Envía al calendario las operaciones del outbox en un hilo en segundo plano.
+
+    process_due() hace una pasada síncrona y se puede llamar directamente
+    (por ejemplo con InMemoryCalendarRepository) sin arrancar el hilo.
+    """
+
+    def __init__(self, outbox: CalendarOutboxRepository, calendar_repo: CalendarRepository, reservation_repo,
+                 database: Optional[str] = None):
+        self.outbox = outbox
+        self.calendar_repo = calendar_repo
+        self.reservation_repo = reservation_repo
+        # Base de datos del restaurante (None = la de DATABASE_PATH)
+        self.database = database
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_purge = 0.0
+
+    # ============================================================
+    # CICLO DE VIDA
+    # ============================================================
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="calendar-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        with use_database(self.database):
+            self._loop()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                processed = self.process_due()
+                self._purge_if_needed()
+            except Exception as e:
+                # Un error de base de datos no debe matar el hilo
+                print(f"Error en la sincronización del calendario: {e}")
+                processed = 0
+            # Si la pasada se llenó, seguir sin esperar
+            if processed < CALENDAR_SYNC_BATCH_SIZE:
+                self._stop.wait(CALENDAR_SYNC_INTERVAL)
+
+    # ============================================================
+    # PROCESAMIENTO
+    # ============================================================
+    def process_due(self) -> int:
+        """
+        Procesa las entradas pendientes que ya tocan. Devuelve cuántas se intentaron.
+
+        fetch_due() devuelve como mucho una entrada por reserva, así que las
+        entradas son independientes y se envían agrupadas por operación: una
+        petición batch por tipo en lugar de una por reserva.
+        """
+        if not self.calendar_repo.is_available():
+            # Calendario caído (circuito abierto): las entradas esperan sin gastar reintentos
+            return 0
+        entries = self.outbox.fetch_due(time.time(), CALENDAR_SYNC_BATCH_SIZE)
+        by_operation: Dict[str, List[Dict[str, Any]]] = {"create": [], "update": [], "delete": []}
+
+        for entry in entries:
+            operation = entry["operation"]
+            if operation not in by_operation:
+                self._schedule_retry(entry, f"operación desconocida: {operation}")
+                continue
+            if operation != "create":
+                # El evento puede venir en el payload (reservas antiguas)
+                # o haberlo creado una entrada anterior del outbox
+                entry["event_id"] = (entry["payload"].get("calendar_event_id")
+                                     or self.outbox.created_event_id(entry["reservation_id"]))
+                if not entry["event_id"]:
+                    # La reserva nunca llegó al calendario: no hay nada que sincronizar
+                    self.outbox.mark_done(entry["id"])
+                    continue
+            by_operation[operation].append(entry)
+
+        self._run_batch(by_operation["create"], self._create_batch)
+        self._run_batch(by_operation["update"], self._update_batch)
+        self._run_batch(by_operation["delete"], self._delete_batch)
+        return len(entries)
+
+    def _run_batch(self, entries: List[Dict[str, Any]], send) -> None:
+        """Envía un grupo de entradas y marca cada una como hecha o para reintentar."""
+        if not entries:
+            return
+        try:
+            results = send(entries)
+        except Exception as e:
+            results = [e] * len(entries)
+        for entry, result in zip(entries, results):
+            if isinstance(result, Exception):
+                self._schedule_retry(entry, str(result) or type(result).__name__)
+            else:
+                self.outbox.mark_done(entry["id"], result)
+
+    def _create_batch(self, entries: List[Dict[str, Any]]) -> list:
+        # Un ID propio por entrada hace idempotente el alta: si el lote se reintenta
+        # después de que el calendario creara el evento, no se duplica
+        event_ids = self.calendar_repo.create_events(
+            [{**entry["payload"], "event_id": calendar_event_id(entry)} for entry in entries]
+        )
+        results = []
+        for entry, event_id in zip(entries, event_ids):
+            if event_id:
+                self.reservation_repo.set_calendar_event_id(entry["reservation_id"], event_id)
+                results.append(event_id)
+            else:
+                results.append(CalendarSyncError("el calendario no devolvió el ID del evento"))
+        return results
+
+    def _update_batch(self, entries: List[Dict[str, Any]]) -> list:
+        updates = [
+            {**{k: v for k, v in entry["payload"].items() if k != "calendar_event_id"}, "event_id": entry["event_id"]}
+            for entry in entries
+        ]
+        updated = self.calendar_repo.update_events(updates)
+        return [
+            entry["event_id"] if ok else CalendarSyncError(f"no se pudo actualizar el evento {entry['event_id']}")
+            for entry, ok in zip(entries, updated)
+        ]
+
+    def _delete_batch(self, entries: List[Dict[str, Any]]) -> list:
+        deleted = self.calendar_repo.delete_events([entry["event_id"] for entry in entries])
+        return [
+            entry["event_id"] if ok else CalendarSyncError(f"no se pudo eliminar el evento {entry['event_id']}")
+            for entry, ok in zip(entries, deleted)
+        ]
+
+    def _schedule_retry(self, entry: Dict[str, Any], error: str) -> None:
+        attempts = entry["attempts"] + 1
+        if attempts >= CALENDAR_SYNC_MAX_ATTEMPTS:
+            print(f"⚠️ Sincronización de calendario descartada tras {attempts} intentos "
+                  f"(reserva {entry['reservation_id']}, {entry['operation']}): {error}")
+            self.outbox.mark_failed(entry["id"], error)
+            return
+        # Espera exponencial con jitter para no reintentar todas a la vez
+        delay = min(CALENDAR_SYNC_BACKOFF * 2 ** (attempts - 1), CALENDAR_SYNC_MAX_BACKOFF)
+        delay *= random.uniform(0.8, 1.2)
+        self.outbox.mark_retry(entry["id"], error, time.time() + delay)
+
+    def _purge_if_needed(self) -> None:
+        now = time.time()
+        if now - self._last_purge < 3600:
+            return
+        self._last_purge = now
+        self.outbox.purge_done(now - CALENDAR_OUTBOX_RETENTION_DAYS * 86400)
@@ -0,0 +1,240 @@
+"""Migraciones versionadas y no destructivas del esquema SQLite.
+
+La versión aplicada se guarda en PRAGMA user_version. Cada migración se
+ejecuta en su propia transacción y solo una vez, por lo que el runner puede
+lanzarse sobre una base de datos existente para actualizarla en el sitio.
+"""
+import sqlite3
+from typing import Callable, List, Tuple
+
+from infrastructure.database.schema import (
+    CREATE_RESERVATION_TABLES,
+    CREATE_RESERVATION_TABLES_INDEXES,
+    POPULATE_RESERVATION_TABLES,
+)
+
+
+def _initial_schema(cur: sqlite3.Cursor) -> None:
+    """Tablas base: mesas, reservas y pedidos."""
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS tables (
+        id INTEGER PRIMARY KEY,
+        capacity INTEGER,
+        location TEXT CHECK(location IN ('interior', 'terrace'))
+    )
+    """)
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS reservations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_id INTEGER,
+        name TEXT,
+        guests INTEGER,
+        date TEXT,
+        time TEXT,
+        phone TEXT,
+        duration INTEGER,
+        notes TEXT,
+        calendar_event_id TEXT,
+        merged_tables TEXT,
+        FOREIGN KEY(table_id) REFERENCES tables(id)
+    )
+    """)
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS orders (
+        order_id TEXT PRIMARY KEY,
+        items TEXT,
+        total_price REAL,
+        status TEXT,
+        customer_phone TEXT,
+        delivery_address TEXT
+    )""")
+
+
+def _reservation_tables(cur: sqlite3.Cursor) -> None:
+    """Relación reserva -> mesas, rellenada a partir de las reservas existentes."""
+    cur.execute(CREATE_RESERVATION_TABLES)
+    for sql in CREATE_RESERVATION_TABLES_INDEXES:
+        cur.execute(sql)
+    cur.execute(POPULATE_RESERVATION_TABLES)
+
+
+def _lookup_indexes(cur: sqlite3.Cursor) -> None:
+    """Índices para las consultas habituales y unicidad de (phone, date)."""
+    # get_all_available filtra por esta columna, que faltaba en el esquema inicial
+    columns = {row[1] for row in cur.execute("PRAGMA table_info(tables)")}
+    if "available" not in columns:
+        cur.execute("ALTER TABLE tables ADD COLUMN available INTEGER NOT NULL DEFAULT 1")
+
+    duplicates = cur.execute("""
+        SELECT phone, date, COUNT(*) FROM reservations
+        GROUP BY phone, date HAVING COUNT(*) > 1
+        LIMIT 5
+    """).fetchall()
+    if duplicates:
+        listed = ", ".join(f"{phone} el {date} ({n})" for phone, date, n in duplicates)
+        raise RuntimeError(
+            f"No se puede crear el índice único (phone, date): hay reservas duplicadas: {listed}. "
+            "Resuélvelas manualmente y vuelve a ejecutar la migración."
+        )
+
+    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_reservations_phone_date ON reservations(phone, date)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_reservations_date_time ON reservations(date, time)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_reservations_table_date ON reservations(table_id, date)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_orders_customer_phone ON orders(customer_phone)")
+
+
+def _table_adjacency(cur: sqlite3.Cursor) -> None:
+    """Grafo opcional de mesas que se pueden juntar físicamente (vacío = sin restricciones)."""
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS table_adjacency (
+        table_id INTEGER NOT NULL,
+        adjacent_table_id INTEGER NOT NULL,
+        PRIMARY KEY (table_id, adjacent_table_id),
+        FOREIGN KEY(table_id) REFERENCES tables(id),
+        FOREIGN KEY(adjacent_table_id) REFERENCES tables(id)
+    )
+    """)
+
+
+def _calendar_outbox(cur: sqlite3.Cursor) -> None:
+    """Cola persistente de operaciones pendientes contra el calendario externo."""
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS calendar_outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        reservation_id INTEGER NOT NULL,
+        operation TEXT NOT NULL CHECK(operation IN ('create', 'update', 'delete')),
+        payload TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending' CHECK(status IN ('pending', 'done', 'failed')),
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at REAL NOT NULL,
+        last_error TEXT,
+        calendar_event_id TEXT,
+        created_at REAL NOT NULL
+    )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_calendar_outbox_due ON calendar_outbox(status, next_attempt_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_calendar_outbox_reservation ON calendar_outbox(reservation_id, status)")
+
+
+def _floor_plan_version(cur: sqlite3.Cursor) -> None:
+    """Sello de versión del plano de mesas, incrementado por triggers en cada cambio."""
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS floor_plan_version (
+        id INTEGER PRIMARY KEY CHECK(id = 1),
+        version INTEGER NOT NULL
+    )
+    """)
+    cur.execute("INSERT OR IGNORE INTO floor_plan_version (id, version) VALUES (1, 0)")
+    for table in ("tables", "table_adjacency"):
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_floor_plan
+            AFTER {event} ON {table}
+            BEGIN
+                UPDATE floor_plan_version SET version = version + 1 WHERE id = 1;
+            END
+            """)
+
+
+def _reservation_tables_version(cur: sqlite3.Cursor) -> None:
+    """Sello de versión de la ocupación, incrementado por triggers en cada cambio de reservation_tables."""
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS reservation_tables_version (
+        id INTEGER PRIMARY KEY CHECK(id = 1),
+        version INTEGER NOT NULL
+    )
+    """)
+    cur.execute("INSERT OR IGNORE INTO reservation_tables_version (id, version) VALUES (1, 0)")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_reservation_tables_{event.lower()}_version
+        AFTER {event} ON reservation_tables
+        BEGIN
+            UPDATE reservation_tables_version SET version = version + 1 WHERE id = 1;
+        END
+        """)
+
+
+def _waitlist(cur: sqlite3.Cursor) -> None:
+    """Lista de espera por fecha, ubicación y ventana horaria."""
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS waitlist (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        phone TEXT NOT NULL,
+        guests INTEGER NOT NULL,
+        date TEXT NOT NULL,
+        location TEXT NOT NULL,
+        earliest_minute INTEGER NOT NULL,
+        latest_minute INTEGER NOT NULL,
+        auto_book INTEGER NOT NULL DEFAULT 0,
+        notes TEXT,
+        status TEXT NOT NULL DEFAULT 'waiting'
+            CHECK(status IN ('waiting', 'offered', 'booked', 'cancelled')),
+        offered_time TEXT,
+        offered_table_ids TEXT,
+        offer_expires_at REAL,
+        reservation_id INTEGER,
+        created_at REAL NOT NULL
+    )
+    """)
+    # Al liberarse sitio solo se consultan las entradas de esa fecha y ubicación, por orden de llegada
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_waitlist_slot ON waitlist(date, location, status, created_at)")
+    # Una sola entrada activa por teléfono y fecha
+    cur.execute("""
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_waitlist_phone_date ON waitlist(phone, date)
+    WHERE status IN ('waiting', 'offered')
+    """)
+
+
+# (versión, descripción, función). Añadir siempre al final con una versión nueva.
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Cursor], None]]] = [
+    (1, "esquema inicial", _initial_schema),
+    (2, "relación reservation_tables", _reservation_tables),
+    (3, "índices de consulta y unicidad de reservas", _lookup_indexes),
+    (4, "grafo de adyacencia de mesas", _table_adjacency),
+    (5, "outbox de sincronización con el calendario", _calendar_outbox),
+    (6, "sello de versión del plano de mesas", _floor_plan_version),
+    (7, "lista de espera", _waitlist),
+    (8, "sello de versión de la ocupación", _reservation_tables_version),
+]
+
+
+def get_version(conn: sqlite3.Connection) -> int:
+    """Devuelve la versión de esquema aplicada."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> List[Tuple[int, str]]:
+    """
+    Aplica las migraciones pendientes, cada una en su propia transacción.
+
+    Args:
+        conn: Conexión SQLite abierta
+
+    Returns:
+        Lista de (versión, descripción) de las migraciones aplicadas
+    """
+    previous_isolation = conn.isolation_level
+    conn.isolation_level = None  # Control explícito de las transacciones
+    applied = []
+    try:
+        current = get_version(conn)
+        for version, description, apply in MIGRATIONS:
+            if version <= current:
+                continue
+            cur = conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                apply(cur)
+                cur.execute(f"PRAGMA user_version = {version}")
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+            applied.append((version, description))
+    finally:
+        conn.isolation_level = previous_isolation
+    return applied
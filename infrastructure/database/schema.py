@@ -0,0 +1,46 @@
+"""Definiciones SQL compartidas del esquema de la base de datos."""
+
+# Relación normalizada reserva -> mesas. Incluye la fecha y el intervalo en minutos
+# de la reserva para que la detección de solapamientos sea una consulta indexada.
+CREATE_RESERVATION_TABLES = """
+CREATE TABLE IF NOT EXISTS reservation_tables (
+    reservation_id INTEGER NOT NULL,
+    table_id INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    start_minute INTEGER NOT NULL,
+    end_minute INTEGER NOT NULL,
+    PRIMARY KEY (reservation_id, table_id),
+    FOREIGN KEY(reservation_id) REFERENCES reservations(id) ON DELETE CASCADE,
+    FOREIGN KEY(table_id) REFERENCES tables(id)
+)
+"""
+
+CREATE_RESERVATION_TABLES_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_reservation_tables_table ON reservation_tables(table_id, date, start_minute)",
+    "CREATE INDEX IF NOT EXISTS idx_reservation_tables_slot ON reservation_tables(date, start_minute)",
+)
+
+# Minutos desde medianoche a partir de la columna time (HH:MM o H:MM)
+_START_MINUTE = (
+    "(CAST(substr(r.time, 1, instr(r.time, ':') - 1) AS INTEGER) * 60"
+    " + CAST(substr(r.time, instr(r.time, ':') + 1) AS INTEGER))"
+)
+
+# Rellena reservation_tables a partir de reservations: la mesa principal y las
+# mesas de merged_tables. Se usa tanto en la migración como al sincronizar.
+_POPULATE_RESERVATION_TABLES = f"""
+INSERT OR IGNORE INTO reservation_tables (reservation_id, table_id, date, start_minute, end_minute)
+SELECT r.id, r.table_id, r.date, {_START_MINUTE}, {_START_MINUTE} + r.duration
+FROM reservations r
+WHERE r.table_id IS NOT NULL {{filter}}
+UNION
+SELECT r.id, CAST(j.value AS INTEGER), r.date, {_START_MINUTE}, {_START_MINUTE} + r.duration
+FROM reservations r, json_each(r.merged_tables) j
+WHERE r.merged_tables IS NOT NULL AND json_valid(r.merged_tables) {{filter}}
+"""
+
+POPULATE_RESERVATION_TABLES = _POPULATE_RESERVATION_TABLES.format(filter="")
+POPULATE_RESERVATION_TABLES_FOR_ID = _POPULATE_RESERVATION_TABLES.format(filter="AND r.id = :id")
+POPULATE_RESERVATION_TABLES_FOR_RANGE = _POPULATE_RESERVATION_TABLES.format(
+    filter="AND r.id BETWEEN :first_id AND :last_id"
+)
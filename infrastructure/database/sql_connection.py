@@ -1,49 +1,273 @@
-"""Módulo de conexión y operaciones básicas de base de datos."""
+"""Módulo de conexión y operaciones básicas de base de datos.
+
+Cada hilo mantiene una conexión persistente por base de datos, configurada
+en modo WAL, en lugar de abrir y cerrar una conexión por sentencia.
+
+La base de datos sobre la que trabajan query()/execute()/transaction() es la
+de use_database() (una por restaurante en modo multi-restaurante) o, si no se
+ha fijado, DB_PATH.
+"""
+import contextvars
 import sqlite3
 import os
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, TypeVar
 from dotenv import load_dotenv
+from infrastructure.metrics import METRICS_ENABLED, record_statement
 
 load_dotenv()
 
 # Obtener la ruta de la base de datos desde .env
 DB_PATH = os.getenv("DATABASE_PATH", "resources/bookings.sqlite")
+# Milisegundos que una conexión espera a que se libere un bloqueo de escritura
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DATABASE_BUSY_TIMEOUT_MS", "5000"))
+# Sentencias preparadas que se cachean por conexión
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DATABASE_STATEMENT_CACHE_SIZE", "256"))
+# Filas leídas por bloque en las consultas en streaming (iter_query)
+DB_FETCH_SIZE = int(os.getenv("DATABASE_FETCH_SIZE", "500"))
+
+_local = threading.local()
+# Base de datos de la petición en curso; run_blocking la propaga a los hilos del pool
+_current_db: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_db", default=None)
+_all_connections = []
+_all_connections_lock = threading.Lock()
+# Se incrementa en close_connections() para que cada hilo descarte sus conexiones cerradas
+_generation = 0
+
+
+def _open_connection(db_path: str) -> sqlite3.Connection:
+    """Abre y configura una nueva conexión SQLite."""
+    conn = sqlite3.connect(
+        db_path,
+        timeout=DB_BUSY_TIMEOUT_MS / 1000,
+        cached_statements=DB_STATEMENT_CACHE_SIZE,
+        isolation_level=None,  # Autocommit: las transacciones se abren con transaction()
+        check_same_thread=False,  # Solo para poder cerrarla desde close_connections()
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+def current_database() -> str:
+    """Ruta de la base de datos activa en este contexto."""
+    return _current_db.get() or DB_PATH
+
+
+@contextmanager
+def use_database(db_path: Optional[str]):
+    """
+    Dirige a `db_path` todas las operaciones del bloque (y de las tareas que
+    copien el contexto). Con None se mantiene la base de datos actual.
+    """
+    if db_path is None:
+        yield
+        return
+    token = _current_db.set(db_path)
+    try:
+        yield
+    finally:
+        _current_db.reset(token)
+
+
+T = TypeVar("T")
+
+
+def per_database(factory: Callable[[], T]) -> Callable[[], T]:
+    """
+    Devuelve una función que da una instancia de `factory` por base de datos
+    activa, creada la primera vez que se pide (cachés que no deben mezclar
+    datos de restaurantes distintos).
+    """
+    instances: Dict[str, T] = {}
+    lock = threading.Lock()
+
+    def get() -> T:
+        db_path = current_database()
+        instance = instances.get(db_path)
+        if instance is None:
+            with lock:
+                instance = instances.get(db_path)
+                if instance is None:
+                    instance = instances[db_path] = factory()
+        return instance
+
+    return get
+
+
+def get_connection(db_path: str = None) -> sqlite3.Connection:
+    """Obtiene la conexión persistente del hilo actual a la base de datos SQLite."""
+    db_path = db_path or current_database()
+    connections = getattr(_local, "connections", None)
+    if connections is None or _local.generation != _generation:
+        connections = _local.connections = {}
+        _local.generation = _generation
 
+    conn = connections.get(db_path)
+    if conn is None:
+        conn = _open_connection(db_path)
+        connections[db_path] = conn
+        with _all_connections_lock:
+            _all_connections.append(conn)
+    return conn
 
-def get_connection():
-    """Obtiene una conexión a la base de datos SQLite."""
-    return sqlite3.connect(DB_PATH)
+
+def close_connections() -> None:
+    """Cierra todas las conexiones abiertas por cualquier hilo (p. ej. al apagar el servidor)."""
+    global _generation
+    with _all_connections_lock:
+        _generation += 1
+        for conn in _all_connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        _all_connections.clear()
+
+
+@contextmanager
+def transaction(immediate: bool = True):
+    """
+    Ejecuta varias sentencias en una única transacción.
+
+    Las llamadas a query()/execute() dentro del bloque usan la misma conexión y
+    se confirman juntas al salir; si se produce una excepción se deshacen todas.
+    Las transacciones anidadas se unen a la exterior.
+
+    Args:
+        immediate: Si es True usa BEGIN IMMEDIATE (reserva el bloqueo de escritura al inicio)
+
+    Yields:
+        La conexión de la transacción
+    """
+    conn = get_connection()
+    if conn.in_transaction:
+        yield conn
+        return
+
+    conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+    _local.after_commit = []
+    try:
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            # También si falla el commit (p. ej. SQLITE_BUSY o disco lleno): la transacción no debe quedar abierta
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        callbacks = _local.after_commit
+    finally:
+        # Sin esto, un commit fallido dejaría la lista viva y los after_commit posteriores no se ejecutarían nunca
+        _local.after_commit = None
+    for callback in callbacks:
+        callback()
+
+
+def after_commit(callback) -> None:
+    """
+    Ejecuta `callback` cuando se confirme la transacción en curso del hilo
+    (se descarta si se deshace). Fuera de una transacción se ejecuta ya.
+    Sirve para invalidar cachés solo cuando los cambios son visibles.
+    """
+    callbacks = getattr(_local, "after_commit", None)
+    if callbacks is None:
+        callback()
+    else:
+        callbacks.append(callback)
 
 
 def query(sql: str, params: tuple = ()):
     """
     Ejecuta una consulta SELECT y retorna los resultados como lista de diccionarios.
-    
+
     Args:
         sql: Sentencia SQL SELECT
         params: Parámetros para la consulta
-        
+
     Returns:
         Lista de diccionarios con los resultados
     """
-    conn = get_connection()
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-    cur.execute(sql, params)
-    rows = cur.fetchall()
-    conn.close()
-    return [dict(r) for r in rows]
+    if METRICS_ENABLED:
+        record_statement("query")
+    cur = get_connection().execute(sql, params)
+    return [dict(r) for r in cur.fetchall()]
+
+
+def query_rows(sql: str, params: tuple = ()):
+    """
+    Como query, pero devuelve las filas como tuplas sin convertirlas a
+    diccionarios. Para lecturas grandes que se pasan a columnas (informes).
+
+    Returns:
+        Lista de tuplas en el orden de las columnas del SELECT
+    """
+    if METRICS_ENABLED:
+        record_statement("query")
+    cur = get_connection().execute(sql, params)
+    cur.row_factory = None
+    return cur.fetchall()
+
+
+def iter_query(sql: str, params: tuple = (), fetch_size: int = DB_FETCH_SIZE):
+    """
+    Ejecuta una consulta SELECT y genera las filas como diccionarios de
+    `fetch_size` en `fetch_size`, sin cargar el resultado completo en memoria.
+
+    Args:
+        sql: Sentencia SQL SELECT
+        params: Parámetros para la consulta
+        fetch_size: Filas leídas de SQLite en cada bloque
+
+    Yields:
+        Un diccionario por fila
+    """
+    if METRICS_ENABLED:
+        record_statement("query")
+    cur = get_connection().execute(sql, params)
+    try:
+        while True:
+            rows = cur.fetchmany(fetch_size)
+            if not rows:
+                break
+            for r in rows:
+                yield dict(r)
+    finally:
+        cur.close()
 
 
 def execute(sql: str, params: tuple = ()):
     """
     Ejecuta una sentencia INSERT, UPDATE o DELETE.
-    
+
+    Fuera de transaction() la sentencia se confirma inmediatamente (autocommit).
+
     Args:
         sql: Sentencia SQL
         params: Parámetros para la sentencia
+
+    Returns:
+        ID de la última fila insertada (si aplica)
     """
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(sql, params)
-    conn.commit()
-    conn.close()
+    if METRICS_ENABLED:
+        record_statement("execute")
+    cur = get_connection().execute(sql, params)
+    return cur.lastrowid
+
+
+def execute_many(sql: str, rows) -> int:
+    """
+    Ejecuta una sentencia INSERT/UPDATE para cada tupla de parámetros de `rows`
+    con un único executemany (sentencia preparada una sola vez).
+
+    Returns:
+        Número de filas afectadas
+    """
+    if METRICS_ENABLED:
+        record_statement("execute")
+    cur = get_connection().executemany(sql, rows)
+    return cur.rowcount
@@ -0,0 +1,100 @@
+"""Circuit breaker para aislar los fallos de servicios externos."""
+import threading
+import time
+from collections import deque
+
+
+class CircuitOpenError(Exception):
+    """La llamada se ha rechazado porque el circuito está abierto."""
+
+
+class CircuitBreaker:
+    """
+    Corta las llamadas a un servicio externo cuando su tasa de error es alta.
+
+    - Cerrado: las llamadas pasan y se anota el resultado de las últimas `window`.
+    - Abierto: si al menos `min_calls` de la ventana y una proporción
+      `failure_rate` han fallado, las llamadas se rechazan sin esperar al servicio
+      durante `reset_timeout` segundos.
+    - Semiabierto: pasado ese tiempo se deja pasar una llamada de prueba; si
+      funciona se cierra y si falla vuelve a abrirse.
+
+    Uso:
+        if not breaker.allow():
+            return None  # Se reintentará más tarde
+        try:
+            result = call()
+        except Exception:
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_rate: float = 0.5, window: int = 20,
+                 min_calls: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self._outcomes = deque(maxlen=window)  # True = fallo
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def is_open(self) -> bool:
+        """True mientras las llamadas se rechazan (no consume la llamada de prueba)."""
+        with self._lock:
+            state = self._current_state()
+            return state == self.OPEN or (state == self.HALF_OPEN and self._probe_in_flight)
+
+    def allow(self) -> bool:
+        """Indica si se puede hacer una llamada ahora."""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                print(f"✅ {self.name}: servicio recuperado, circuito cerrado")
+                self._state = self.CLOSED
+                self._outcomes.clear()
+            self._outcomes.append(False)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._open()
+                return
+            self._outcomes.append(True)
+            failures = sum(self._outcomes)
+            if (self._state == self.CLOSED and len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.failure_rate):
+                self._open()
+
+    def _open(self) -> None:
+        print(f"⚠️ {self.name}: demasiados errores, circuito abierto durante {self.reset_timeout:.0f} s")
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
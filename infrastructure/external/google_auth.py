@@ -1,5 +1,7 @@
 """Autenticación con Google Calendar API."""
 import os
+import threading
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Optional
 from google.oauth2.credentials import Credentials
@@ -11,6 +13,9 @@ import pickle
 # Si modificas los SCOPES, elimina el archivo token.pickle
 SCOPES = ['https://www.googleapis.com/auth/calendar']
 
+# Renovar el token cuando le queden menos de estos segundos de validez
+TOKEN_REFRESH_MARGIN = int(os.getenv("GOOGLE_TOKEN_REFRESH_MARGIN", "300"))
+
 
 class GoogleAuthManager:
     """Gestor de autenticación OAuth2 para Google Calendar."""
@@ -28,17 +33,57 @@ class GoogleAuthManager:
             self.token_path = Path(token_path)
         else:
             self.token_path = self.credentials_path.parent / "token.pickle"
+        # Credenciales en memoria: token.pickle solo se lee la primera vez
+        self._creds: Optional[Credentials] = None
+        self._lock = threading.Lock()
     
     def get_credentials(self) -> Optional[Credentials]:
         """
         Obtiene credenciales válidas para Google Calendar API.
         
-        Si no existen credenciales guardadas o están expiradas,
-        inicia el flujo de autenticación OAuth2.
+        Devuelve las credenciales en memoria mientras les quede más de
+        TOKEN_REFRESH_MARGIN segundos; si no, las renueva antes de que caduquen.
+        Si no existen credenciales guardadas, inicia el flujo de autenticación OAuth2.
         
         Returns:
             Credenciales válidas o None si falla
         """
+        creds = self._creds
+        if creds and not self._needs_refresh(creds):
+            return creds
+        
+        # Un único hilo carga o renueva; el resto reutiliza su resultado
+        with self._lock:
+            if self._creds is None:
+                self._creds = self._load_or_authorize()
+            elif self._needs_refresh(self._creds):
+                self._refresh(self._creds)
+            return self._creds
+    
+    @staticmethod
+    def _needs_refresh(creds: Credentials) -> bool:
+        """True si el token no es válido o caduca dentro del margen."""
+        if not creds.valid:
+            return True
+        if creds.expiry is None:
+            return False
+        # google-auth guarda expiry como datetime UTC sin zona horaria
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        return creds.expiry - now < timedelta(seconds=TOKEN_REFRESH_MARGIN)
+    
+    def _refresh(self, creds: Credentials) -> None:
+        """Renueva el token y lo guarda en disco para el próximo arranque."""
+        if not creds.refresh_token:
+            return
+        creds.refresh(Request())
+        self._save(creds)
+    
+    def _save(self, creds: Credentials) -> None:
+        with open(self.token_path, 'wb') as token:
+            pickle.dump(creds, token)
+    
+    def _load_or_authorize(self) -> Credentials:
+        """Carga token.pickle (renovándolo si hace falta) o inicia el flujo OAuth2."""
         creds = None
         
         # Cargar credenciales guardadas si existen
@@ -46,27 +91,24 @@ class GoogleAuthManager:
             with open(self.token_path, 'rb') as token:
                 creds = pickle.load(token)
         
-        # Si no hay credenciales válidas, obtenerlas
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                # Refrescar token expirado
-                creds.refresh(Request())
-            else:
-                # Iniciar flujo OAuth2
-                if not self.credentials_path.exists():
-                    raise FileNotFoundError(
-                        f"No se encontró el archivo de credenciales: {self.credentials_path}\n"
-                        "Descárgalo desde Google Cloud Console."
-                    )
-                
-                flow = InstalledAppFlow.from_client_secrets_file(
-                    str(self.credentials_path),
-                    SCOPES
+        if creds and creds.refresh_token and self._needs_refresh(creds):
+            # Refrescar token expirado o a punto de caducar
+            self._refresh(creds)
+        elif not creds or not creds.valid:
+            # Iniciar flujo OAuth2
+            if not self.credentials_path.exists():
+                raise FileNotFoundError(
+                    f"No se encontró el archivo de credenciales: {self.credentials_path}\n"
+                    "Descárgalo desde Google Cloud Console."
                 )
-                creds = flow.run_local_server(port=0)
+            
+            flow = InstalledAppFlow.from_client_secrets_file(
+                str(self.credentials_path),
+                SCOPES
+            )
+            creds = flow.run_local_server(port=0)
             
             # Guardar credenciales para la próxima vez
-            with open(self.token_path, 'wb') as token:
-                pickle.dump(creds, token)
+            self._save(creds)
         
         return creds
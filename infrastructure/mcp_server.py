@@ -4,6 +4,8 @@ import os
 from dotenv import load_dotenv
 from typing import Optional
 import json
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
 
 # Añadir el directorio raíz al path para los imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -12,14 +14,11 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 load_dotenv()
 
 # Importar dependencias de las capas correctas
-from core.services.booking_service import BookingService
-from core.services.table_service import TableService
-from core.services.information_service import InformationService
-
-from infrastructure.repositories.sql_reservation_repository import SQLReservationRepository
-from infrastructure.repositories.sql_table_repository import SQLTableRepository
-from infrastructure.repositories.json_holiday_repository import JSONHolidayRepository
-from infrastructure.repositories.google_calendar_repository import GoogleCalendarRepository
+from infrastructure.tenants import TenantRegistry, Tenant
+from infrastructure.database.sql_connection import close_connections
+from infrastructure.async_executor import run_blocking, shutdown as shutdown_executor
+from infrastructure.metrics import instrument_tool, metrics
+from infrastructure.tool_recorder import MCP_RECORD_PATH, record_tool, close as close_recorder
 
 # ============================================================
 # CONFIGURACIÓN DEL SERVIDOR MCP
@@ -33,43 +32,26 @@ mcp = FastMCP(MCP_SERVER_NAME)
 # ============================================================
 # INYECCIÓN DE DEPENDENCIAS (FASE DE ARRANQUE)
 # ============================================================
-reservation_repo = SQLReservationRepository()
-table_repo = SQLTableRepository()
-holiday_repo = JSONHolidayRepository()
+# Repositorios y servicios de cada restaurante. Con TENANTS_JSON cada
+# restaurante tiene su propia base de datos y se prepara en su primera llamada;
+# sin él hay un único restaurante con la configuración del .env.
+tenants = TenantRegistry()
+if not tenants.multi_tenant:
+    tenants.get()
 
-# Configurar Google Calendar si está habilitado
-calendar_repo = None
-if os.getenv("GOOGLE_CALENDAR_ENABLED", "false").lower() == "true":
-    try:
-        calendar_repo = GoogleCalendarRepository(
-            calendar_id=os.getenv("GOOGLE_CALENDAR_ID", "primary"),
-            credentials_path=os.getenv("GOOGLE_CREDENTIALS_PATH", "resources/google_credentials.json")
-        )
-        print("✅ Google Calendar integrado correctamente")
-    except Exception as e:
-        print(f"⚠️ No se pudo conectar con Google Calendar: {e}")
-        print("   Las reservas se crearán sin sincronización de calendario")
-
-booking_service = BookingService(
-    reservation_repo=reservation_repo,
-    table_repo=table_repo,
-    holiday_repo=holiday_repo,
-    calendar_repo=calendar_repo
-)
-
-table_service = TableService(
-    table_repo=table_repo,
-    holiday_repo=holiday_repo
-)
-
-info_service = InformationService()
+
+async def _tenant(restaurant_id: Optional[str]) -> Tenant:
+    """Restaurante de la llamada. Prepararlo (migraciones, ficheros) se hace fuera del bucle de eventos."""
+    return tenants.loaded(restaurant_id) or await run_blocking(tenants.get, restaurant_id)
 
 # ============================================================
 # EXPOSICIÓN DE FUNCIONALIDADES A MCP
 # ============================================================
 
 @mcp.tool
-def reserve_table(table_id: int, name: str, guests: int, date: str, time: str, phone: str, notes: Optional[str] = None, merged_tables: Optional[str] = None):
+@instrument_tool
+@record_tool
+async def reserve_table(table_id: int, name: str, guests: int, date: str, time: str, phone: str, notes: Optional[str] = None, merged_tables: Optional[str] = None, restaurant_id: Optional[str] = None):
     """
     Crea una nueva reserva. 
     
@@ -77,28 +59,41 @@ def reserve_table(table_id: int, name: str, guests: int, date: str, time: str, p
         table_id: ID de la mesa principal
         merged_tables: JSON string con lista de IDs de mesas combinadas (ej: "[1,2,3]")
         notes: Notas opcionales (ej: silla para bebés, alergia, etc)
+        restaurant_id: Restaurante (solo si el servidor atiende a varios; ver get_restaurants)
     """
     merged_list = json.loads(merged_tables) if merged_tables else None
-    return booking_service.create_reservation(table_id, name, guests, date, time, phone, notes, merged_list)
+    tenant = await _tenant(restaurant_id)
+    return await tenant.async_booking_service.create_reservation(table_id, name, guests, date, time, phone, notes, merged_list)
 
 @mcp.tool
-def cancel_reservation(phone: str, date: str):
+@instrument_tool
+@record_tool
+async def cancel_reservation(phone: str, date: str, restaurant_id: Optional[str] = None):
     """Cancela una reserva existente."""
-    return booking_service.cancel_reservation(phone, date)
+    tenant = await _tenant(restaurant_id)
+    return await tenant.async_booking_service.cancel_reservation(phone, date)
 
 @mcp.tool
-def modify_reservation_by_phone(phone: str, date: str, new_time: str = None, new_date: str = None, new_guests: int = None):
+@instrument_tool
+@record_tool
+async def modify_reservation_by_phone(phone: str, date: str, new_time: str = None, new_date: str = None, new_guests: int = None, restaurant_id: Optional[str] = None):
     """Modifica una reserva existente por teléfono."""
     updates = {k: v for k, v in {"time": new_time, "date": new_date, "guests": new_guests}.items() if v}
-    return booking_service.modify_reservation(phone, date, updates)
+    tenant = await _tenant(restaurant_id)
+    return await tenant.async_booking_service.modify_reservation(phone, date, updates)
 
 @mcp.tool
-def get_reservation(phone: str, date: str):
+@instrument_tool
+@record_tool
+async def get_reservation(phone: str, date: str, restaurant_id: Optional[str] = None):
     """Obtiene la información de una reserva existente."""
-    return booking_service.get_reservation(phone, date)
+    tenant = await _tenant(restaurant_id)
+    return await tenant.async_booking_service.get_reservation(phone, date)
 
 @mcp.tool
-def find_table(guests: int, location: str, date: str, time: str):
+@instrument_tool
+@record_tool
+async def find_table(guests: int, location: str, date: str, time: str, restaurant_id: Optional[str] = None):
     """
     Busca mesas disponibles. Si no hay una mesa individual suficiente,
     automáticamente busca combinaciones de mesas en la misma ubicación.
@@ -108,32 +103,155 @@ def find_table(guests: int, location: str, date: str, time: str):
         - merged: True si es una combinación de mesas
         - Si merged=True, la mesa incluirá 'table_ids' con los IDs a combinar
     """
-    return table_service.find_table(guests, location, date, time)
+    tenant = await _tenant(restaurant_id)
+    return await tenant.async_table_service.find_table(guests, location, date, time)
+
+@mcp.tool
+@instrument_tool
+@record_tool
+async def find_free_slots(guests: int, location: str, date: str, granularity: int = 15, restaurant_id: Optional[str] = None):
+    """
+    Devuelve todas las horas de inicio con sitio para un grupo en una fecha y ubicación.
+    Útil para preguntas como "¿a qué hora hay sitio para 6 en la terraza el sábado?".
+    
+    Args:
+        granularity: Minutos entre horas candidatas (por defecto 15)
+    
+    Returns:
+        - slots: Lista de {time, merged, table_ids} con las horas reservables
+    """
+    tenant = await _tenant(restaurant_id)
+    return await tenant.async_table_service.find_free_slots(guests, location, date, granularity)
 
 @mcp.tool
-def get_tables():
+@instrument_tool
+@record_tool
+async def next_available(guests: int, location: str, from_date: Optional[str] = None, preferred_time: Optional[str] = None, horizon_days: int = 14, limit: int = 5, restaurant_id: Optional[str] = None):
+    """
+    Busca las próximas fechas y horas con sitio para un grupo cuando el día pedido está completo.
+    Salta lunes y festivos y ordena las horas de cada día por cercanía a la hora preferida.
+    
+    Args:
+        from_date: Primera fecha a considerar (por defecto hoy)
+        preferred_time: Hora deseada HH:MM (ej: "21:00")
+        horizon_days: Días a recorrer desde from_date (máximo 60)
+        limit: Número máximo de opciones
+    
+    Returns:
+        - options: Lista de {date, time, merged, table_ids, minutes_from_preferred}
+    """
+    tenant = await _tenant(restaurant_id)
+    return await tenant.async_table_service.next_available(guests, location, from_date, preferred_time, horizon_days, limit)
+
+@mcp.tool
+@instrument_tool
+@record_tool
+async def join_waitlist(name: str, phone: str, guests: int, date: str, location: str, earliest_time: str, latest_time: str, auto_book: bool = False, notes: Optional[str] = None, restaurant_id: Optional[str] = None):
+    """
+    Apunta a un cliente a la lista de espera cuando no hay sitio en la fecha pedida.
+    Si se libera una mesa entre earliest_time y latest_time, se reserva automáticamente
+    (auto_book=True) o se le ofrece la hora durante un tiempo limitado.
+
+    Args:
+        earliest_time: Primera hora aceptable HH:MM (ej: "20:00")
+        latest_time: Última hora aceptable HH:MM (ej: "22:00")
+        auto_book: Crear la reserva sin confirmación al liberarse sitio
+    """
+    tenant = await _tenant(restaurant_id)
+    return await tenant.async_waitlist_service.join_waitlist(name, phone, guests, date, location, earliest_time, latest_time, auto_book, notes)
+
+@mcp.tool
+@instrument_tool
+@record_tool
+async def leave_waitlist(phone: str, date: str, restaurant_id: Optional[str] = None):
+    """Saca a un cliente de la lista de espera de una fecha."""
+    tenant = await _tenant(restaurant_id)
+    return await tenant.async_waitlist_service.leave_waitlist(phone, date)
+
+@mcp.tool
+@instrument_tool
+@record_tool
+async def get_waitlist_status(phone: str, date: str, restaurant_id: Optional[str] = None):
+    """Devuelve el estado en la lista de espera de un cliente: 'waiting' u 'offered' (con la hora ofrecida y su caducidad)."""
+    tenant = await _tenant(restaurant_id)
+    return await tenant.async_waitlist_service.get_status(phone, date)
+
+@mcp.tool
+@instrument_tool
+@record_tool
+async def accept_waitlist_offer(phone: str, date: str, restaurant_id: Optional[str] = None):
+    """Confirma la hora ofrecida a un cliente de la lista de espera y crea la reserva."""
+    tenant = await _tenant(restaurant_id)
+    return await tenant.async_waitlist_service.accept_offer(phone, date)
+
+@mcp.tool
+@instrument_tool
+@record_tool
+async def get_tables(restaurant_id: Optional[str] = None):
     """Devuelve todas las mesas disponibles."""
-    return table_service.get_tables()
+    tenant = await _tenant(restaurant_id)
+    return await tenant.async_table_service.get_tables()
 
 @mcp.tool
-def get_opening_hours():
+@instrument_tool
+@record_tool
+async def get_opening_hours(restaurant_id: Optional[str] = None):
     """Devuelve el horario de apertura del restaurante."""
-    return info_service.get_opening_hours()
+    tenant = await _tenant(restaurant_id)
+    return tenant.info_service.get_opening_hours()
 
 @mcp.tool
-def is_open(date: str, time: str):
+@instrument_tool
+@record_tool
+async def is_open(date: str, time: str, restaurant_id: Optional[str] = None):
     """Indica si el restaurante está abierto en la fecha y hora especificadas. Devuelve el estado y la razón si está cerrado."""
-    result = info_service.is_open(date, time, holiday_repo=holiday_repo)
+    tenant = await _tenant(restaurant_id)
+    result = await tenant.async_info_service.is_open(date, time, holiday_repo=tenant.holiday_repo)
     if not result:
         return {"status": "open", "message": "El restaurante está abierto en esa fecha y hora."}
     else:
         return {"status": "closed", "reason": result}
 
 @mcp.tool
-def get_opening_days():
+@instrument_tool
+@record_tool
+async def get_opening_days(restaurant_id: Optional[str] = None):
     """Devuelve los días de apertura del restaurante."""
-    return info_service.get_opening_days()
+    tenant = await _tenant(restaurant_id)
+    return tenant.info_service.get_opening_days()
+
+@mcp.tool
+@instrument_tool
+@record_tool
+async def occupancy_report(start_date: str, end_date: str, bucket_minutes: int = 60, by_table: bool = False, restaurant_id: Optional[str] = None):
+    """
+    Informe para gerencia entre dos fechas (hasta dos años): ocupación media de plazas por franja horaria,
+    ocupación de cada mesa, cubiertos por día y por día de la semana y distribución del tamaño de los grupos.
 
+    Args:
+        bucket_minutes: Tamaño de la franja horaria (15, 30 o 60)
+        by_table: Incluir los minutos-plaza de cada mesa por franja (respuesta más grande)
+    """
+    tenant = await _tenant(restaurant_id)
+    return await tenant.async_report_service.occupancy_report(start_date, end_date, bucket_minutes, by_table)
+
+@mcp.tool
+def get_restaurants():
+    """Devuelve los restaurantes que atiende el servidor (id y nombre). El id se pasa como restaurant_id al resto de herramientas."""
+    return tenants.restaurants()
+
+@mcp.tool
+def get_metrics():
+    """Devuelve las métricas del servidor: llamadas, errores, latencia y sentencias SQL por herramienta."""
+    return metrics.snapshot()
+
+
+# ============================================================
+# MÉTRICAS EN FORMATO PROMETHEUS
+# ============================================================
+@mcp.custom_route("/metrics", methods=["GET"])
+async def prometheus_metrics(request: Request) -> PlainTextResponse:
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
 
 # ============================================================
 # EJECUCIÓN DEL SERVIDOR MCP
@@ -141,4 +259,13 @@ def get_opening_days():
 if __name__ == "__main__":
     print(f"Iniciando servidor MCP de reservas '{MCP_SERVER_NAME}'...")
     print(f"Host: {MCP_SERVER_HOST}:{MCP_SERVER_PORT}")
-    mcp.run(transport="http", host=MCP_SERVER_HOST, port=MCP_SERVER_PORT)
+    if MCP_RECORD_PATH:
+        print(f"⚠️ Grabando las llamadas a herramientas en {MCP_RECORD_PATH}")
+    tenants.start()
+    try:
+        mcp.run(transport="http", host=MCP_SERVER_HOST, port=MCP_SERVER_PORT)
+    finally:
+        tenants.close()
+        shutdown_executor()
+        close_connections()
+        close_recorder()
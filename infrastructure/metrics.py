@@ -0,0 +1,195 @@
+"""Métricas del servidor MCP: latencia por herramienta y sentencias SQL.
+
+Se registran en memoria y se exponen en formato de texto de Prometheus
+(ruta /metrics) o como diccionario (herramienta get_metrics). Con
+METRICS_ENABLED=false el decorador devuelve la función original y
+sql_connection no cuenta nada, así que el coste es nulo.
+"""
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence
+from dotenv import load_dotenv
+
+load_dotenv()
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Límites superiores de los buckets (segundos y número de sentencias)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+# Contador de sentencias SQL de la petición en curso. Es una lista mutable para
+# que los hilos del pool (que reciben una copia del contexto) sumen sobre el mismo objeto.
+_request_statements: contextvars.ContextVar[Optional[List[int]]] = contextvars.ContextVar(
+    "request_statements", default=None
+)
+
+
+class Histogram:
+    """Histograma acumulativo con buckets fijos, al estilo de Prometheus."""
+
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # El último es +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Cota superior aproximada del cuantil q (límite del bucket que lo contiene)."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def cumulative(self) -> List[int]:
+        total = 0
+        result = []
+        for n in self.counts:
+            total += n
+            result.append(total)
+        return result
+
+
+class MetricsRegistry:
+    """Métricas por herramienta y contadores de SQL del proceso."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tool_latency: Dict[str, Histogram] = {}
+        self.tool_statements: Dict[str, Histogram] = {}
+        self.tool_calls: Dict[str, int] = {}
+        self.tool_errors: Dict[str, int] = {}
+        self.sql_statements: Dict[str, int] = {"query": 0, "execute": 0}
+
+    def record_tool(self, tool: str, seconds: float, statements: int, error: bool) -> None:
+        with self._lock:
+            if tool not in self.tool_latency:
+                self.tool_latency[tool] = Histogram(LATENCY_BUCKETS)
+                self.tool_statements[tool] = Histogram(STATEMENT_BUCKETS)
+                self.tool_calls[tool] = 0
+                self.tool_errors[tool] = 0
+            self.tool_latency[tool].observe(seconds)
+            self.tool_statements[tool].observe(statements)
+            self.tool_calls[tool] += 1
+            if error:
+                self.tool_errors[tool] += 1
+
+    def record_statement(self, kind: str) -> None:
+        counter = _request_statements.get()
+        if counter is not None:
+            counter[0] += 1
+        # Un += sobre un dict no es atómico entre hilos
+        with self._lock:
+            self.sql_statements[kind] += 1
+
+    def snapshot(self) -> Dict[str, object]:
+        """Resumen legible: llamadas, errores, latencias y sentencias por herramienta."""
+        with self._lock:
+            tools = {}
+            for tool, latency in self.tool_latency.items():
+                statements = self.tool_statements[tool]
+                tools[tool] = {
+                    "calls": self.tool_calls[tool],
+                    "errors": self.tool_errors[tool],
+                    "latency_mean_ms": round(latency.sum / latency.count * 1000, 3),
+                    "latency_p50_ms_le": latency.quantile(0.5) * 1000,
+                    "latency_p99_ms_le": latency.quantile(0.99) * 1000,
+                    "sql_statements_mean": round(statements.sum / statements.count, 2),
+                    "sql_statements_p99_le": statements.quantile(0.99),
+                }
+            return {"enabled": METRICS_ENABLED, "tools": tools, "sql_statements_total": dict(self.sql_statements)}
+
+    def render_prometheus(self) -> str:
+        """Métricas en formato de texto de Prometheus."""
+        lines = []
+        with self._lock:
+            lines += ["# HELP mcp_tool_calls_total Llamadas a cada herramienta MCP", "# TYPE mcp_tool_calls_total counter"]
+            lines += [f'mcp_tool_calls_total{{tool="{t}"}} {n}' for t, n in sorted(self.tool_calls.items())]
+            lines += ["# HELP mcp_tool_errors_total Llamadas que terminaron con excepción", "# TYPE mcp_tool_errors_total counter"]
+            lines += [f'mcp_tool_errors_total{{tool="{t}"}} {n}' for t, n in sorted(self.tool_errors.items())]
+            lines += _render_histograms(
+                "mcp_tool_latency_seconds", "Latencia de cada herramienta MCP", self.tool_latency)
+            lines += _render_histograms(
+                "mcp_tool_sql_statements", "Sentencias SQL por llamada a cada herramienta", self.tool_statements)
+            lines += ["# HELP sql_statements_total Sentencias SQL ejecutadas", "# TYPE sql_statements_total counter"]
+            lines += [f'sql_statements_total{{kind="{k}"}} {n}' for k, n in sorted(self.sql_statements.items())]
+        return "\n".join(lines) + "\n"
+
+
+def _render_histograms(name: str, help_text: str, histograms: Dict[str, Histogram]) -> List[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for tool, histogram in sorted(histograms.items()):
+        bounds = [*(f"{b:g}" for b in histogram.buckets), "+Inf"]
+        for bound, total in zip(bounds, histogram.cumulative()):
+            lines.append(f'{name}_bucket{{tool="{tool}",le="{bound}"}} {total}')
+        lines.append(f'{name}_sum{{tool="{tool}"}} {histogram.sum:g}')
+        lines.append(f'{name}_count{{tool="{tool}"}} {histogram.count}')
+    return lines
+
+
+# Registro compartido por todo el proceso
+metrics = MetricsRegistry()
+
+
+def record_statement(kind: str) -> None:
+    """Anota una sentencia SQL ('query' o 'execute'). Lo llama sql_connection."""
+    metrics.record_statement(kind)
+
+
+def instrument_tool(fn):
+    """
+    Decorador para herramientas MCP (síncronas o asíncronas): mide la latencia,
+    cuenta llamadas, errores y sentencias SQL de la petición. Se aplica debajo
+    de @mcp.tool; conserva la firma para que FastMCP genere el mismo esquema.
+    """
+    if not METRICS_ENABLED:
+        return fn
+    name = fn.__name__
+
+    if asyncio.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            counter = [0]
+            token = _request_statements.set(counter)
+            started = time.perf_counter()
+            error = True
+            try:
+                result = await fn(*args, **kwargs)
+                error = False
+                return result
+            finally:
+                metrics.record_tool(name, time.perf_counter() - started, counter[0], error)
+                _request_statements.reset(token)
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        counter = [0]
+        token = _request_statements.set(counter)
+        started = time.perf_counter()
+        error = True
+        try:
+            result = fn(*args, **kwargs)
+            error = False
+            return result
+        finally:
+            metrics.record_tool(name, time.perf_counter() - started, counter[0], error)
+            _request_statements.reset(token)
+    return wrapper
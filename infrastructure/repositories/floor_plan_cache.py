@@ -0,0 +1,88 @@
+"""Caché en memoria del plano de mesas.
+
+La tabla `tables` (y su grafo de adyacencia) casi nunca cambia, pero se
+consulta varias veces en cada reserva. Se carga entera en memoria, indexada
+por id y por ubicación/capacidad, y se recarga solo cuando cambia el sello
+floor_plan_version (mantenido por triggers) o al invalidarla explícitamente.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Any, Set, Optional
+from dotenv import load_dotenv
+
+from infrastructure.database.sql_connection import query, transaction, per_database
+
+load_dotenv()
+
+# Segundos entre comprobaciones del sello de versión (0 = en cada acceso)
+FLOOR_PLAN_CHECK_INTERVAL = float(os.getenv("FLOOR_PLAN_CHECK_INTERVAL", "5"))
+
+
+class FloorPlan:
+    """Instantánea inmutable del plano de mesas."""
+
+    __slots__ = ("version", "by_id", "by_location", "capacities", "available", "adjacency")
+
+    def __init__(self, version: int, tables: List[Dict[str, Any]], adjacency_rows: List[Dict[str, Any]]):
+        self.version = version
+        tables = sorted(tables, key=lambda t: (t["capacity"], t["id"]))
+        self.by_id: Dict[int, Dict[str, Any]] = {t["id"]: t for t in tables}
+        # Mesas de cada ubicación ordenadas por capacidad, con sus capacidades para bisect
+        self.by_location: Dict[str, List[Dict[str, Any]]] = {}
+        for t in tables:
+            self.by_location.setdefault(t["location"], []).append(t)
+        self.capacities = {loc: [t["capacity"] for t in ts] for loc, ts in self.by_location.items()}
+        self.available = [t for t in sorted(tables, key=lambda t: t["id"]) if t.get("available")]
+        self.adjacency: Dict[int, Set[int]] = {}
+        for r in adjacency_rows:
+            self.adjacency.setdefault(r["table_id"], set()).add(r["adjacent_table_id"])
+            self.adjacency.setdefault(r["adjacent_table_id"], set()).add(r["table_id"])
+
+    def by_location_and_capacity(self, location: str, min_capacity: int) -> List[Dict[str, Any]]:
+        tables = self.by_location.get(location, [])
+        return tables[bisect_left(self.capacities[location], min_capacity):] if tables else []
+
+
+class FloorPlanCache:
+    """Caché de lectura del plano de mesas con sello de versión."""
+
+    def __init__(self, check_interval: float = FLOOR_PLAN_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._plan: Optional[FloorPlan] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> FloorPlan:
+        """Devuelve el plano actual, recargándolo si ha cambiado su versión."""
+        plan = self._plan
+        if plan is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return plan
+        with self._lock:
+            plan = self._plan
+            if plan is None or self._current_version() != plan.version:
+                plan = self._plan = self._load()
+            self._checked_at = time.monotonic()
+            return plan
+
+    def invalidate(self) -> None:
+        """Descarta el plano en memoria (tras editar mesas desde este proceso)."""
+        with self._lock:
+            self._plan = None
+
+    @staticmethod
+    def _current_version() -> int:
+        return query("SELECT version FROM floor_plan_version WHERE id = 1")[0]["version"]
+
+    def _load(self) -> FloorPlan:
+        # Sello y datos en la misma transacción de lectura para que sean coherentes
+        with transaction(immediate=False):
+            version = self._current_version()
+            tables = query("SELECT * FROM tables")
+            adjacency_rows = query("SELECT table_id, adjacent_table_id FROM table_adjacency")
+        return FloorPlan(version, tables, adjacency_rows)
+
+
+# Una instancia por base de datos, compartida por los repositorios de mesas
+get_floor_plan_cache = per_database(FloorPlanCache)
@@ -1,45 +1,220 @@
 """Implementación del repositorio de calendario usando Google Calendar API."""
-from typing import Optional, Dict, Any
+import os
+from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from googleapiclient.http import BatchHttpRequest
 
 from core.domain.calendar_repository import CalendarRepository
+from infrastructure.external.circuit_breaker import CircuitBreaker, CircuitOpenError
 from infrastructure.external.google_auth import GoogleAuthManager
 
+# Máximo de operaciones por petición batch (Google recomienda no superar 50)
+GOOGLE_CALENDAR_BATCH_SIZE = int(os.getenv("GOOGLE_CALENDAR_BATCH_SIZE", "50"))
+# Tiempo máximo de espera de cada operación de red (segundos)
+GOOGLE_CALENDAR_TIMEOUT = float(os.getenv("GOOGLE_CALENDAR_TIMEOUT", "10"))
+# Circuit breaker: se abre si falla esta proporción de las últimas llamadas
+CALENDAR_BREAKER_FAILURE_RATE = float(os.getenv("CALENDAR_BREAKER_FAILURE_RATE", "0.5"))
+CALENDAR_BREAKER_WINDOW = int(os.getenv("CALENDAR_BREAKER_WINDOW", "20"))
+CALENDAR_BREAKER_MIN_CALLS = int(os.getenv("CALENDAR_BREAKER_MIN_CALLS", "5"))
+CALENDAR_BREAKER_RESET_TIMEOUT = float(os.getenv("CALENDAR_BREAKER_RESET_TIMEOUT", "30"))
+TIME_ZONE = 'Europe/London'
+
 
 class GoogleCalendarRepository(CalendarRepository):
     """Repositorio para Google Calendar."""
     
-    def __init__(self, calendar_id: str, credentials_path: str):
+    def __init__(self, calendar_id: str, credentials_path: str, api_endpoint: Optional[str] = None, credentials=None):
         """
         Inicializa el repositorio de Google Calendar.
         
         Args:
             calendar_id: ID del calendario de Google (ej: 'primary' o email)
             credentials_path: Ruta al archivo credentials.json
+            api_endpoint: URL base alternativa de la API (ej: un stub local 'http://127.0.0.1:8089/')
+            credentials: Credenciales ya construidas (ej: AnonymousCredentials para el stub)
         """
         self.calendar_id = calendar_id
         self.auth_manager = GoogleAuthManager(credentials_path)
+        self.api_endpoint = api_endpoint
+        self._credentials = credentials
         self._service = None
+        self.breaker = CircuitBreaker(
+            "Google Calendar",
+            failure_rate=CALENDAR_BREAKER_FAILURE_RATE,
+            window=CALENDAR_BREAKER_WINDOW,
+            min_calls=CALENDAR_BREAKER_MIN_CALLS,
+            reset_timeout=CALENDAR_BREAKER_RESET_TIMEOUT,
+        )
     
     @property
     def service(self):
         """Obtiene el servicio de Google Calendar (lazy loading)."""
+        # Las credenciales están en memoria; esto solo renueva el token si está a punto de caducar
+        creds = self._credentials or self.auth_manager.get_credentials()
         if self._service is None:
-            creds = self.auth_manager.get_credentials()
             if creds is None:
                 raise Exception("No se pudieron obtener credenciales de Google")
-            self._service = build('calendar', 'v3', credentials=creds)
+            client_options = {"api_endpoint": self.api_endpoint} if self.api_endpoint else None
+            # Timeout por petición: sin él una llamada lenta a Google puede colgarse indefinidamente
+            http = AuthorizedHttp(creds, http=httplib2.Http(timeout=GOOGLE_CALENDAR_TIMEOUT))
+            self._service = build('calendar', 'v3', http=http, client_options=client_options)
         return self._service
     
+    def is_available(self) -> bool:
+        """False mientras el circuit breaker está abierto."""
+        return not self.breaker.is_open()
+    
+    def _record(self, error: Optional[Exception]) -> None:
+        """Anota el resultado de una operación en el circuit breaker."""
+        if error is None:
+            self.breaker.record_success()
+        elif isinstance(error, HttpError) and error.resp.status < 500 and error.resp.status != 429:
+            # 4xx (salvo 429): la petición era incorrecta, pero el servicio responde
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+    
+    def _execute(self, make_request) -> Any:
+        """
+        Construye y ejecuta una petición pasando por el circuit breaker.
+        
+        Raises:
+            CircuitOpenError: si el circuito está abierto (no se llama a Google)
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError("Google Calendar no disponible temporalmente")
+        try:
+            result = make_request().execute()
+        except Exception as e:
+            self._record(e)
+            raise
+        self._record(None)
+        return result
+    
+    def _new_batch(self, callback) -> BatchHttpRequest:
+        """Crea una petición batch (apuntando al stub si hay api_endpoint)."""
+        if self.api_endpoint:
+            batch_uri = self.api_endpoint.rstrip('/') + '/batch/calendar/v3'
+            return BatchHttpRequest(callback=callback, batch_uri=batch_uri)
+        return self.service.new_batch_http_request(callback=callback)
+    
+    def _execute_batch(self, make_requests) -> List[Tuple[Optional[Dict[str, Any]], Optional[Exception]]]:
+        """
+        Ejecuta peticiones de la API en lotes de GOOGLE_CALENDAR_BATCH_SIZE.
+        Si el circuito está abierto, las operaciones fallan con CircuitOpenError
+        sin llamar a Google.
+        
+        Args:
+            make_requests: Función que construye la lista de peticiones
+        
+        Returns:
+            (respuesta, excepción) por petición, en el mismo orden
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError("Google Calendar no disponible temporalmente")
+        try:
+            requests = make_requests()
+        except Exception as e:
+            self._record(e)
+            raise
+        results: List[Tuple[Optional[Dict[str, Any]], Optional[Exception]]] = [(None, None)] * len(requests)
+        
+        def on_response(request_id, response, exception):
+            results[int(request_id)] = (response, exception)
+            self._record(exception)
+        
+        for offset in range(0, len(requests), GOOGLE_CALENDAR_BATCH_SIZE):
+            chunk = requests[offset:offset + GOOGLE_CALENDAR_BATCH_SIZE]
+            # El primer lote ya pasó por allow(); los siguientes se cortan si el circuito se abrió
+            if offset and not self.breaker.allow():
+                error = CircuitOpenError("Google Calendar no disponible temporalmente")
+            else:
+                batch = self._new_batch(on_response)
+                for i, request in enumerate(chunk, start=offset):
+                    batch.add(request, request_id=str(i))
+                try:
+                    batch.execute()
+                    continue
+                except Exception as e:
+                    # Fallo de la petición batch completa: todas sus operaciones fallan
+                    self._record(e)
+                    error = e
+            for i in range(offset, offset + len(chunk)):
+                results[i] = (None, error)
+        return results
+    
+    @staticmethod
+    def _event_body(
+        title: Optional[str] = None,
+        description: Optional[str] = None,
+        start_datetime: Optional[str] = None,
+        end_datetime: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Cuerpo de evento con solo los campos proporcionados."""
+        event = {}
+        if title:
+            event['summary'] = title
+        if description:
+            event['description'] = description
+        if start_datetime:
+            event['start'] = {'dateTime': start_datetime, 'timeZone': TIME_ZONE}
+        if end_datetime:
+            event['end'] = {'dateTime': end_datetime, 'timeZone': TIME_ZONE}
+        return event
+    
+    @staticmethod
+    def _is_gone(error: Exception) -> bool:
+        """True si el evento ya no existe (404/410): borrarlo de nuevo no es un error."""
+        return isinstance(error, HttpError) and error.resp.status in (404, 410)
+    
+    @staticmethod
+    def _already_exists(error: Exception, event_id: Optional[str]) -> bool:
+        """True si el insert con ID propio falló porque el evento ya existe (409): un reintento que ya se aplicó."""
+        return bool(event_id) and isinstance(error, HttpError) and error.resp.status == 409
+    
+    def _insert_request(self, title, description, start_datetime, end_datetime, attendee_email=None, event_id=None):
+        event = self._event_body(title, description, start_datetime, end_datetime)
+        
+        # ID propio (base32hex): Google rechaza con 409 un segundo insert con el mismo ID
+        if event_id:
+            event['id'] = event_id
+        
+        # Añadir invitado si se proporciona
+        if attendee_email:
+            event['attendees'] = [{'email': attendee_email}]
+        
+        return self.service.events().insert(
+            calendarId=self.calendar_id,
+            body=event,
+            sendNotifications=bool(attendee_email)
+        )
+    
+    def _patch_request(self, event_id, title=None, description=None, start_datetime=None, end_datetime=None):
+        # patch solo envía los campos modificados: no hace falta leer el evento antes
+        return self.service.events().patch(
+            calendarId=self.calendar_id,
+            eventId=event_id,
+            body=self._event_body(title, description, start_datetime, end_datetime)
+        )
+    
+    def _delete_request(self, event_id):
+        return self.service.events().delete(
+            calendarId=self.calendar_id,
+            eventId=event_id
+        )
+    
     def create_event(
         self,
         title: str,
         description: str,
         start_datetime: str,
         end_datetime: str,
-        attendee_email: Optional[str] = None
+        attendee_email: Optional[str] = None,
+        event_id: Optional[str] = None
     ) -> Optional[str]:
         """
         Crea un evento en Google Calendar.
@@ -50,40 +225,22 @@ class GoogleCalendarRepository(CalendarRepository):
             start_datetime: Inicio en formato ISO 8601 (ej: '2025-01-15T20:00:00')
             end_datetime: Fin en formato ISO 8601
             attendee_email: Email del invitado (opcional)
+            event_id: ID propio del evento (opcional; si ya existe se devuelve sin duplicarlo)
             
         Returns:
             ID del evento creado o None si falla
         """
         try:
-            # Preparar el evento
-            event = {
-                'summary': title,
-                'description': description,
-                'start': {
-                    'dateTime': start_datetime,
-                    'timeZone': 'Europe/London',
-                },
-                'end': {
-                    'dateTime': end_datetime,
-                    'timeZone': 'Europe/London',
-                },
-            }
-            
-            # Añadir invitado si se proporciona
-            if attendee_email:
-                event['attendees'] = [{'email': attendee_email}]
-                event['sendNotifications'] = True
-            
-            # Crear el evento
-            created_event = self.service.events().insert(
-                calendarId=self.calendar_id,
-                body=event,
-                sendNotifications=bool(attendee_email)
-            ).execute()
-            
+            created_event = self._execute(lambda: self._insert_request(
+                title, description, start_datetime, end_datetime, attendee_email, event_id
+            ))
             return created_event.get('id')
             
+        except CircuitOpenError:
+            return None
         except HttpError as e:
+            if self._already_exists(e, event_id):
+                return event_id
             print(f"Error al crear evento en Google Calendar: {e}")
             return None
         except Exception as e:
@@ -99,7 +256,7 @@ class GoogleCalendarRepository(CalendarRepository):
         end_datetime: Optional[str] = None
     ) -> bool:
         """
-        Actualiza un evento existente en Google Calendar.
+        Actualiza un evento existente en Google Calendar (una sola petición patch).
         
         Args:
             event_id: ID del evento
@@ -112,37 +269,11 @@ class GoogleCalendarRepository(CalendarRepository):
             True si se actualizó correctamente
         """
         try:
-            # Obtener el evento actual
-            event = self.service.events().get(
-                calendarId=self.calendar_id,
-                eventId=event_id
-            ).execute()
-            
-            # Actualizar campos proporcionados
-            if title:
-                event['summary'] = title
-            if description:
-                event['description'] = description
-            if start_datetime:
-                event['start'] = {
-                    'dateTime': start_datetime,
-                    'timeZone': 'Europe/London',
-                }
-            if end_datetime:
-                event['end'] = {
-                    'dateTime': end_datetime,
-                    'timeZone': 'Europe/London',
-                }
-            
-            # Guardar cambios
-            self.service.events().update(
-                calendarId=self.calendar_id,
-                eventId=event_id,
-                body=event
-            ).execute()
-            
+            self._execute(lambda: self._patch_request(event_id, title, description, start_datetime, end_datetime))
             return True
             
+        except CircuitOpenError:
+            return False
         except HttpError as e:
             print(f"Error al actualizar evento: {e}")
             return False
@@ -158,22 +289,88 @@ class GoogleCalendarRepository(CalendarRepository):
             event_id: ID del evento a eliminar
             
         Returns:
-            True si se eliminó correctamente
+            True si se eliminó correctamente (o ya no existía)
         """
         try:
-            self.service.events().delete(
-                calendarId=self.calendar_id,
-                eventId=event_id
-            ).execute()
+            self._execute(lambda: self._delete_request(event_id))
             return True
             
+        except CircuitOpenError:
+            return False
         except HttpError as e:
+            if self._is_gone(e):
+                return True
             print(f"Error al eliminar evento: {e}")
             return False
         except Exception as e:
             print(f"Error inesperado: {e}")
             return False
     
+    # ============================================================
+    # OPERACIONES EN LOTE (UNA PETICIÓN BATCH POR CADA 50 EVENTOS)
+    # ============================================================
+    def create_events(self, events: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """Crea varios eventos en una petición batch. Devuelve sus IDs (None si falla)."""
+        if not events:
+            return []
+        try:
+            results = self._execute_batch(lambda: [self._insert_request(**event) for event in events])
+        except CircuitOpenError:
+            return [None] * len(events)
+        except Exception as e:
+            print(f"Error inesperado: {e}")
+            return [None] * len(events)
+        
+        event_ids = []
+        for event, (response, error) in zip(events, results):
+            if error and self._already_exists(error, event.get('event_id')):
+                event_ids.append(event['event_id'])
+                continue
+            if error:
+                print(f"Error al crear evento en Google Calendar: {error}")
+            event_ids.append(response.get('id') if response and not error else None)
+        return event_ids
+    
+    def update_events(self, updates: List[Dict[str, Any]]) -> List[bool]:
+        """Aplica varios patch en una petición batch. Devuelve True/False por evento."""
+        if not updates:
+            return []
+        try:
+            results = self._execute_batch(lambda: [self._patch_request(**update) for update in updates])
+        except CircuitOpenError:
+            return [False] * len(updates)
+        except Exception as e:
+            print(f"Error inesperado: {e}")
+            return [False] * len(updates)
+        
+        updated = []
+        for _, error in results:
+            if error:
+                print(f"Error al actualizar evento: {error}")
+            updated.append(error is None)
+        return updated
+    
+    def delete_events(self, event_ids: List[str]) -> List[bool]:
+        """Elimina varios eventos en una petición batch. Devuelve True/False por evento."""
+        if not event_ids:
+            return []
+        try:
+            results = self._execute_batch(lambda: [self._delete_request(event_id) for event_id in event_ids])
+        except CircuitOpenError:
+            return [False] * len(event_ids)
+        except Exception as e:
+            print(f"Error inesperado: {e}")
+            return [False] * len(event_ids)
+        
+        deleted = []
+        for _, error in results:
+            if error and not self._is_gone(error):
+                print(f"Error al eliminar evento: {error}")
+                deleted.append(False)
+            else:
+                deleted.append(True)
+        return deleted
+    
     def get_event(self, event_id: str) -> Optional[Dict[str, Any]]:
         """
         Obtiene los detalles de un evento.
@@ -185,10 +382,10 @@ class GoogleCalendarRepository(CalendarRepository):
             Diccionario con los datos del evento o None si no existe
         """
         try:
-            event = self.service.events().get(
+            event = self._execute(lambda: self.service.events().get(
                 calendarId=self.calendar_id,
                 eventId=event_id
-            ).execute()
+            ))
             
             return {
                 'id': event.get('id'),
@@ -202,6 +399,8 @@ class GoogleCalendarRepository(CalendarRepository):
         except HttpError as e:
             print(f"Error al obtener evento: {e}")
             return None
+        except CircuitOpenError:
+            return None
         except Exception as e:
             print(f"Error inesperado: {e}")
             return None
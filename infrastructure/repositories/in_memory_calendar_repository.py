@@ -0,0 +1,86 @@
+"""Calendario en memoria para pruebas locales y desarrollo sin Google Calendar."""
+import itertools
+import threading
+from typing import Optional, Dict, Any
+
+from core.domain.calendar_repository import CalendarRepository
+
+
+class InMemoryCalendarRepository(CalendarRepository):
+    """
+    Implementación falsa del calendario: guarda los eventos en un diccionario.
+    Con fail_next(n) las n siguientes operaciones fallan, para probar los
+    reintentos del CalendarSyncWorker.
+    """
+    
+    def __init__(self):
+        self.events: Dict[str, Dict[str, Any]] = {}
+        self._ids = itertools.count(1)
+        self._failures = 0
+        self._lock = threading.Lock()
+    
+    def fail_next(self, n: int = 1) -> None:
+        """Hace que las próximas n operaciones devuelvan error."""
+        with self._lock:
+            self._failures = n
+    
+    def _should_fail(self) -> bool:
+        with self._lock:
+            if self._failures > 0:
+                self._failures -= 1
+                return True
+            return False
+    
+    def create_event(
+        self,
+        title: str,
+        description: str,
+        start_datetime: str,
+        end_datetime: str,
+        attendee_email: Optional[str] = None,
+        event_id: Optional[str] = None
+    ) -> Optional[str]:
+        if self._should_fail():
+            return None
+        with self._lock:
+            if event_id in self.events:
+                return event_id
+            event_id = event_id or f"evt{next(self._ids)}"
+            self.events[event_id] = {
+                'id': event_id,
+                'title': title,
+                'description': description,
+                'start': start_datetime,
+                'end': end_datetime,
+                'status': 'confirmed',
+            }
+        return event_id
+    
+    def update_event(
+        self,
+        event_id: str,
+        title: Optional[str] = None,
+        description: Optional[str] = None,
+        start_datetime: Optional[str] = None,
+        end_datetime: Optional[str] = None
+    ) -> bool:
+        if self._should_fail():
+            return False
+        with self._lock:
+            event = self.events.get(event_id)
+            if event is None:
+                return False
+            changes = {'title': title, 'description': description, 'start': start_datetime, 'end': end_datetime}
+            event.update({k: v for k, v in changes.items() if v})
+        return True
+    
+    def delete_event(self, event_id: str) -> bool:
+        if self._should_fail():
+            return False
+        with self._lock:
+            return self.events.pop(event_id, None) is not None
+    
+    def get_event(self, event_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            event = self.events.get(event_id)
+            return dict(event) if event else None
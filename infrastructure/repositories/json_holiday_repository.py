@@ -1,4 +1,6 @@
-import json, os
+import json, os, threading
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Tuple
 from core.domain.holiday_repository import HolidayRepository
 from dotenv import load_dotenv
 
@@ -6,19 +8,51 @@ load_dotenv()
 HOLIDAYS_JSON = os.getenv("HOLIDAYS_JSON", "resources/holidays.json")
 
 class JSONHolidayRepository(HolidayRepository):
+    """Festivos leídos de un fichero JSON, indexados por fecha en memoria.
+    El fichero se vuelve a cargar solo cuando cambia su fecha de modificación."""
+
+    def __init__(self, file_path: str = HOLIDAYS_JSON):
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        self._mtime = None
+        # (fecha -> nombre, fechas ordenadas): se sustituye entero en cada recarga
+        self._snapshot: Tuple[Dict[str, str], List[str]] = ({}, [])
+
     def get_holiday_name(self, date_str: str) -> str | None:
+        by_date, _ = self._index()
+        return by_date.get(date_str)
+
+    def get_holidays_between(self, start_date: str, end_date: str) -> Dict[str, str]:
+        """Devuelve {fecha: nombre} de los festivos entre dos fechas YYYY-MM-DD (ambas incluidas)."""
+        by_date, dates = self._index()
+        lo = bisect_left(dates, start_date)
+        hi = bisect_right(dates, end_date)
+        return {d: by_date[d] for d in dates[lo:hi]}
+
+    def _index(self) -> Tuple[Dict[str, str], List[str]]:
+        """Devuelve el índice de festivos, recargándolo si el fichero ha cambiado."""
         try:
-            if not os.path.exists(HOLIDAYS_JSON):
-                print(f"[WARN] No se encontró {HOLIDAYS_JSON}")
-                return None
+            mtime = os.stat(self.file_path).st_mtime_ns
+        except FileNotFoundError:
+            if self._mtime is not False:
+                print(f"[WARN] No se encontró {self.file_path}")
+                with self._lock:
+                    self._mtime, self._snapshot = False, ({}, [])
+            return self._snapshot
 
-            with open(HOLIDAYS_JSON, "r", encoding="utf-8") as f:
-                holidays = json.load(f)
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    self._load(mtime)
+        return self._snapshot
 
-            for h in holidays:
-                if h["date"].split(" ")[0] == date_str:
-                    return h["name"]
-            return None
+    def _load(self, mtime: int) -> None:
+        try:
+            with open(self.file_path, "r", encoding="utf-8") as f:
+                holidays = json.load(f)
+            by_date = {h["date"].split(" ")[0]: h["name"] for h in holidays}
         except Exception as e:
             print(f"[ERROR] JSONHolidayRepository: {e}")
-            return None
+            by_date = {}
+        self._snapshot = (by_date, sorted(by_date))
+        self._mtime = mtime
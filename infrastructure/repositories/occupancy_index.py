@@ -0,0 +1,286 @@
+"""Índice de ocupación de mesas por fecha.
+
+Para cada fecha se construye, con una única consulta, un mapa
+mesa -> intervalos ocupados ordenados por inicio. Así las comprobaciones
+de disponibilidad se resuelven en memoria en O(log n) en lugar de
+recorrer todas las reservas del día en cada llamada.
+
+Los próximos OCCUPANCY_PRELOAD_DAYS días se cargan al arrancar con una sola
+consulta, y las escrituras de reservas de este proceso actualizan el índice
+de forma incremental tras confirmarse (sin volver a leer el día).
+
+Las escrituras de otros procesos (p. ej. reservations_io import o un sqlite3
+a mano) se detectan con el sello reservation_tables_version, que mantienen
+triggers: antes de servir una fecha se lee el sello y, si ha cambiado sin
+que este proceso aplicara el cambio, se descartan todas las fechas. Con
+OCCUPANCY_CHECK=true cada lectura se contrasta además con la base de datos.
+"""
+import os
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import date as date_type, timedelta
+from itertools import accumulate
+from typing import Dict, Iterable, List, Optional, Tuple
+from dotenv import load_dotenv
+
+from core.utils.reservation_utils import to_minutes
+from infrastructure.database.sql_connection import query, transaction, after_commit, per_database
+
+load_dotenv()
+
+# Número máximo de fechas que se mantienen indexadas en memoria
+MAX_CACHED_DATES = int(os.getenv("OCCUPANCY_MAX_CACHED_DATES", "64"))
+# Días (desde hoy) que se cargan al arrancar
+OCCUPANCY_PRELOAD_DAYS = int(os.getenv("OCCUPANCY_PRELOAD_DAYS", "14"))
+# Contrastar cada lectura con la base de datos (depuración: anula la ventaja del índice)
+OCCUPANCY_CHECK = os.getenv("OCCUPANCY_CHECK", "false").lower() == "true"
+
+# Intervalo ocupado: (inicio, fin, id de la reserva)
+Interval = Tuple[int, int, int]
+
+
+class TableOccupancy:
+    """
+    Intervalos ocupados [inicio, fin) de una mesa en un día, en minutos.
+
+    Es inmutable: los cambios crean una instancia nueva, de modo que quien
+    esté leyendo la anterior desde otro hilo nunca ve un estado a medias.
+    """
+
+    __slots__ = ("entries", "starts", "ends", "max_ends")
+
+    def __init__(self, entries: Iterable[Interval]):
+        self.entries: List[Interval] = sorted(entries)
+        self.starts = [s for s, _, _ in self.entries]
+        self.ends = [e for _, e, _ in self.entries]
+        # Máximo acumulado de los finales: permite responder aunque haya solapes previos
+        self.max_ends = list(accumulate(self.ends, max))
+
+    def is_free(self, start: int, end: int) -> bool:
+        """Indica si el intervalo [start, end) no se solapa con ningún intervalo ocupado."""
+        # Índice de la última reserva que empieza antes de que termine la nueva
+        i = bisect_left(self.starts, end) - 1
+        return i < 0 or self.max_ends[i] <= start
+
+    def intervals(self) -> List[Tuple[int, int]]:
+        return list(zip(self.starts, self.ends))
+
+    def without(self, reservation_ids: set) -> "TableOccupancy":
+        return TableOccupancy(e for e in self.entries if e[2] not in reservation_ids)
+
+
+class OccupancyIndex:
+    """Caché de ocupación por fecha, mantenida por las escrituras de reservas."""
+
+    def __init__(self, max_dates: int = MAX_CACHED_DATES, check: bool = OCCUPANCY_CHECK):
+        self.max_dates = max_dates
+        self.check = check
+        # Lecturas en las que el índice no coincidía con la base de datos (solo con check)
+        self.mismatches = 0
+        self._dates: "OrderedDict[str, Dict[int, TableOccupancy]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Se incrementa en cada escritura para no guardar índices construidos con datos antiguos
+        self._generation = 0
+        # Sello de reservation_tables_version con el que coinciden las fechas indexadas
+        self._version: Optional[int] = None
+
+    def for_date(self, date: str) -> Dict[int, TableOccupancy]:
+        """Devuelve el índice de ocupación de una fecha, construyéndolo si no existe."""
+        version = self.current_version()
+        with self._lock:
+            # El sello solo crece: uno menor es de una lectura que se cruzó con una escritura de este proceso
+            if self._version is None or version > self._version:
+                # La base de datos cambió sin pasar por apply(): otro proceso escribió
+                self._discard_all()
+                self._version = version
+            tables = self._dates.get(date)
+            if tables is not None:
+                self._dates.move_to_end(date)
+            generation = self._generation
+
+        if tables is not None:
+            return self._verify(date, tables) if self.check else tables
+
+        tables = self._build(date)
+
+        with self._lock:
+            if generation == self._generation:
+                self._store(date, tables)
+        return tables
+
+    def is_free(self, table_id: int, date: str, time: str, duration: int) -> bool:
+        """Indica si la mesa está libre en [time, time + duration) en esa fecha."""
+        occupancy = self.for_date(date).get(table_id)
+        if occupancy is None:
+            return True
+        start = to_minutes(time)
+        return occupancy.is_free(start, start + duration)
+
+    # ============================================================
+    # CARGA INICIAL
+    # ============================================================
+    def preload(self, start_date: Optional[str] = None, days: int = OCCUPANCY_PRELOAD_DAYS) -> int:
+        """
+        Carga `days` fechas a partir de `start_date` (hoy por defecto) con una
+        única consulta de rango. Las fechas sin reservas también quedan
+        indexadas, así que no vuelven a consultarse.
+
+        Returns:
+            Número de fechas cargadas
+        """
+        days = min(days, self.max_dates)
+        if days <= 0:
+            return 0
+        first = date_type.fromisoformat(start_date) if start_date else date_type.today()
+        dates = [(first + timedelta(days=i)).isoformat() for i in range(days)]
+
+        with self._lock:
+            generation = self._generation
+
+        # Sello y filas en la misma transacción de lectura para que sean coherentes
+        with transaction(immediate=False):
+            version = self.current_version()
+            rows = query("""
+                SELECT date, reservation_id, table_id, start_minute, end_minute FROM reservation_tables
+                WHERE date BETWEEN ? AND ?
+            """, (dates[0], dates[-1]))
+        by_date: Dict[str, Dict[int, List[Interval]]] = {d: {} for d in dates}
+        for r in rows:
+            by_date[r["date"]].setdefault(r["table_id"], []).append(
+                (r["start_minute"], r["end_minute"], r["reservation_id"])
+            )
+
+        with self._lock:
+            if generation != self._generation:
+                # Hubo escrituras durante la carga: las fechas se construirán al pedirlas
+                return 0
+            if self._version is None or version > self._version:
+                self._discard_all()
+                self._version = version
+            for d in dates:
+                self._store(d, {tid: TableOccupancy(ivs) for tid, ivs in by_date[d].items()})
+        return len(dates)
+
+    # ============================================================
+    # ACTUALIZACIÓN INCREMENTAL
+    # ============================================================
+    def apply_after_commit(self, since: int, reservation_ids: Iterable[int], dates: Iterable[str],
+                           rows: Iterable[Dict]) -> None:
+        """
+        Programa apply() para cuando se confirme la transacción de escritura en curso.
+
+        Args:
+            since: Sello leído en la misma transacción antes de escribir (current_version())
+        """
+        version = self.current_version()
+        after_commit(lambda: self.apply(reservation_ids, dates, rows, since, version))
+
+    def apply(self, reservation_ids: Iterable[int], dates: Iterable[str], rows: Iterable[Dict],
+              since: Optional[int] = None, version: Optional[int] = None) -> None:
+        """
+        Sustituye en el índice los intervalos de unas reservas por los actuales.
+
+        Args:
+            reservation_ids: Reservas insertadas, modificadas o eliminadas
+            dates: Fechas en las que estaban antes del cambio
+            rows: Sus filas actuales de reservation_tables (vacío si se eliminaron)
+            since, version: Sello antes y después de la escritura. Si el índice no
+                estaba en `since` se le ha escapado algún cambio y se vacía
+
+        Solo se tocan las fechas ya indexadas; el resto se leerá de la base de
+        datos cuando se pidan. Debe llamarse tras confirmar la transacción.
+        """
+        reservation_ids = set(reservation_ids)
+        added: Dict[str, Dict[int, List[Interval]]] = {}
+        for r in rows:
+            added.setdefault(r["date"], {}).setdefault(r["table_id"], []).append(
+                (r["start_minute"], r["end_minute"], r["reservation_id"])
+            )
+
+        with self._lock:
+            self._generation += 1
+            if version is not None:
+                if since != self._version:
+                    self._dates.clear()
+                self._version = version if self._version is None else max(self._version, version)
+            for d in set(dates) | set(added):
+                current = self._dates.get(d)
+                if current is None:
+                    continue
+                # Copia del mapa del día: los lectores que ya lo tienen siguen viendo el anterior
+                tables = dict(current)
+                for tid, occupancy in current.items():
+                    if any(e[2] in reservation_ids for e in occupancy.entries):
+                        tables[tid] = occupancy.without(reservation_ids)
+                for tid, ivs in added.get(d, {}).items():
+                    previous = tables.get(tid)
+                    tables[tid] = TableOccupancy((previous.entries if previous else []) + ivs)
+                self._dates[d] = tables
+
+    def invalidate(self, *dates: str) -> None:
+        """Descarta el índice de las fechas indicadas (o de todas si no se indica ninguna)."""
+        with self._lock:
+            self._generation += 1
+            if not dates:
+                self._dates.clear()
+                return
+            for date in dates:
+                self._dates.pop(date, None)
+
+    # ============================================================
+    # CONSTRUCCIÓN Y COMPROBACIÓN
+    # ============================================================
+    @staticmethod
+    def current_version() -> int:
+        """Sello de reservation_tables_version (una lectura por clave primaria)."""
+        return query("SELECT version FROM reservation_tables_version WHERE id = 1")[0]["version"]
+
+    def _discard_all(self) -> None:
+        """Vacía el índice. Debe llamarse con el lock tomado."""
+        self._generation += 1
+        self._dates.clear()
+
+    def _store(self, date: str, tables: Dict[int, TableOccupancy]) -> None:
+        """Guarda el índice de una fecha respetando el límite. Debe llamarse con el lock tomado."""
+        self._dates[date] = tables
+        self._dates.move_to_end(date)
+        while len(self._dates) > self.max_dates:
+            self._dates.popitem(last=False)
+
+    def _verify(self, date: str, tables: Dict[int, TableOccupancy]) -> Dict[int, TableOccupancy]:
+        """Compara el índice de una fecha con la base de datos y lo sustituye si no coincide."""
+        with self._lock:
+            generation = self._generation
+        fresh = self._build(date)
+        if _as_intervals(fresh) == _as_intervals(tables):
+            return tables
+        with self._lock:
+            if generation != self._generation:
+                # Una escritura de este proceso se cruzó con la comprobación: no es una discrepancia
+                return tables
+            self.mismatches += 1
+            self._store(date, fresh)
+        print(f"⚠️ Índice de ocupación desincronizado el {date}: se recarga desde la base de datos")
+        return fresh
+
+    def _build(self, date: str) -> Dict[int, TableOccupancy]:
+        """Lee las mesas ocupadas del día con una consulta indexada y agrupa los intervalos por mesa."""
+        rows = query("""
+            SELECT reservation_id, table_id, start_minute, end_minute FROM reservation_tables
+            WHERE date = ?
+        """, (date,))
+
+        intervals: Dict[int, List[Interval]] = {}
+        for r in rows:
+            intervals.setdefault(r["table_id"], []).append((r["start_minute"], r["end_minute"], r["reservation_id"]))
+
+        return {tid: TableOccupancy(ivs) for tid, ivs in intervals.items()}
+
+
+def _as_intervals(tables: Dict[int, TableOccupancy]) -> Dict[int, List[Interval]]:
+    return {tid: occupancy.entries for tid, occupancy in tables.items() if occupancy.entries}
+
+
+# Una instancia por base de datos, compartida entre los repositorios de mesas y reservas
+get_occupancy_index = per_database(OccupancyIndex)
@@ -0,0 +1,71 @@
+"""Implementación SQL del outbox de sincronización con el calendario."""
+import json
+import time
+from typing import Optional, Dict, Any, List
+from core.domain.calendar_outbox_repository import CalendarOutboxRepository as ICalendarOutboxRepository
+from infrastructure.database.sql_connection import query, execute, transaction
+
+
+class SQLCalendarOutboxRepository(ICalendarOutboxRepository):
+    """
+    Outbox en la tabla calendar_outbox. enqueue() usa la conexión del hilo, así
+    que dentro de reservation_repo.atomic() se confirma junto con la reserva.
+    """
+    
+    def enqueue(self, reservation_id: int, operation: str, payload: Dict[str, Any]) -> int:
+        now = time.time()
+        return execute(
+            """INSERT INTO calendar_outbox (reservation_id, operation, payload, next_attempt_at, created_at)
+               VALUES (?, ?, ?, ?, ?)""",
+            (reservation_id, operation, json.dumps(payload), now, now)
+        )
+    
+    def fetch_due(self, now: float, limit: int) -> List[Dict[str, Any]]:
+        rows = query(
+            """SELECT * FROM calendar_outbox o
+               WHERE o.status = 'pending' AND o.next_attempt_at <= ?
+                 AND NOT EXISTS (
+                     SELECT 1 FROM calendar_outbox p
+                     WHERE p.reservation_id = o.reservation_id
+                       AND p.status = 'pending' AND p.id < o.id
+                 )
+               ORDER BY o.id
+               LIMIT ?""",
+            (now, limit)
+        )
+        for row in rows:
+            row["payload"] = json.loads(row["payload"])
+        return rows
+    
+    def created_event_id(self, reservation_id: int) -> Optional[str]:
+        rows = query(
+            """SELECT calendar_event_id FROM calendar_outbox
+               WHERE reservation_id = ? AND status = 'done' AND operation = 'create'
+               ORDER BY id DESC LIMIT 1""",
+            (reservation_id,)
+        )
+        return rows[0]["calendar_event_id"] if rows else None
+    
+    def mark_done(self, entry_id: int, calendar_event_id: Optional[str] = None) -> None:
+        execute(
+            "UPDATE calendar_outbox SET status = 'done', attempts = attempts + 1, last_error = NULL, calendar_event_id = ? WHERE id = ?",
+            (calendar_event_id, entry_id)
+        )
+    
+    def mark_retry(self, entry_id: int, error: str, next_attempt_at: float) -> None:
+        execute(
+            "UPDATE calendar_outbox SET attempts = attempts + 1, last_error = ?, next_attempt_at = ? WHERE id = ?",
+            (error, next_attempt_at, entry_id)
+        )
+    
+    def mark_failed(self, entry_id: int, error: str) -> None:
+        execute(
+            "UPDATE calendar_outbox SET status = 'failed', attempts = attempts + 1, last_error = ? WHERE id = ?",
+            (error, entry_id)
+        )
+    
+    def purge_done(self, older_than: float) -> int:
+        with transaction():
+            rows = query("SELECT COUNT(*) AS n FROM calendar_outbox WHERE status = 'done' AND created_at < ?", (older_than,))
+            execute("DELETE FROM calendar_outbox WHERE status = 'done' AND created_at < ?", (older_than,))
+        return rows[0]["n"]
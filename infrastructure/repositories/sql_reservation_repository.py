@@ -1,7 +1,16 @@
 """Implementación SQL del repositorio de reservas."""
-from typing import List, Dict, Any
-from core.domain.reservation_repository import ReservationRepository as IReservationRepository
-from infrastructure.database.sql_connection import query, execute
+import json
+import sqlite3
+from typing import List, Dict, Any, Optional, Tuple
+from core.domain.reservation_repository import (
+    ReservationRepository as IReservationRepository,
+    DuplicateReservationError,
+    TableUnavailableError,
+)
+from core.utils.reservation_utils import to_minutes
+from infrastructure.database.schema import POPULATE_RESERVATION_TABLES_FOR_ID
+from infrastructure.database.sql_connection import query, query_rows, execute, transaction
+from infrastructure.repositories.occupancy_index import get_occupancy_index
 
 
 class SQLReservationRepository(IReservationRepository):
@@ -13,20 +22,139 @@ class SQLReservationRepository(IReservationRepository):
 
     def insert(self, reservation) -> None:
         """Inserta una nueva reserva."""
-        execute("""
-            INSERT INTO reservations (table_id, name, guests, date, time, phone, duration, notes, calendar_event_id, merged_tables)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (reservation.table_id, reservation.name, reservation.guests,
-              reservation.date, reservation.time, reservation.phone, reservation.duration,
-              reservation.notes, reservation.calendar_event_id, reservation.merged_tables))
+        index = get_occupancy_index()
+        with transaction():
+            since = index.current_version()
+            reservation_id, rows = self._insert(reservation)
+            index.apply_after_commit(since, [reservation_id], [reservation.date], rows)
+
+    def insert_if_available(self, reservation, table_ids: List[int]) -> int:
+        """Comprueba duplicados y solapamientos e inserta en una única transacción BEGIN IMMEDIATE.
+        El bloqueo de escritura se toma al inicio, así que dos llamadas concurrentes no pueden
+        ver ambas la mesa libre."""
+        start = to_minutes(reservation.time)
+        end = start + reservation.duration
+        index = get_occupancy_index()
+
+        try:
+            with transaction(immediate=True):
+                since = index.current_version()
+                if query("SELECT 1 FROM reservations WHERE phone = ? AND date = ? LIMIT 1",
+                         (reservation.phone, reservation.date)):
+                    raise DuplicateReservationError(reservation.phone)
+
+                taken = self._first_taken(table_ids, reservation.date, start, end)
+                if taken is not None:
+                    raise TableUnavailableError(taken)
+
+                reservation_id, rows = self._insert(reservation)
+                index.apply_after_commit(since, [reservation_id], [reservation.date], rows)
+        except sqlite3.IntegrityError as e:
+            # Índice único (phone, date): otra conexión insertó la misma reserva
+            raise DuplicateReservationError(reservation.phone) from e
+
+        return reservation_id
+
+    def atomic(self):
+        """Agrupa varias escrituras (de este u otros repositorios SQL) en una única transacción."""
+        return transaction(immediate=True)
+
+    def set_calendar_event_id(self, reservation_id: int, calendar_event_id: str) -> None:
+        """Guarda el ID del evento de calendario asociado a una reserva."""
+        execute("UPDATE reservations SET calendar_event_id = ? WHERE id = ?", (calendar_event_id, reservation_id))
 
     def delete_by_phone_and_date(self, phone: str, date: str) -> None:
         """Elimina una reserva por teléfono y fecha."""
-        execute("DELETE FROM reservations WHERE phone = ? AND date = ?", (phone, date))
+        index = get_occupancy_index()
+        with transaction():
+            since = index.current_version()
+            ids = [r["id"] for r in query("SELECT id FROM reservations WHERE phone = ? AND date = ?", (phone, date))]
+            execute("""
+                DELETE FROM reservation_tables WHERE reservation_id IN (
+                    SELECT id FROM reservations WHERE phone = ? AND date = ?
+                )
+            """, (phone, date))
+            execute("DELETE FROM reservations WHERE phone = ? AND date = ?", (phone, date))
+            index.apply_after_commit(since, ids, [date], [])
 
     def update(self, phone: str, date: str, updates: Dict[str, Any]) -> None:
         """Actualiza una reserva existente."""
         fields = ", ".join(f"{k} = ?" for k in updates.keys())
         values = list(updates.values()) + [phone, date]
-        execute(f"UPDATE reservations SET {fields} WHERE phone = ? AND date = ?", tuple(values))
 
+        index = get_occupancy_index()
+        try:
+            with transaction():
+                since = index.current_version()
+                # Localizar las reservas antes de actualizar: la fecha puede cambiar
+                ids = [r["id"] for r in query("SELECT id FROM reservations WHERE phone = ? AND date = ?", (phone, date))]
+                execute(f"UPDATE reservations SET {fields} WHERE phone = ? AND date = ?", tuple(values))
+                rows = []
+                for reservation_id in ids:
+                    rows.extend(self._sync_reservation_tables(reservation_id))
+                # Los intervalos antiguos se quitan de la fecha original; los nuevos van a la fecha que tengan ahora
+                index.apply_after_commit(since, ids, [date], rows)
+        except sqlite3.IntegrityError as e:
+            # Índice único (phone, date): el teléfono ya tiene otra reserva en la nueva fecha
+            raise DuplicateReservationError(phone) from e
+
+    def update_if_available(self, phone: str, date: str, updates: Dict[str, Any]) -> None:
+        """Aplica los cambios en una única transacción BEGIN IMMEDIATE solo si las mesas de la reserva
+        (con su nueva fecha, hora y duración) siguen libres; la propia reserva no cuenta como ocupación."""
+        with transaction(immediate=True):
+            current = query("SELECT * FROM reservations WHERE phone = ? AND date = ?", (phone, date))
+            if current:
+                row = {**current[0], **updates}
+                table_ids = [row["table_id"], *(json.loads(row["merged_tables"]) if row.get("merged_tables") else [])]
+                start = to_minutes(row["time"])
+                taken = self._first_taken(table_ids, row["date"], start, start + row["duration"],
+                                          exclude_reservation_id=row["id"])
+                if taken is not None:
+                    raise TableUnavailableError(taken)
+            self.update(phone, date, updates)
+
+    def get_table_usage_between(self, start_date: str, end_date: str) -> List[Tuple[str, int, int, int, int, int]]:
+        """Una sola consulta sobre idx_reservation_tables_slot; las filas se devuelven como tuplas
+        porque un rango de meses puede tener cientos de miles. Sin funciones de ventana:
+        ordenar por reserva para contar sus mesas duplicaba el tiempo de la consulta."""
+        return query_rows("""
+            SELECT rt.date, rt.table_id, rt.start_minute, rt.end_minute, r.guests, rt.reservation_id
+            FROM reservation_tables rt
+            JOIN reservations r ON r.id = rt.reservation_id
+            WHERE rt.date BETWEEN ? AND ?
+        """, (start_date, end_date))
+
+    def _first_taken(self, table_ids: List[int], date: str, start: int, end: int,
+                     exclude_reservation_id: Optional[int] = None) -> Optional[int]:
+        """Primera mesa de `table_ids` ocupada en [start, end) ese día, o None si están todas libres.
+        Consulta indexada sobre reservation_tables: cubre reservas individuales y combinadas."""
+        placeholders = ", ".join("?" for _ in table_ids)
+        taken = query(f"""
+            SELECT table_id FROM reservation_tables
+            WHERE table_id IN ({placeholders}) AND date = ?
+              AND start_minute < ? AND end_minute > ?
+              AND reservation_id IS NOT ?
+            LIMIT 1
+        """, (*table_ids, date, end, start, exclude_reservation_id))
+        return taken[0]["table_id"] if taken else None
+
+    def _insert(self, reservation) -> Tuple[int, List[Dict[str, Any]]]:
+        """Inserta la reserva y sus mesas. Debe llamarse dentro de una transacción.
+        Devuelve el ID y las filas de reservation_tables creadas."""
+        reservation_id = execute("""
+            INSERT INTO reservations (table_id, name, guests, date, time, phone, duration, notes, calendar_event_id, merged_tables)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (reservation.table_id, reservation.name, reservation.guests,
+              reservation.date, reservation.time, reservation.phone, reservation.duration,
+              reservation.notes, reservation.calendar_event_id, reservation.merged_tables))
+        return reservation_id, self._sync_reservation_tables(reservation_id)
+
+    def _sync_reservation_tables(self, reservation_id: int) -> List[Dict[str, Any]]:
+        """Regenera las filas de reservation_tables de una reserva a partir de su fila en reservations
+        y las devuelve para actualizar el índice de ocupación."""
+        execute("DELETE FROM reservation_tables WHERE reservation_id = ?", (reservation_id,))
+        execute(POPULATE_RESERVATION_TABLES_FOR_ID, {"id": reservation_id})
+        return query(
+            "SELECT reservation_id, table_id, date, start_minute, end_minute FROM reservation_tables WHERE reservation_id = ?",
+            (reservation_id,)
+        )
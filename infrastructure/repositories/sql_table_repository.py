@@ -1,69 +1,69 @@
 """Implementación SQL del repositorio de mesas."""
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Set, Tuple
 from core.domain.table_repository import TableRepository as ITableRepository
+from core.utils.reservation_utils import to_minutes
 from infrastructure.database.sql_connection import query
+from infrastructure.repositories.floor_plan_cache import get_floor_plan_cache
+from infrastructure.repositories.occupancy_index import get_occupancy_index
 
 
 class SQLTableRepository(ITableRepository):
-    """Implementación SQLite del repositorio de mesas."""
+    """Implementación SQLite del repositorio de mesas.
+    Los datos de las mesas se leen del plano en memoria de su base de datos (FloorPlanCache)."""
     
     def find_by_location_and_capacity(self, location: str, guests: int) -> List[Dict[str, Any]]:
-        """Busca mesas por ubicación y capacidad mínima."""
-        return query("""
-            SELECT * FROM tables
-            WHERE location = ? AND capacity >= ?
-            ORDER BY capacity ASC
-        """, (location, guests))
+        """Busca mesas por ubicación y capacidad mínima, ordenadas por capacidad."""
+        return [dict(t) for t in get_floor_plan_cache().get().by_location_and_capacity(location, guests)]
 
     def get_table_by_id(self, table_id: int) -> Dict[str, Any]:
         """Obtiene información de una mesa por su ID."""
-        result = query("SELECT * FROM tables WHERE id = ?", (table_id,))
-        return result[0] if result else None
+        table = get_floor_plan_cache().get().by_id.get(table_id)
+        return dict(table) if table else None
 
     def is_table_available(self, table_id: int, date: str, time: str, duration: int) -> bool:
         """Verifica si una mesa está disponible en una fecha/hora específica.
         Debe considerar tanto reservas directas como mesas que forman parte de combinaciones."""
-        
-        # Buscar todas las reservas en la misma fecha
-        all_reservations = query("""
-            SELECT table_id, time, duration, merged_tables FROM reservations
-            WHERE date = ?
-        """, (date,))
+        return get_occupancy_index().is_free(table_id, date, time, duration)
 
-        def to_minutes(t: str) -> int:
-            """Convierte HH:MM a minutos desde medianoche."""
-            h, m = map(int, t.split(":"))
-            return h * 60 + m
-        
-        new_start = to_minutes(time)
-        new_end = new_start + duration
+    def available_tables(self, location: str, date: str, time: str, duration: int, min_capacity: int = 1) -> List[Dict[str, Any]]:
+        """Obtiene todas las mesas libres de una ubicación para una franja horaria.
+        Una sola consulta de mesas y una sola consulta del índice de ocupación del día."""
+        candidates = self.find_by_location_and_capacity(location, min_capacity)
+        occupancy = get_occupancy_index().for_date(date)
+        start = to_minutes(time)
+        end = start + duration
+        return [
+            t for t in candidates
+            if t["id"] not in occupancy or occupancy[t["id"]].is_free(start, end)
+        ]
 
-        for r in all_reservations:
-            existing_start = to_minutes(r["time"])
-            existing_end = existing_start + r["duration"]
-            
-            # Verificar si hay solapamiento de horario
-            if new_end <= existing_start or new_start >= existing_end:
-                continue  # No hay solapamiento, pasar a siguiente reserva
-            
-            # Hay solapamiento de horario, verificar si afecta a esta mesa
-            # 1. Verificar si la mesa está como table_id directo
-            if r["table_id"] == table_id:
-                return False
-            
-            # 2. Verificar si la mesa está en merged_tables
-            if r["merged_tables"]:
-                try:
-                    import json
-                    merged = json.loads(r["merged_tables"])
-                    if table_id in merged:
-                        return False
-                except:
-                    pass  # Si hay error al parsear JSON, ignorar
-        
-        return True
+    def get_occupancy(self, date: str) -> Dict[int, List[Tuple[int, int]]]:
+        """Obtiene los intervalos ocupados de cada mesa en una fecha, ordenados por inicio."""
+        return {tid: occupancy.intervals() for tid, occupancy in get_occupancy_index().for_date(date).items()}
+
+    def get_occupancy_between(self, start_date: str, end_date: str) -> Dict[str, Dict[int, List[Tuple[int, int]]]]:
+        """Obtiene los intervalos ocupados de todas las fechas del rango con una sola consulta indexada.
+        No pasa por el índice de ocupación para no desplazar de él los días más consultados."""
+        rows = query("""
+            SELECT date, table_id, start_minute, end_minute FROM reservation_tables
+            WHERE date BETWEEN ? AND ?
+            ORDER BY date, start_minute
+        """, (start_date, end_date))
+
+        occupancy: Dict[str, Dict[int, List[Tuple[int, int]]]] = {}
+        for r in rows:
+            occupancy.setdefault(r["date"], {}).setdefault(r["table_id"], []).append((r["start_minute"], r["end_minute"]))
+        return occupancy
+
+    def get_adjacency(self) -> Dict[int, Set[int]]:
+        """Obtiene el grafo de mesas que se pueden juntar. Las relaciones son simétricas."""
+        return {tid: set(neighbours) for tid, neighbours in get_floor_plan_cache().get().adjacency.items()}
 
     def get_all_available(self) -> List[Dict[str, Any]]:
         """Obtiene todas las mesas disponibles."""
-        return query("SELECT * FROM tables WHERE available = 1")
+        return [dict(t) for t in get_floor_plan_cache().get().available]
+
+    def invalidate_cache(self) -> None:
+        """Fuerza la recarga del plano de mesas (tras editarlas desde este proceso)."""
+        get_floor_plan_cache().invalidate()
 
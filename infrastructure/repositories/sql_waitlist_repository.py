@@ -0,0 +1,95 @@
+"""Implementación SQL de la lista de espera."""
+import json
+import sqlite3
+import time
+from typing import Optional, Dict, Any, List
+from core.domain.waitlist_repository import (
+    WaitlistRepository as IWaitlistRepository,
+    DuplicateWaitlistEntryError,
+)
+from infrastructure.database.sql_connection import query, execute, transaction
+
+
+class SQLWaitlistRepository(IWaitlistRepository):
+    """Lista de espera en la tabla waitlist. Las búsquedas por fecha y ubicación usan idx_waitlist_slot."""
+
+    def add(self, name: str, phone: str, guests: int, date: str, location: str,
+            earliest_minute: int, latest_minute: int, auto_book: bool = False,
+            notes: Optional[str] = None) -> int:
+        try:
+            return execute(
+                """INSERT INTO waitlist (name, phone, guests, date, location, earliest_minute,
+                                         latest_minute, auto_book, notes, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (name, phone, guests, date, location, earliest_minute, latest_minute,
+                 int(auto_book), notes, time.time())
+            )
+        except sqlite3.IntegrityError as e:
+            # Índice único parcial (phone, date) sobre las entradas activas
+            raise DuplicateWaitlistEntryError(phone) from e
+
+    def find_active(self, phone: str, date: str) -> Optional[Dict[str, Any]]:
+        rows = query(
+            "SELECT * FROM waitlist WHERE phone = ? AND date = ? AND status IN ('waiting', 'offered')",
+            (phone, date)
+        )
+        return self._decode(rows[0]) if rows else None
+
+    def find_waiting(self, date: str, location: str) -> List[Dict[str, Any]]:
+        rows = query(
+            """SELECT * FROM waitlist
+               WHERE date = ? AND location = ? AND status = 'waiting'
+               ORDER BY created_at""",
+            (date, location)
+        )
+        return [self._decode(r) for r in rows]
+
+    def expire_offers(self, date: str, location: str, now: float) -> List[int]:
+        with transaction():
+            ids = [r["id"] for r in query(
+                """SELECT id FROM waitlist
+                   WHERE date = ? AND location = ? AND status = 'offered' AND offer_expires_at < ?""",
+                (date, location, now)
+            )]
+            for entry_id in ids:
+                self.mark_waiting(entry_id)
+        return ids
+
+    def mark_offered(self, entry_id: int, offered_time: str, table_ids: List[int], expires_at: float) -> None:
+        execute(
+            """UPDATE waitlist SET status = 'offered', offered_time = ?, offered_table_ids = ?, offer_expires_at = ?
+               WHERE id = ?""",
+            (offered_time, json.dumps(table_ids), expires_at, entry_id)
+        )
+
+    def mark_waiting(self, entry_id: int) -> None:
+        execute(
+            """UPDATE waitlist
+               SET status = 'waiting', offered_time = NULL, offered_table_ids = NULL, offer_expires_at = NULL
+               WHERE id = ?""",
+            (entry_id,)
+        )
+
+    def mark_booked(self, entry_id: int, reservation_id: Optional[int]) -> None:
+        execute(
+            "UPDATE waitlist SET status = 'booked', reservation_id = ?, offer_expires_at = NULL WHERE id = ?",
+            (reservation_id, entry_id)
+        )
+
+    def cancel(self, phone: str, date: str) -> bool:
+        with transaction():
+            active = query(
+                "SELECT id FROM waitlist WHERE phone = ? AND date = ? AND status IN ('waiting', 'offered')",
+                (phone, date)
+            )
+            if not active:
+                return False
+            execute("UPDATE waitlist SET status = 'cancelled' WHERE id = ?", (active[0]["id"],))
+        return True
+
+    @staticmethod
+    def _decode(row: Dict[str, Any]) -> Dict[str, Any]:
+        row["auto_book"] = bool(row["auto_book"])
+        if row.get("offered_table_ids"):
+            row["offered_table_ids"] = json.loads(row["offered_table_ids"])
+        return row
@@ -0,0 +1,244 @@
+"""Restaurantes servidos por un mismo servidor MCP.
+
+Cada restaurante tiene su propia base de datos SQLite (y por tanto su propio
+bloqueo de escritura, sus conexiones, su plano de mesas y su índice de
+ocupación), su fichero de festivos y su horario. La configuración se lee de
+TENANTS_JSON y cada restaurante se prepara la primera vez que se usa.
+
+Formato de TENANTS_JSON:
+
+    {
+      "default": "centro",
+      "restaurants": {
+        "centro": {"name": "Centro", "database_path": "db/centro.sqlite",
+                   "holidays_json": "resources/holidays.json",
+                   "open_time": "12:00", "close_time": "00:00", "max_booking_time": "22:30",
+                   "google_calendar_id": "centro@group.calendar.google.com"}
+      }
+    }
+
+Sin ese fichero hay un único restaurante ("default") con la configuración
+global del .env, como antes.
+"""
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+
+from core.domain.booking_date import DEFAULT_OPENING_HOURS, OpeningHours
+from core.services.booking_service import BookingService
+from core.services.information_service import InformationService
+from core.services.report_service import ReportService
+from core.services.table_service import TableService
+from core.services.waitlist_service import WaitlistService
+from infrastructure.async_executor import AsyncAdapter
+from infrastructure.calendar_sync_worker import CalendarSyncWorker
+from infrastructure.database.migrations import migrate
+from infrastructure.database.sql_connection import get_connection, use_database
+from infrastructure.repositories.google_calendar_repository import GoogleCalendarRepository
+from infrastructure.repositories.json_holiday_repository import HOLIDAYS_JSON, JSONHolidayRepository
+from infrastructure.repositories.occupancy_index import get_occupancy_index
+from infrastructure.repositories.sql_calendar_outbox_repository import SQLCalendarOutboxRepository
+from infrastructure.repositories.sql_reservation_repository import SQLReservationRepository
+from infrastructure.repositories.sql_table_repository import SQLTableRepository
+from infrastructure.repositories.sql_waitlist_repository import SQLWaitlistRepository
+
+load_dotenv()
+
+TENANTS_JSON = os.getenv("TENANTS_JSON", "resources/tenants.json")
+DEFAULT_RESTAURANT_ID = "default"
+
+
+class UnknownRestaurantError(ValueError):
+    """El restaurante indicado no está configurado."""
+
+
+class Tenant:
+    """Repositorios, servicios y worker de calendario de un restaurante."""
+
+    def __init__(self, restaurant_id: str, config: Dict[str, Any], migrate_database: bool = True):
+        self.id = restaurant_id
+        self.name = config.get("name", restaurant_id)
+        # None = base de datos global (DATABASE_PATH)
+        self.database_path: Optional[str] = config.get("database_path")
+        self.opening_hours = OpeningHours(
+            config.get("open_time", DEFAULT_OPENING_HOURS.open_time),
+            config.get("close_time", DEFAULT_OPENING_HOURS.close_time),
+            config.get("max_booking_time", DEFAULT_OPENING_HOURS.max_booking_time),
+        )
+        self.holiday_repo = JSONHolidayRepository(config.get("holidays_json", HOLIDAYS_JSON))
+
+        if migrate_database and self.database_path:
+            directory = os.path.dirname(self.database_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with use_database(self.database_path):
+                for version, description in migrate(get_connection()):
+                    print(f"  · {self.id}: migración {version}: {description}")
+
+        # Ocupación de los próximos días en memoria antes de la primera consulta
+        with use_database(self.database_path):
+            try:
+                get_occupancy_index().preload()
+            except sqlite3.Error as e:
+                print(f"⚠️ No se pudo precargar la ocupación ({self.id}): {e}")
+
+        self.reservation_repo = SQLReservationRepository()
+        self.table_repo = SQLTableRepository()
+        self.waitlist_repo = SQLWaitlistRepository()
+
+        # Google Calendar: un calendario y un worker por restaurante
+        calendar_outbox = None
+        self.calendar_worker: Optional[CalendarSyncWorker] = None
+        calendar_id = config.get("google_calendar_id")
+        if calendar_id and os.getenv("GOOGLE_CALENDAR_ENABLED", "false").lower() == "true":
+            try:
+                calendar_repo = GoogleCalendarRepository(
+                    calendar_id=calendar_id,
+                    credentials_path=os.getenv("GOOGLE_CREDENTIALS_PATH", "resources/google_credentials.json")
+                )
+                calendar_outbox = SQLCalendarOutboxRepository()
+                self.calendar_worker = CalendarSyncWorker(
+                    calendar_outbox, calendar_repo, self.reservation_repo, database=self.database_path
+                )
+                print(f"✅ Google Calendar integrado correctamente ({self.id})")
+            except Exception as e:
+                print(f"⚠️ No se pudo conectar con Google Calendar ({self.id}): {e}")
+                print("   Las reservas se crearán sin sincronización de calendario")
+
+        self.booking_service = BookingService(
+            reservation_repo=self.reservation_repo,
+            table_repo=self.table_repo,
+            holiday_repo=self.holiday_repo,
+            calendar_outbox=calendar_outbox
+        )
+        self.table_service = TableService(
+            table_repo=self.table_repo,
+            holiday_repo=self.holiday_repo,
+            opening_hours=self.opening_hours
+        )
+        self.info_service = InformationService(opening_hours=self.opening_hours)
+        self.report_service = ReportService(
+            reservation_repo=self.reservation_repo,
+            table_repo=self.table_repo,
+            holiday_repo=self.holiday_repo,
+            opening_hours=self.opening_hours
+        )
+        # Se registra en booking_service para atender los huecos que se liberen
+        self.waitlist_service = WaitlistService(
+            waitlist_repo=self.waitlist_repo,
+            reservation_repo=self.reservation_repo,
+            holiday_repo=self.holiday_repo,
+            table_service=self.table_service,
+            booking_service=self.booking_service,
+            opening_hours=self.opening_hours
+        )
+
+        # Variantes asíncronas que ejecutan en el pool sobre la base de datos del restaurante
+        self.async_booking_service = AsyncAdapter(self.booking_service, database=self.database_path)
+        self.async_table_service = AsyncAdapter(self.table_service, database=self.database_path)
+        self.async_info_service = AsyncAdapter(self.info_service, database=self.database_path)
+        self.async_report_service = AsyncAdapter(self.report_service, database=self.database_path)
+        self.async_waitlist_service = AsyncAdapter(self.waitlist_service, database=self.database_path)
+
+    def close(self) -> None:
+        if self.calendar_worker:
+            self.calendar_worker.stop()
+
+
+class TenantRegistry:
+    """
+    Restaurantes configurados. Cada uno se construye (y migra su base de
+    datos) la primera vez que se pide; el fichero se vuelve a leer si se
+    pide un restaurante que no estaba en él.
+    """
+
+    def __init__(self, config_path: str = TENANTS_JSON):
+        self.config_path = config_path
+        self._lock = threading.Lock()
+        self._tenants: Dict[str, Tenant] = {}
+        self._configs: Optional[Dict[str, Dict[str, Any]]] = None
+        self._default: Optional[str] = None
+        self._started = False
+
+    @property
+    def multi_tenant(self) -> bool:
+        return os.path.exists(self.config_path)
+
+    def loaded(self, restaurant_id: Optional[str] = None) -> Optional[Tenant]:
+        """Restaurante ya preparado, sin bloquear (None si aún no se ha cargado)."""
+        return self._tenants.get(restaurant_id or self._default or DEFAULT_RESTAURANT_ID)
+
+    def get(self, restaurant_id: Optional[str] = None) -> Tenant:
+        """
+        Devuelve el restaurante, preparándolo si es la primera vez.
+
+        Raises:
+            UnknownRestaurantError: Si el restaurante no está configurado
+        """
+        tenant = self.loaded(restaurant_id)
+        if tenant is not None:
+            return tenant
+        with self._lock:
+            configs = self._read_configs()
+            restaurant_id = restaurant_id or self._default
+            if restaurant_id not in configs:
+                # Puede ser un restaurante añadido al fichero con el servidor en marcha
+                configs = self._read_configs(reload=True)
+                restaurant_id = restaurant_id or self._default
+            if restaurant_id is None:
+                raise UnknownRestaurantError(
+                    f"Indica el restaurante (restaurant_id). Restaurantes disponibles: {', '.join(sorted(configs))}."
+                )
+            if restaurant_id not in configs:
+                available = ", ".join(sorted(configs)) or "ninguno"
+                raise UnknownRestaurantError(
+                    f"Restaurante desconocido: {restaurant_id}. Restaurantes disponibles: {available}."
+                )
+            tenant = self._tenants.get(restaurant_id)
+            if tenant is None:
+                tenant = Tenant(restaurant_id, configs[restaurant_id], migrate_database=self.multi_tenant)
+                if self._started and tenant.calendar_worker:
+                    tenant.calendar_worker.start()
+                self._tenants[restaurant_id] = tenant
+            return tenant
+
+    def restaurants(self) -> List[Dict[str, str]]:
+        """Restaurantes configurados (id y nombre), sin prepararlos."""
+        with self._lock:
+            configs = self._read_configs()
+        return [{"id": rid, "name": config.get("name", rid)} for rid, config in sorted(configs.items())]
+
+    def start(self) -> None:
+        """Arranca los workers de calendario; los restaurantes que se carguen después lo harán al cargarse."""
+        with self._lock:
+            self._started = True
+            tenants = list(self._tenants.values())
+        for tenant in tenants:
+            if tenant.calendar_worker:
+                tenant.calendar_worker.start()
+
+    def close(self) -> None:
+        with self._lock:
+            self._started = False
+            tenants = list(self._tenants.values())
+        for tenant in tenants:
+            tenant.close()
+
+    def _read_configs(self, reload: bool = False) -> Dict[str, Dict[str, Any]]:
+        if self._configs is not None and not reload:
+            return self._configs
+        if not self.multi_tenant:
+            # Modo de un solo restaurante: configuración global del .env
+            self._configs = {DEFAULT_RESTAURANT_ID: {
+                "google_calendar_id": os.getenv("GOOGLE_CALENDAR_ID", "primary"),
+            }}
+            self._default = DEFAULT_RESTAURANT_ID
+            return self._configs
+        with open(self.config_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self._configs = data.get("restaurants", {})
+        self._default = data.get("default")
+        return self._configs
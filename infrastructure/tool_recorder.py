@@ -0,0 +1,104 @@
+"""Grabación de las llamadas a herramientas MCP para reproducirlas después.
+
+Con MCP_RECORD_PATH definido, cada llamada se añade como una línea JSON con el
+nombre de la herramienta, sus argumentos, la hora de inicio, la duración y el
+resultado resumido. benchmarks/replay.py reproduce el fichero contra un
+servidor. El fichero contiene datos de clientes (nombres y teléfonos).
+"""
+import asyncio
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MCP_RECORD_PATH = os.getenv("MCP_RECORD_PATH", "")
+
+
+class ToolCallRecorder:
+    """Escribe una línea JSONL por llamada. Seguro entre hilos."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, entry: Dict[str, Any]) -> None:
+        line = json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+_recorder: Optional[ToolCallRecorder] = ToolCallRecorder(MCP_RECORD_PATH) if MCP_RECORD_PATH else None
+
+
+def _outcome(result: Any) -> Optional[bool]:
+    """`success` del resultado si la herramienta devuelve el diccionario habitual."""
+    if isinstance(result, dict) and "success" in result:
+        return bool(result["success"])
+    return None
+
+
+def record_tool(fn):
+    """
+    Decorador para herramientas MCP que graba cada llamada en MCP_RECORD_PATH.
+    Sin MCP_RECORD_PATH devuelve la función original.
+    """
+    if _recorder is None:
+        return fn
+    name = fn.__name__
+    signature = inspect.signature(fn)
+
+    def entry(args, kwargs, started, duration, result=None, error=None):
+        bound = signature.bind(*args, **kwargs)
+        return {
+            "ts": started,
+            "tool": name,
+            "args": dict(bound.arguments),
+            "duration_ms": round(duration * 1000, 3),
+            "success": _outcome(result),
+            "error": error,
+        }
+
+    if asyncio.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            started = time.time()
+            clock = time.perf_counter()
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                _recorder.write(entry(args, kwargs, started, time.perf_counter() - clock, error=repr(e)))
+                raise
+            _recorder.write(entry(args, kwargs, started, time.perf_counter() - clock, result))
+            return result
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        started = time.time()
+        clock = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            _recorder.write(entry(args, kwargs, started, time.perf_counter() - clock, error=repr(e)))
+            raise
+        _recorder.write(entry(args, kwargs, started, time.perf_counter() - clock, result))
+        return result
+    return wrapper
+
+
+def close() -> None:
+    """Cierra el fichero de grabación (al apagar el servidor)."""
+    if _recorder is not None:
+        _recorder.close()
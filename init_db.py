@@ -1,7 +1,10 @@
 import sqlite3
+import sys
 import os
 from dotenv import load_dotenv
 
+from infrastructure.database.migrations import MIGRATIONS, migrate
+
 load_dotenv()
 
 # Obtener la ruta de la base de datos desde .env
@@ -13,51 +16,27 @@ os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
 conn = sqlite3.connect(DB_PATH)
 cur = conn.cursor()
 
-# Eliminar tablas existentes para recrearlas con la nueva estructura
-cur.execute("DROP TABLE IF EXISTS reservations")
-cur.execute("DROP TABLE IF EXISTS tables")
-cur.execute("DROP TABLE IF EXISTS orders")
-
-cur.execute("""
-CREATE TABLE IF NOT EXISTS tables (
-    id INTEGER PRIMARY KEY,
-    capacity INTEGER,
-    location TEXT CHECK(location IN ('interior', 'terrace'))
-)
-""")
-
-cur.execute("""
-CREATE TABLE IF NOT EXISTS reservations (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    table_id INTEGER,
-    name TEXT,
-    guests INTEGER,
-    date TEXT,
-    time TEXT,
-    phone TEXT,
-    duration INTEGER,
-    notes TEXT,
-    calendar_event_id TEXT,
-    merged_tables TEXT,
-    FOREIGN KEY(table_id) REFERENCES tables(id)
-)
-""")
-
-cur.execute("""
-CREATE TABLE IF NOT EXISTS orders (
-    order_id TEXT PRIMARY KEY,
-    items TEXT,
-    total_price REAL,
-    status TEXT,
-    customer_phone TEXT,
-    delivery_address TEXT
-)""")
-
-
-# Ejemplo de mesas
-cur.execute("DELETE FROM tables")
+# python init_db.py --reset: borrar todos los datos y recrear el esquema desde cero
+if "--reset" in sys.argv:
+    cur.execute("DROP TABLE IF EXISTS reservation_tables_version")
+    cur.execute("DROP TABLE IF EXISTS waitlist")
+    cur.execute("DROP TABLE IF EXISTS floor_plan_version")
+    cur.execute("DROP TABLE IF EXISTS calendar_outbox")
+    cur.execute("DROP TABLE IF EXISTS table_adjacency")
+    cur.execute("DROP TABLE IF EXISTS reservation_tables")
+    cur.execute("DROP TABLE IF EXISTS reservations")
+    cur.execute("DROP TABLE IF EXISTS tables")
+    cur.execute("DROP TABLE IF EXISTS orders")
+    cur.execute("PRAGMA user_version = 0")
+    conn.commit()
+
+# Aplicar las migraciones pendientes sin borrar datos existentes
+for version, description in migrate(conn):
+    print(f"  · Migración {version}: {description}")
+
+# Ejemplo de mesas (solo se insertan las que no existan)
 cur.executemany(
-    "INSERT INTO tables (id, capacity, location) VALUES (?, ?, ?)",
+    "INSERT OR IGNORE INTO tables (id, capacity, location) VALUES (?, ?, ?)",
     [
         (1, 2, "interior"),
         (2, 2, "interior"),
@@ -70,4 +49,4 @@ cur.executemany(
 
 conn.commit()
 conn.close()
-print(f"✅ Base de datos creada en: {DB_PATH}")
+print(f"✅ Base de datos lista en: {DB_PATH} (esquema v{MIGRATIONS[-1][0]})")
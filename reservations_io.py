@@ -0,0 +1,365 @@
+"""Importación y exportación masiva de reservas en CSV o JSONL.
+
+Las filas se procesan en streaming por bloques: la memoria usada no depende
+del tamaño del fichero.
+
+    python reservations_io.py export reservas.csv [--from 2025-01-01] [--to 2025-12-31]
+    python reservations_io.py export - --format jsonl > reservas.jsonl
+    python reservations_io.py import reservas.csv [--chunk-size 1000] [--dry-run]
+
+La importación valida cada fila contra el plano de mesas (mesas existentes, de
+la misma ubicación y con capacidad suficiente) y detecta en una sola pasada
+las reservas duplicadas (teléfono y fecha) y los solapamientos, tanto con las
+reservas ya guardadas como con las del propio fichero. Las filas rechazadas
+se informan por stderr y no se importan. Los IDs de reserva se asignan de
+nuevo al importar. Un servidor MCP en marcha ve las reservas importadas sin
+reiniciarse (el índice de ocupación detecta el cambio por su sello de versión).
+"""
+import argparse
+import csv
+import json
+import sys
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from core.domain.booking_date import parse_date, parse_time
+from core.utils.reservation_utils import estimate_duration
+from infrastructure.database.schema import POPULATE_RESERVATION_TABLES_FOR_RANGE
+from infrastructure.database.sql_connection import (
+    query, iter_query, execute, execute_many, transaction, close_connections,
+)
+from infrastructure.repositories.floor_plan_cache import FloorPlan, get_floor_plan_cache
+
+# Columnas exportadas (y aceptadas al importar)
+COLUMNS = [
+    "id", "table_id", "name", "guests", "date", "time", "phone",
+    "duration", "notes", "calendar_event_id", "merged_tables",
+]
+REQUIRED_COLUMNS = ("table_id", "name", "guests", "date", "time", "phone")
+# Filas validadas e insertadas por transacción
+IMPORT_CHUNK_SIZE = 1000
+
+
+class InvalidRow(ValueError):
+    """Fila de importación rechazada."""
+
+
+class _DryRunRollback(Exception):
+    """Deshace la transacción de una importación de prueba."""
+
+
+# ============================================================
+# EXPORTACIÓN
+# ============================================================
+def export_reservations(out, fmt: str = "csv", date_from: Optional[str] = None, date_to: Optional[str] = None) -> int:
+    """
+    Escribe las reservas (opcionalmente entre dos fechas) en `out`, leyendo
+    la base de datos en streaming.
+
+    Returns:
+        Número de reservas exportadas
+    """
+    sql = f"SELECT {', '.join(COLUMNS)} FROM reservations WHERE 1 = 1"
+    params: List[str] = []
+    if date_from:
+        sql += " AND date >= ?"
+        params.append(parse_date(date_from).isoformat())
+    if date_to:
+        sql += " AND date <= ?"
+        params.append(parse_date(date_to).isoformat())
+    sql += " ORDER BY date, time, id"
+
+    rows = iter_query(sql, tuple(params))
+    count = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(out, fieldnames=COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    else:
+        for row in rows:
+            if row["merged_tables"]:
+                row["merged_tables"] = json.loads(row["merged_tables"])
+            out.write(json.dumps(row, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+# ============================================================
+# IMPORTACIÓN
+# ============================================================
+def _read_rows(src, fmt: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Genera (número de línea, fila) sin cargar el fichero en memoria."""
+    if fmt == "csv":
+        reader = csv.DictReader(src)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line_number, line in enumerate(src, start=1):
+            if line.strip():
+                try:
+                    yield line_number, json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_number, {"_error": f"JSON no válido: {e.msg}"}
+
+
+def _parse_table_ids(value: Any) -> Optional[List[int]]:
+    if value in (None, ""):
+        return None
+    if isinstance(value, str):
+        value = json.loads(value)
+    if not isinstance(value, list) or not value:
+        raise InvalidRow(f"merged_tables debe ser una lista de IDs: {value!r}")
+    return [int(tid) for tid in value]
+
+
+def _validate(row: Dict[str, Any], plan: FloorPlan) -> Dict[str, Any]:
+    """Normaliza una fila y la valida contra el plano de mesas."""
+    if "_error" in row:
+        raise InvalidRow(row["_error"])
+    missing = [c for c in REQUIRED_COLUMNS if row.get(c) in (None, "")]
+    if missing:
+        raise InvalidRow(f"faltan columnas obligatorias: {', '.join(missing)}")
+
+    try:
+        table_id = int(row["table_id"])
+        guests = int(row["guests"])
+        date = parse_date(str(row["date"])).isoformat()
+        parsed_time = parse_time(str(row["time"]))
+        time = f"{parsed_time.hour:02d}:{parsed_time.minute:02d}"
+        duration = int(row["duration"]) if row.get("duration") not in (None, "") else estimate_duration(guests, time)
+        merged_tables = _parse_table_ids(row.get("merged_tables"))
+    except (ValueError, TypeError) as e:
+        raise InvalidRow(str(e)) from None
+    if guests < 1 or duration < 1:
+        raise InvalidRow("guests y duration deben ser positivos")
+
+    table_ids = list(dict.fromkeys([table_id, *(merged_tables or [])]))
+    tables = []
+    for tid in table_ids:
+        table = plan.by_id.get(tid)
+        if table is None:
+            raise InvalidRow(f"la mesa {tid} no existe")
+        tables.append(table)
+    if len({t["location"] for t in tables}) > 1:
+        raise InvalidRow("no se pueden combinar mesas de diferentes ubicaciones")
+    capacity = sum(t["capacity"] for t in tables)
+    if capacity < guests:
+        raise InvalidRow(f"capacidad insuficiente ({capacity}) para {guests} personas")
+
+    start = parsed_time.hour * 60 + parsed_time.minute
+    return {
+        "table_id": table_id,
+        "name": str(row["name"]),
+        "guests": guests,
+        "date": date,
+        "time": time,
+        "phone": str(row["phone"]),
+        "duration": duration,
+        "notes": row.get("notes") or None,
+        "calendar_event_id": row.get("calendar_event_id") or None,
+        "merged_tables": json.dumps(merged_tables) if merged_tables else None,
+        "_table_ids": table_ids,
+        "_start": start,
+        "_end": start + duration,
+    }
+
+
+def _load_saved(dates: List[str]) -> Tuple[set, Dict[Tuple[int, str], List[Tuple[int, int]]]]:
+    """
+    Reservas ya guardadas en las fechas de un bloque: (teléfono, fecha) y
+    (mesa, fecha) -> intervalos ocupados. Dos consultas indexadas por fecha
+    por bloque en lugar de dos por fila.
+    """
+    dates_json = json.dumps(dates)
+    phones = {
+        (r["phone"], r["date"])
+        for r in query("SELECT phone, date FROM reservations WHERE date IN (SELECT value FROM json_each(?))", (dates_json,))
+    }
+    slots: Dict[Tuple[int, str], List[Tuple[int, int]]] = {}
+    for r in query(
+        """SELECT table_id, date, start_minute, end_minute FROM reservation_tables
+           WHERE date IN (SELECT value FROM json_each(?))""",
+        (dates_json,)
+    ):
+        slots.setdefault((r["table_id"], r["date"]), []).append((r["start_minute"], r["end_minute"]))
+    return phones, slots
+
+
+def _next_id() -> int:
+    """Primer ID libre, sin reutilizar IDs de reservas borradas (AUTOINCREMENT)."""
+    rows = query("""
+        SELECT MAX(COALESCE((SELECT MAX(id) FROM reservations), 0),
+                   COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'reservations'), 0)) + 1 AS next_id
+    """)
+    return rows[0]["next_id"]
+
+
+def _import_chunk(chunk: List[Tuple[int, Dict[str, Any]]], plan: FloorPlan, report) -> int:
+    """
+    Valida e inserta un bloque. Debe ejecutarse dentro de una transacción de
+    escritura: las reservas de los bloques anteriores ya están en
+    reservation_tables, así que solo se cargan las fechas del bloque actual.
+    """
+    rejected = []
+    validated = []
+    for line_number, raw in chunk:
+        try:
+            validated.append((line_number, _validate(raw, plan)))
+        except InvalidRow as e:
+            rejected.append((line_number, str(e)))
+
+    # Estado del bloque: reservas guardadas en sus fechas más las aceptadas del propio bloque
+    phones, slots = _load_saved(sorted({row["date"] for _, row in validated}))
+    accepted = []
+    for line_number, row in validated:
+        date, start, end = row["date"], row["_start"], row["_end"]
+        if (row["phone"], date) in phones:
+            rejected.append((line_number, f"ya existe una reserva con el número {row['phone']} para el {date}"))
+            continue
+        busy = next(
+            (tid for tid in row["_table_ids"]
+             for s, e in slots.get((tid, date), ()) if s < end and start < e),
+            None
+        )
+        if busy is not None:
+            rejected.append((line_number, f"la mesa {busy} ya está ocupada el {date} a las {row['time']}"))
+            continue
+
+        phones.add((row["phone"], date))
+        for tid in row["_table_ids"]:
+            slots.setdefault((tid, date), []).append((start, end))
+        accepted.append(row)
+
+    for line_number, reason in sorted(rejected):
+        report(line_number, reason)
+
+    if not accepted:
+        return 0
+
+    first_id = _next_id()
+    execute_many(
+        f"INSERT INTO reservations ({', '.join(COLUMNS)}) VALUES ({', '.join('?' for _ in COLUMNS)})",
+        [(first_id + i, *(row[c] for c in COLUMNS[1:])) for i, row in enumerate(accepted)]
+    )
+    last_id = first_id + len(accepted) - 1
+    execute(POPULATE_RESERVATION_TABLES_FOR_RANGE, {"first_id": first_id, "last_id": last_id})
+
+    # No hace falta avisar al índice de ocupación: los triggers de reservation_tables
+    # incrementan su sello y cualquier proceso (también un servidor MCP en marcha)
+    # descarta sus fechas en memoria en la siguiente lectura
+    return len(accepted)
+
+
+def import_reservations(src, fmt: str = "csv", chunk_size: int = IMPORT_CHUNK_SIZE,
+                        dry_run: bool = False, report=None) -> Dict[str, int]:
+    """
+    Importa reservas desde `src` por bloques de `chunk_size` filas, cada uno
+    en su propia transacción. Con dry_run todo se valida en una única
+    transacción que se deshace al final.
+
+    Args:
+        report: Función (número de línea, motivo) llamada por cada fila rechazada
+
+    Returns:
+        {"read": filas leídas, "imported": importadas, "rejected": rechazadas}
+    """
+    rejected = 0
+
+    def on_rejected(line_number, reason):
+        nonlocal rejected
+        rejected += 1
+        if report:
+            report(line_number, reason)
+
+    plan = get_floor_plan_cache().get()
+    rows = _read_rows(src, fmt)
+    read = imported = 0
+
+    def chunks() -> Iterable[List[Tuple[int, Dict[str, Any]]]]:
+        nonlocal read
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+            read += len(chunk)
+            yield chunk
+
+    if dry_run:
+        try:
+            with transaction(immediate=True):
+                for chunk in chunks():
+                    imported += _import_chunk(chunk, plan, on_rejected)
+                raise _DryRunRollback()
+        except _DryRunRollback:
+            pass
+    else:
+        for chunk in chunks():
+            with transaction(immediate=True):
+                imported += _import_chunk(chunk, plan, on_rejected)
+
+    return {"read": read, "imported": imported, "rejected": rejected}
+
+
+# ============================================================
+# LÍNEA DE COMANDOS
+# ============================================================
+def _detect_format(path: str, fmt: Optional[str]) -> str:
+    if fmt:
+        return fmt
+    return "jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Importación y exportación masiva de reservas")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    exp = sub.add_parser("export", help="Exporta reservas a CSV o JSONL")
+    exp.add_argument("path", help="Fichero de salida ('-' para stdout)")
+    exp.add_argument("--format", choices=["csv", "jsonl"])
+    exp.add_argument("--from", dest="date_from", help="Fecha inicial (incluida)")
+    exp.add_argument("--to", dest="date_to", help="Fecha final (incluida)")
+
+    imp = sub.add_parser("import", help="Importa reservas desde CSV o JSONL")
+    imp.add_argument("path", help="Fichero de entrada ('-' para stdin)")
+    imp.add_argument("--format", choices=["csv", "jsonl"])
+    imp.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    imp.add_argument("--dry-run", action="store_true", help="Valida sin guardar nada")
+
+    args = parser.parse_args(argv)
+    fmt = _detect_format(args.path, args.format)
+
+    try:
+        if args.command == "export":
+            out = sys.stdout if args.path == "-" else open(args.path, "w", newline="", encoding="utf-8")
+            try:
+                count = export_reservations(out, fmt, args.date_from, args.date_to)
+            finally:
+                if out is not sys.stdout:
+                    out.close()
+            print(f"✅ {count} reservas exportadas", file=sys.stderr)
+            return 0
+
+        def report(line_number, reason):
+            print(f"  ✗ línea {line_number}: {reason}", file=sys.stderr)
+
+        src = sys.stdin if args.path == "-" else open(args.path, newline="", encoding="utf-8")
+        try:
+            result = import_reservations(src, fmt, args.chunk_size, args.dry_run, report)
+        finally:
+            if src is not sys.stdin:
+                src.close()
+        verb = "se importarían" if args.dry_run else "importadas"
+        print(f"✅ {result['imported']} de {result['read']} reservas {verb}, "
+              f"{result['rejected']} rechazadas", file=sys.stderr)
+        return 1 if result["rejected"] else 0
+    finally:
+        close_connections()
+
+
+if __name__ == "__main__":
+    sys.exit(main())